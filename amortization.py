@@ -0,0 +1,165 @@
+import math
+
+import numpy as np
+
+
+# Function to calculate the annuity payment, works for scalars and arrays alike
+def annuity_payment(loan_amount, loan_rate, loan_term):
+    loan_amount = np.asarray(loan_amount, dtype=float)
+    months = np.asarray(loan_term) * 12
+    monthly_interest_rate = np.asarray(loan_rate, dtype=float) / 100 / 12
+
+    # Zero rate would divide by zero in the annuity formula, so use a safe rate there
+    safe_rate = np.where(monthly_interest_rate > 0, monthly_interest_rate, 1.0)
+    growth = (1 + safe_rate) ** months
+    payment = np.where(
+        monthly_interest_rate > 0,
+        loan_amount * safe_rate * growth / (growth - 1),
+        loan_amount / months
+    )
+    return payment[()]
+
+
+# Function to calculate the balance left before the given (1-based) payment month.
+# Uses the closed form B = P(1+r)^k - M((1+r)^k - 1) / r instead of stepping month by month.
+def balance_before_payment(loan_amount, monthly_interest_rate, monthly_payment, month):
+    elapsed = np.asarray(month) - 1
+    safe_rate = np.where(monthly_interest_rate > 0, monthly_interest_rate, 1.0)
+    growth = (1 + safe_rate) ** elapsed
+    return np.where(
+        monthly_interest_rate > 0,
+        loan_amount * growth - monthly_payment * (growth - 1) / safe_rate,
+        loan_amount - monthly_payment * elapsed
+    )
+
+
+# Function to build the full monthly and annual mortgage schedule in one vectorized pass.
+# With exact=True the monthly values are rounded to cents like on a bank statement, see
+# amortization_schedule_cents, and the last payment closes the loan to exactly zero.
+def amortization_schedule(loan_amount, loan_rate, loan_term, exact=False):
+    if exact:
+        cents = amortization_schedule_cents(loan_amount, loan_rate, loan_term)
+        monthly_payment = cents['monthly_payment'] / 100
+        monthly_payments = cents['monthly_payments'] / 100
+        monthly_interests = cents['monthly_interests'] / 100
+        monthly_principals = cents['monthly_principals'] / 100
+    else:
+        months = loan_term * 12
+        monthly_interest_rate = loan_rate / 100 / 12
+        monthly_payment = float(annuity_payment(loan_amount, loan_rate, loan_term))
+
+        month = np.arange(1, months + 1)
+        balance = balance_before_payment(loan_amount, monthly_interest_rate, monthly_payment, month)
+
+        monthly_payments = np.full(months, monthly_payment)
+        monthly_interests = balance * monthly_interest_rate
+        monthly_principals = monthly_payments - monthly_interests
+
+    # Convert monthly data to annual data by summing each row of 12 months
+    annual_payments = monthly_payments.reshape(loan_term, 12).sum(axis=1)
+    annual_interests = monthly_interests.reshape(loan_term, 12).sum(axis=1)
+    annual_principals = monthly_principals.reshape(loan_term, 12).sum(axis=1)
+    cumulative_annual_interest = np.cumsum(annual_interests)
+    cumulative_annual_principal = np.cumsum(annual_principals)
+
+    return {
+        'monthly_payment': monthly_payment,
+        'monthly_payments': monthly_payments,
+        'monthly_interests': monthly_interests,
+        'monthly_principals': monthly_principals,
+        'annual_payments': annual_payments,
+        'annual_interests': annual_interests,
+        'annual_principals': annual_principals,
+        'cumulative_annual_interest': cumulative_annual_interest,
+        'cumulative_annual_principal': cumulative_annual_principal,
+        'cumulative_mortgage_cost': cumulative_annual_interest + cumulative_annual_principal,
+    }
+
+
+# Function to round to whole cents with halves rounded up, as banks do
+def to_cents(euros):
+    return np.floor(np.asarray(euros, dtype=float) * 100 + 0.5).astype(np.int64)
+
+
+# Function to build the monthly schedules in whole cents the way a bank statement shows them.
+# Every month the interest is rounded half up to cents from the exact rate, the payment is the
+# annuity rounded to cents, and the last payment is adjusted so the balance ends at exactly zero.
+# The rounding drift of every month grows with the loan rate until the end, so the last payment
+# can differ from the others by up to about 0.01 € * ((1 + r)^n - 1) / r in either direction,
+# e.g. +1.82 € for 300 000 € at 3 % over 25 years and -12.60 € for 2 M€ at 10 % over 40 years.
+# Arguments may be arrays of loans with the same loan term, every array in the result then has
+# one row per loan. The scan runs over the months with all loans at once in int64 arithmetic.
+def amortization_schedule_cents(loan_amount, loan_rate, loan_term):
+    if np.ndim(loan_amount) == 0 and np.ndim(loan_rate) == 0:
+        return _schedule_cents_single(float(loan_amount), float(loan_rate), int(loan_term))
+
+    months = loan_term * 12
+    balance = np.atleast_1d(to_cents(loan_amount))
+
+    # Rate in millionths of a percent, so interest = balance * rate / (100 * 12 * 10^6) is exact in integers
+    rate = np.broadcast_to(np.round(np.asarray(loan_rate, dtype=float) * 1e6).astype(np.int64), balance.shape)
+    payment = np.broadcast_to(to_cents(annuity_payment(balance / 100, loan_rate, loan_term)), balance.shape)
+    divisor = 100 * 12 * 10**6
+
+    interests = np.empty((len(balance), months), dtype=np.int64)
+    principals = np.empty((len(balance), months), dtype=np.int64)
+    for month in range(months):
+        interest = (2 * balance * rate + divisor) // (2 * divisor)
+        principal = np.minimum(payment - interest, balance)
+        interests[:, month] = interest
+        principals[:, month] = principal
+        balance = balance - principal
+
+    # Rounding leaves a small balance (or overpayment) after the last regular payment, it goes into the last payment
+    principals[:, -1] += balance
+    payments = interests + principals
+
+    return {
+        'monthly_payment': payment.copy(),
+        'monthly_payments': payments,
+        'monthly_interests': interests,
+        'monthly_principals': principals,
+    }
+
+
+# The same schedule for one loan with plain Python numbers, NumPy only builds the arrays at the end.
+# The payment follows annuity_payment and to_cents step by step so both paths give the same cents.
+def _schedule_cents_single(loan_amount, loan_rate, loan_term):
+    months = loan_term * 12
+    balance = math.floor(loan_amount * 100 + 0.5)
+    monthly_interest_rate = loan_rate / 100 / 12
+    if monthly_interest_rate > 0:
+        growth = (1 + monthly_interest_rate) ** months
+        payment = balance / 100 * monthly_interest_rate * growth / (growth - 1)
+    else:
+        payment = balance / 100 / months
+    payment = math.floor(payment * 100 + 0.5)
+
+    # Interest rounded half up is (2 * balance * rate + divisor) // (2 * divisor), with the
+    # fraction reduced first so the integers stay small for the usual rates
+    rate = round(loan_rate * 1e6)
+    common = math.gcd(rate, 100 * 12 * 10**6)
+    twice_rate = 2 * rate // common
+    half = 100 * 12 * 10**6 // common
+    twice_divisor = 2 * half
+
+    interests = [0] * months
+    principals = [0] * months
+    for month in range(months):
+        interest = (balance * twice_rate + half) // twice_divisor
+        principal = payment - interest
+        if principal > balance:
+            principal = balance
+        interests[month] = interest
+        principals[month] = principal
+        balance -= principal
+    principals[-1] += balance
+
+    interests = np.array(interests, dtype=np.int64)
+    principals = np.array(principals, dtype=np.int64)
+    return {
+        'monthly_payment': np.int64(payment),
+        'monthly_payments': interests + principals,
+        'monthly_interests': interests,
+        'monthly_principals': principals,
+    }
@@ -1,24 +1,70 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.ticker as mtick  # Import ticker module
-
-# Function to format numbers in Finnish style with one decimal
-def format_number_finnish(value, is_percentage=False):
-    # Check if the value is a number
-    if isinstance(value, (int, float, np.integer, np.floating)):
-        # Round to one decimal
-        value = round(value, 1)
-        if is_percentage:
-            formatted = f"{value:,.1f} %".replace(',', ' ').replace('.', ',')
-        else:
-            # Separate thousands with space and decimals with comma
-            formatted = f"{value:,.1f}".replace(',', ' ').replace('.', ',')
-        return formatted
-    else:
+
+import backtest
+import charts
+import montecarlo
+import perf
+import prepayment
+import sensitivity
+import solvers
+import variable_rate
+from cache import _MISSING
+from calculator import GRAPH, PENSION_AGE, SHARED_CACHE, evaluate, prewarm
+from formatting import format_frame_finnish, format_number_finnish
+
+# Timing spans and counters, switched on with ?debug=1 or the EGNA_PERF environment variable
+debug = st.query_params.get('debug') == '1'
+timer = perf.Timer.from_environment(enabled=debug)
+st.session_state['reruns'] = st.session_state.get('reruns', 0) + 1
+timer.count('reruns', st.session_state['reruns'])
+
+# Fill the shared cache with the most common inputs once per server process
+@st.cache_resource(show_spinner=False)
+def prewarm_once():
+    prewarm()
+    return True
+
+prewarm_once()
+
+# Historical monthly returns, memory-mapped once per server process and shared by every session
+@st.cache_resource(show_spinner=False)
+def load_history():
+    return backtest.load_history()
+
+# Function to build a table or an image once per token of the graph nodes it shows.
+# Results live in the shared cache, so reruns and other sessions with the same inputs reuse them.
+# Cached results are shared, so they must not be modified after they are returned.
+def render_once(token, build):
+    timer.count('render_calls')
+
+    # Tokens start with the name of the table or chart, a trailing string tells the variants apart
+    name = f'{token[0]}:{token[-1]}' if len(token) > 1 and isinstance(token[-1], str) else token[0]
+    with timer.span(name):
+        value = SHARED_CACHE.get(('render',) + token)
+        if value is _MISSING:
+            timer.count('render_builds')
+            value = build()
+            SHARED_CACHE.put(('render',) + token, value)
         return value
 
+# Function to show a chart rendered in the browser, with an optional PNG download.
+# The PNG is only drawn with matplotlib when the export is switched on.
+def show_chart(token, chart, file_name):
+    timer.count('charts')
+    data, spec = render_once(token, lambda: charts.vega_lite(chart))
+    st.vega_lite_chart(data, spec, use_container_width=True)
+    if export_charts:
+        timer.count('png_exports')
+        st.download_button(
+            'Lataa PNG-kuvana',
+            render_once(token + ('png',), lambda: charts.export_png(chart)),
+            file_name=file_name,
+            mime='image/png',
+            key=file_name
+        )
+
 st.title('Asunto-ostajan laskuri')
 
 # Sidebar inputs for Mortgage
@@ -33,6 +79,7 @@ initial_property_value = st.sidebar.slider('Asunnon arvo ostohetkellä (€)', 0
 
 loan_term = st.sidebar.slider('Laina-aika (vuodet)', 5, 40, 25, step=1)
 loan_rate = st.sidebar.slider('Lainakorko (%)', 0.0, 10.0, 3.0, step=0.1, format="%.1f")
+exact_cents = st.sidebar.checkbox('Senttitarkka maksuohjelma (pankin pyöristys)', value=False)
 
 # Sidebar inputs for Investment
 st.sidebar.header('Sijoittamisen parametrit')
@@ -50,218 +97,160 @@ monthly_rent = st.sidebar.slider('Kuukausittainen vuokra (€)', 0, 4_000, 1_200
 st.sidebar.header('Tulojen parametrit')
 net_salary = st.sidebar.number_input('Nettokuukausipalkkasi (€)', min_value=0, value=3_000, step=100)
 
-# Calculate passive investment period
-pension_age = 69
-passive_investment_period = pension_age - age - active_investment_period
-
-if passive_investment_period < 0:
-    st.error('Ikäsi ja aktiivisen sijoitusajan summa ylittää odotetun eliniän 69 vuotta. Ole hyvä ja tarkista syötteesi.')
-    st.stop()
-
-# Total investment period
-total_investment_period = active_investment_period + passive_investment_period
-
-# Investment years array
-investment_years = np.arange(1, total_investment_period + 1)
-
-# Mortgage calculations
-years = np.arange(1, loan_term + 1)
-months = loan_term * 12
-monthly_interest_rate = loan_rate / 100 / 12
-
-if monthly_interest_rate > 0:
-    monthly_payment = loan_amount * monthly_interest_rate * (1 + monthly_interest_rate) ** months / ((1 + monthly_interest_rate) ** months - 1)
-else:
-    monthly_payment = loan_amount / months
-
-# Initialize lists to store values
-remaining_balance = loan_amount
-monthly_payments = []
-monthly_interests = []
-monthly_principals = []
-total_interest = 0
-total_principal = 0
-
-for i in range(1, months + 1):
-    interest_payment = remaining_balance * monthly_interest_rate
-    principal_payment = monthly_payment - interest_payment
-    remaining_balance -= principal_payment
-
-    # Store monthly values
-    monthly_payments.append(monthly_payment)
-    monthly_interests.append(interest_payment)
-    monthly_principals.append(principal_payment)
-
-    # Cumulative sums
-    total_interest += interest_payment
-    total_principal += principal_payment
-
-# Convert monthly data to annual data
-annual_payments = [sum(monthly_payments[i*12:(i+1)*12]) for i in range(loan_term)]
-annual_interests = [sum(monthly_interests[i*12:(i+1)*12]) for i in range(loan_term)]
-annual_principals = [sum(monthly_principals[i*12:(i+1)*12]) for i in range(loan_term)]
-cumulative_annual_interest = np.cumsum(annual_interests)
-cumulative_annual_principal = np.cumsum(annual_principals)
-cumulative_mortgage_cost = cumulative_annual_interest + cumulative_annual_principal
-
-# Calculate total amounts
-total_interest_paid = cumulative_annual_interest[-1]
-total_principal_paid = cumulative_annual_principal[-1]
-total_mortgage_payments = total_interest_paid + total_principal_paid
-
-# **Calculate total vastike (maintenance charges) during loan period**
-total_vastike_paid = vastike * 12 * loan_term
-
-# Investment calculations
-annual_return_rate = investment_rate / 100
-
-# Initialize investment values
-cumulative_investment = []
-
-for n in range(1, total_investment_period + 1):
-    if n <= active_investment_period:
-        # During active investment period
-        if annual_return_rate != 0:
-            future_value = starting_amount * (1 + annual_return_rate) ** n + \
-                monthly_investment * 12 * ((1 + annual_return_rate) ** n - 1) / annual_return_rate
-        else:
-            future_value = starting_amount + monthly_investment * 12 * n
-    else:
-        # During passive investment period
-        years_after_active = n - active_investment_period
-        value_at_end_of_active = cumulative_investment[active_investment_period - 1]
-        future_value = value_at_end_of_active * (1 + annual_return_rate) ** years_after_active
-    cumulative_investment.append(future_value)
-
-cumulative_investment = np.array(cumulative_investment)
-
-# Adjust investment array to match the loan term years for the main plot
-if total_investment_period < loan_term:
-    adjusted_cumulative_investment = np.append(
-        cumulative_investment,
-        [cumulative_investment[-1]] * (loan_term - total_investment_period)
+# Sidebar inputs for the annual growth of rent, vastike, salary and property value
+st.sidebar.header('Kehitysoletukset')
+rent_growth = st.sidebar.slider('Vuokran vuotuinen korotus (%)', 0.0, 10.0, 0.0, step=0.5, format="%.1f")
+vastike_growth = st.sidebar.slider('Vastikkeen vuotuinen nousu (%)', 0.0, 10.0, 0.0, step=0.5, format="%.1f")
+salary_growth = st.sidebar.slider('Nettopalkan vuotuinen nousu (%)', 0.0, 10.0, 0.0, step=0.5, format="%.1f")
+property_appreciation = st.sidebar.slider('Asunnon vuotuinen arvonnousu (%)', -5.0, 10.0, 2.0, step=0.5, format="%.1f")
+
+# Sidebar inputs for a Euribor-linked loan with simulated reference rate paths
+st.sidebar.header('Vaihtuvakorkoinen laina')
+variable_loan = st.sidebar.checkbox('Simuloi viitekoron vaihtelu', value=False)
+if variable_loan:
+    loan_margin = st.sidebar.slider('Lainan marginaali (%)', 0.0, 3.0, 0.6, step=0.1, format="%.1f")
+    reference_rate = st.sidebar.slider('Viitekorko nyt (%)', -1.0, 6.0, 2.5, step=0.1, format="%.1f")
+    long_term_reference_rate = st.sidebar.slider('Viitekoron pitkän aikavälin taso (%)', -1.0, 6.0, 2.5, step=0.1, format="%.1f")
+    reference_rate_volatility = st.sidebar.slider('Viitekoron volatiliteetti (%-yks.)', 0.0, 3.0, 1.0, step=0.1, format="%.1f")
+    reset_months = st.sidebar.select_slider('Koronmuutosjakso (kk)', variable_rate.RESET_PERIODS, value=12)
+
+# Sidebar inputs for the Monte Carlo simulation of investment returns
+st.sidebar.header('Stokastinen tuotto')
+stochastic_returns = st.sidebar.checkbox('Simuloi sijoitusten tuoton vaihtelu (Monte Carlo)', value=False)
+if stochastic_returns:
+    return_mean = st.sidebar.slider('Odotettu vuosituotto (%)', 0, 20, investment_rate, step=1)
+    return_volatility = st.sidebar.slider('Tuoton volatiliteetti (%)', 0, 40, 15, step=1)
+    return_distribution = st.sidebar.selectbox(
+        'Tuottojakauma',
+        montecarlo.DISTRIBUTIONS,
+        format_func={'normal': 'Normaali', 'student_t': 'Paksuhäntäinen (Student t)'}.get
     )
-elif total_investment_period > loan_term:
-    adjusted_cumulative_investment = cumulative_investment[:loan_term]
-else:
-    adjusted_cumulative_investment = cumulative_investment
+    n_paths = st.sidebar.select_slider('Simulaatiopolkujen määrä', [10_000, 50_000, 100_000], value=10_000)
+    seed = st.sidebar.number_input('Satunnaislukusiemen', min_value=0, value=0, step=1)
+
+# Sidebar inputs for the sensitivity heatmap over two parameters
+st.sidebar.header('Herkkyysanalyysi')
+show_sensitivity = st.sidebar.checkbox('Näytä herkkyyskartta', value=False)
+if show_sensitivity:
+    sensitivity_names = list(sensitivity.SENSITIVITY_PARAMETERS)
+    sensitivity_label = lambda name: sensitivity.SENSITIVITY_PARAMETERS[name][0]
+    sensitivity_x = st.sidebar.selectbox('Vaaka-akselin parametri', sensitivity_names, index=0, format_func=sensitivity_label)
+    sensitivity_y = st.sidebar.selectbox(
+        'Pystyakselin parametri',
+        [name for name in sensitivity_names if name != sensitivity_x],
+        index=1,
+        format_func=sensitivity_label
+    )
+    sensitivity_resolution = st.sidebar.select_slider('Ruudukon tarkkuus', [25, 50, 100], value=100)
 
-# Total investment amount at the end of the total investment period
-total_investment = cumulative_investment[-1]
+# Sidebar inputs for extra principal payments and a payment holiday
+st.sidebar.header('Ylimääräiset lyhennykset')
+extra_repayment = st.sidebar.checkbox('Laske ylimääräiset lyhennykset ja lyhennysvapaa', value=False)
+if extra_repayment:
+    lump_sum = st.sidebar.slider('Kertalyhennys (€)', 0, 500_000, 20_000, step=5_000, format="%d")
+    lump_sum_year = st.sidebar.slider('Kertalyhennyksen vuosi', 1, loan_term, 1, step=1)
+    monthly_extra = st.sidebar.slider('Kuukausittainen lisälyhennys (€)', 0, 5_000, 0, step=50)
+    holiday_year = st.sidebar.slider('Lyhennysvapaan alkuvuosi', 1, loan_term, 1, step=1)
+    holiday_months = st.sidebar.slider('Lyhennysvapaan pituus (kk)', 0, 24, 0, step=1)
 
-# Total investment over active and passive periods
-if active_investment_period > 0:
-    total_investment_active = cumulative_investment[active_investment_period - 1]
-else:
-    total_investment_active = 0
-
-total_investment_passive = total_investment - total_investment_active
-
-# Rent calculations
-cumulative_rent = np.cumsum([monthly_rent * 12 for _ in years])
-
-# Total rent paid
-total_rent_paid = cumulative_rent[-1]
-
-# **Prepare Summary Table with Separate Columns for Loan and Rent Scenarios**
-# Calculate monthly expenses for mortgage scenario
-annual_expenses_mortgage = total_mortgage_payments + total_vastike_paid
-monthly_expenses_mortgage = annual_expenses_mortgage / (loan_term * 12)
-
-# Calculate additional monthly investment for rent scenario
-additional_monthly_investment = monthly_expenses_mortgage - monthly_rent if monthly_expenses_mortgage > monthly_rent else 0
-additional_annual_investment = additional_monthly_investment * 12
-
-if additional_monthly_investment > 0:
-    # Calculate cumulative investments for rent scenario with additional investments
-    cumulative_investment_rent = []
-    for n in range(1, total_investment_period + 1):
-        if n <= active_investment_period:
-            # During active investment period
-            if annual_return_rate != 0:
-                future_value = starting_amount * (1 + annual_return_rate) ** n + \
-                    (monthly_investment + additional_monthly_investment) * 12 * ((1 + annual_return_rate) ** n - 1) / annual_return_rate
-            else:
-                future_value = starting_amount + (monthly_investment + additional_monthly_investment) * 12 * n
-        else:
-            # During passive investment period
-            years_after_active = n - active_investment_period
-            value_at_end_of_active_new = cumulative_investment_rent[active_investment_period - 1]
-            future_value_new = value_at_end_of_active_new * (1 + annual_return_rate) ** years_after_active
-            future_value = value_at_end_of_active_new * (1 + annual_return_rate) ** years_after_active
-        cumulative_investment_rent.append(future_value)
-
-    cumulative_investment_rent = np.array(cumulative_investment_rent)
-
-    # Adjust investment array to match the loan term years
-    if total_investment_period < loan_term:
-        adjusted_cumulative_investment_rent = np.append(
-            cumulative_investment_rent,
-            [cumulative_investment_rent[-1]] * (loan_term - total_investment_period)
-        )
-    elif total_investment_period > loan_term:
-        adjusted_cumulative_investment_rent = cumulative_investment_rent[:loan_term]
-    else:
-        adjusted_cumulative_investment_rent = cumulative_investment_rent
+# Sidebar input for the backtest on historical returns
+st.sidebar.header('Historiallinen testaus')
+historical_backtest = st.sidebar.checkbox('Testaa historiallisilla tuotoilla', value=False)
 
-    # Total investment amount at the end of the total investment period
-    total_investment_rent = cumulative_investment_rent[-1]
+# Charts are drawn in the browser, PNG export with matplotlib only on request
+export_charts = st.sidebar.checkbox('Kaavioiden PNG-vienti', value=False)
 
-    # Total investment over active and passive periods
-    if active_investment_period > 0:
-        total_investment_active_rent = cumulative_investment_rent[active_investment_period - 1]
-    else:
-        total_investment_active_rent = 0
+# Calculate passive investment period
+if PENSION_AGE - age - active_investment_period < 0:
+    st.error('Ikäsi ja aktiivisen sijoitusajan summa ylittää odotetun eliniän 69 vuotta. Ole hyvä ja tarkista syötteesi.')
+    st.stop()
 
-    total_investment_passive_rent = total_investment_rent - total_investment_active_rent
-else:
-    # If no additional investment, rent scenario investments are same as loan scenario
-    cumulative_investment_rent = cumulative_investment
-    total_investment_rent = total_investment
-    total_investment_active_rent = total_investment_active
-    total_investment_passive_rent = total_investment_passive
-
-summary_data = {
-    'Erä': [
-        'Kokonaiskorko maksettu laina-aikana',
-        'Kokonaislyhennys maksettu laina-aikana',
-        'Asuntolainan kokonaismaksut laina-aikana',
-        'Kokonaisvastike maksettu laina-aikana',
-        'Kokonaisvuokra maksettu laina-aikana',
-        'Sijoitusten kokonaisarvo aktiivisena sijoitusaikana',
-        'Sijoitusten kokonaisarvo passiivisena sijoitusaikana',
-        'Sijoitusten kokonaisarvo sijoitusaikana',
-        'Asunnon arvo kun laina-aika loppuu'
-    ],
-    'Asuntolaina skenaario (€)': [
-        total_interest_paid,
-        total_principal_paid,
-        total_mortgage_payments,
-        total_vastike_paid,
-        np.nan,  # Not applicable for loan scenario
-        total_investment_active,
-        total_investment_passive,
-        total_investment,
-        initial_property_value * (1 + 0.02) ** loan_term  # Property value calculation
-    ],
-    'Vuokraus skenaario (€)': [
-        np.nan,  # Not applicable for loan scenario
-        np.nan,  # Not applicable for loan scenario
-        np.nan,  # Not applicable for loan scenario
-        np.nan,  # Not applicable for loan scenario
-        total_rent_paid,
-        total_investment_active_rent,
-        total_investment_passive_rent,
-        total_investment_rent,
-        np.nan  # Not applicable for rent scenario
-    ]
+# Current inputs as one profile, the same columns as in scenarios.DEFAULT_PROFILE
+profile = {
+    'loan_amount': loan_amount,
+    'vastike': vastike,
+    'initial_property_value': initial_property_value,
+    'loan_term': loan_term,
+    'loan_rate': loan_rate,
+    'starting_amount': starting_amount,
+    'monthly_investment': monthly_investment,
+    'investment_rate': investment_rate,
+    'active_investment_period': active_investment_period,
+    'age': age,
+    'monthly_rent': monthly_rent,
+    'net_salary': net_salary,
+    'rent_growth': rent_growth,
+    'vastike_growth': vastike_growth,
+    'salary_growth': salary_growth,
+    'property_appreciation': property_appreciation,
 }
+profile_token = tuple(profile.items())
+
+# Evaluate the computation graph, only the nodes whose inputs changed are recomputed
+with timer.span('evaluate'):
+    run = evaluate(timer=timer, exact_cents=exact_cents, **profile)
+timer.count('nodes_recomputed', len(run['recomputed']))
+timer.count('nodes_cached', len(GRAPH.nodes) - len(run['recomputed']))
+values = run['values']
+tokens = run['tokens']
+
+amortization = values['amortization']
+rent = values['rent']
+cash_flow = values['cash_flow']
+investments = values['investments']
+net_worth = values['net_worth']
+salary_allocation = values['salary_allocation']
+metrics = values['metrics']
 
-summary_df = pd.DataFrame(summary_data)
-
-# Format numbers using the Finnish formatting function, handling NaN appropriately
-for col in ['Asuntolaina skenaario (€)', 'Vuokraus skenaario (€)']:
-    summary_df[col] = summary_df[col].apply(lambda x: format_number_finnish(x) if not pd.isna(x) else '-')
+years = np.arange(1, loan_term + 1)
+investment_years = investments['investment_years']
+
+def build_summary_df():
+    summary_data = {
+        'Erä': [
+            'Kokonaiskorko maksettu laina-aikana',
+            'Kokonaislyhennys maksettu laina-aikana',
+            'Asuntolainan kokonaismaksut laina-aikana',
+            'Kokonaisvastike maksettu laina-aikana',
+            'Kokonaisvuokra maksettu laina-aikana',
+            'Sijoitusten kokonaisarvo aktiivisena sijoitusaikana',
+            'Sijoitusten kokonaisarvo passiivisena sijoitusaikana',
+            'Sijoitusten kokonaisarvo sijoitusaikana',
+            'Asunnon arvo kun laina-aika loppuu'
+        ],
+        'Asuntolaina skenaario (€)': [
+            amortization['total_interest_paid'],
+            amortization['total_principal_paid'],
+            amortization['total_mortgage_payments'],
+            values['maintenance']['total_vastike_paid'],
+            np.nan,  # Not applicable for loan scenario
+            investments['total_active'][0],
+            investments['total_passive'][0],
+            investments['total'][0],
+            net_worth['property_value_end']
+        ],
+        'Vuokraus skenaario (€)': [
+            np.nan,  # Not applicable for loan scenario
+            np.nan,  # Not applicable for loan scenario
+            np.nan,  # Not applicable for loan scenario
+            np.nan,  # Not applicable for loan scenario
+            rent['total_rent_paid'],
+            investments['total_active'][1],
+            investments['total_passive'][1],
+            investments['total'][1],
+            np.nan  # Not applicable for rent scenario
+        ]
+    }
+
+    summary_df = pd.DataFrame(summary_data)
+
+    # Format numbers using the Finnish formatting function, handling NaN appropriately
+    return format_frame_finnish(summary_df, ['Asuntolaina skenaario (€)', 'Vuokraus skenaario (€)'])
+
+summary_df = render_once(
+    ('summary', tokens['amortization'], tokens['maintenance'], tokens['rent'], tokens['investments'], tokens['net_worth']),
+    build_summary_df
+)
 
 # Display Summary Totals Table without Index Columns
 st.write('### Yhteenveto')
@@ -270,464 +259,472 @@ st.dataframe(summary_df)
 # Plotting the main financial comparison
 st.write('### Taloudellinen vertailu laina-ajan yli')
 
-fig, ax = plt.subplots(figsize=(10, 6))
-ax.plot(years, cumulative_mortgage_cost, label='Asuntolainan kokonaissumma', color='#1f77b4')
-ax.plot(years, cumulative_annual_interest, label='Asuntolainan korko', color='#aec7e8', linestyle='--')
-ax.plot(years, cumulative_annual_principal, label='Asuntolainan lyhennys', color='#ffbb78', linestyle='--')
-ax.plot(years, adjusted_cumulative_investment, label='Sijoitukset', color='#2ca02c')
-ax.plot(years, cumulative_rent, label='Vuokra', color='#ff7f0e')
-
-ax.set_xlabel('Vuodet')
-ax.set_ylabel('Kumulatiivinen summa (€)')
-ax.set_title('Taloudellinen vertailu laina-ajan yli')
-ax.legend()
-ax.grid(True)
-
-# Format y-axis with Finnish number formatting
-ax.yaxis.set_major_formatter(mtick.FuncFormatter(lambda x, pos: format_number_finnish(x)))
-
-st.pyplot(fig)
+main_chart = charts.line_chart(
+    'Taloudellinen vertailu laina-ajan yli', 'Vuodet', 'Kumulatiivinen summa (€)', years, [
+        charts.series('Asuntolainan kokonaissumma', amortization['cumulative_mortgage_cost'], '#1f77b4'),
+        charts.series('Asuntolainan korko', amortization['cumulative_annual_interest'], '#aec7e8', dashed=True),
+        charts.series('Asuntolainan lyhennys', amortization['cumulative_annual_principal'], '#ffbb78', dashed=True),
+        charts.series('Sijoitukset', investments['adjusted'][0], '#2ca02c'),
+        charts.series('Vuokra', rent['cumulative_rent'], '#ff7f0e'),
+    ]
+)
+show_chart(('main_chart', tokens['amortization'], tokens['rent'], tokens['investments']), main_chart, 'vertailu.png')
 
 # Investment Growth Plot
 st.write('### Sijoituksen kasvu eläkeikään asti')
 
-fig2, ax2 = plt.subplots(figsize=(10, 6))
-ax2.plot(investment_years, cumulative_investment, label='Sijoituksen arvo ilman erotusta', color='#2ca02c')
-if additional_monthly_investment > 0:
-    ax2.plot(investment_years, cumulative_investment_rent, label='Sijoituksen arvo lisätyllä erolla', color='#d62728')
-
-ax2.set_xlabel('Vuodet')
-ax2.set_ylabel('Sijoituksen arvo (€)')
-ax2.set_title('Sijoituksen vertailu')
-ax2.legend()
-ax2.grid(True)
-
-# Format y-axis with Finnish number formatting
-ax2.yaxis.set_major_formatter(mtick.FuncFormatter(lambda x, pos: format_number_finnish(x)))
-
-st.pyplot(fig2)
+investment_series = [charts.series('Sijoituksen arvo ilman erotusta', investments['cumulative'][0], '#2ca02c')]
+if cash_flow['additional_monthly_investment'] > 0:
+    investment_series.append(charts.series('Sijoituksen arvo lisätyllä erolla', investments['cumulative'][1], '#d62728'))
+investment_chart = charts.line_chart('Sijoituksen vertailu', 'Vuodet', 'Sijoituksen arvo (€)', investment_years, investment_series)
+show_chart(('investment_chart', tokens['investments'], tokens['cash_flow']), investment_chart, 'sijoitukset.png')
 
 # **Defining 'df' Variable for "Vuotuiset arvot (kumulatiivinen summa)"**
-# Create DataFrame for Annual Values Table
-data = {
-    'Vuosi': years,
-    'Asuntolainan kokonaissumma (€)': cumulative_mortgage_cost.astype(float),
-    'Asuntolainan korko (€)': cumulative_annual_interest.astype(float),
-    'Asuntolainan lyhennys (€)': cumulative_annual_principal.astype(float),
-    'Sijoitukset (€)': adjusted_cumulative_investment.astype(float),
-    'Vuokra (€)': cumulative_rent.astype(float)
-}
-df = pd.DataFrame(data)
+def build_annual_values_df():
+    # Create DataFrame for Annual Values Table
+    data = {
+        'Vuosi': years,
+        'Asuntolainan kokonaissumma (€)': amortization['cumulative_mortgage_cost'].astype(float),
+        'Asuntolainan korko (€)': amortization['cumulative_annual_interest'].astype(float),
+        'Asuntolainan lyhennys (€)': amortization['cumulative_annual_principal'].astype(float),
+        'Sijoitukset (€)': investments['adjusted'][0].astype(float),
+        'Vuokra (€)': rent['cumulative_rent'].astype(float)
+    }
+    df = pd.DataFrame(data)
+
+    # Format numbers using the Finnish formatting function
+    df = format_frame_finnish(df, [
+        'Asuntolainan kokonaissumma (€)',
+        'Asuntolainan korko (€)',
+        'Asuntolainan lyhennys (€)',
+        'Sijoitukset (€)',
+        'Vuokra (€)'
+    ])
+    return df.reset_index(drop=True)
 
-# Format numbers using the Finnish formatting function
-df['Asuntolainan kokonaissumma (€)'] = df['Asuntolainan kokonaissumma (€)'].apply(lambda x: format_number_finnish(x))
-df['Asuntolainan korko (€)'] = df['Asuntolainan korko (€)'].apply(lambda x: format_number_finnish(x))
-df['Asuntolainan lyhennys (€)'] = df['Asuntolainan lyhennys (€)'].apply(lambda x: format_number_finnish(x))
-df['Sijoitukset (€)'] = df['Sijoitukset (€)'].apply(lambda x: format_number_finnish(x))
-df['Vuokra (€)'] = df['Vuokra (€)'].apply(lambda x: format_number_finnish(x))
+annual_values_df = render_once(
+    ('annual_values', tokens['amortization'], tokens['rent'], tokens['investments']),
+    build_annual_values_df
+)
 
 # Display Annual Values Table without Index Columns
 st.write('### Vuotuiset arvot (kumulatiivinen summa)')
-annual_values_df = df.reset_index(drop=True)
 st.dataframe(annual_values_df)
 
 # Net Salary Allocation Calculations
 
-# Mortgage scenario calculations
-
-# Get the first month's principal and interest payments
-monthly_principal_payment = monthly_principals[0]
-monthly_interest_payment = monthly_interests[0]
-total_monthly_mortgage_payment = monthly_payment  # Total monthly mortgage payment
-
-# Calculate percentages of net salary
-if net_salary > 0:
-    percentage_principal = (monthly_principal_payment / net_salary) * 100
-    percentage_interest = (monthly_interest_payment / net_salary) * 100
-    percentage_vastike = (vastike / net_salary) * 100  # Percentage for vastike
-    percentage_total_mortgage = ((total_monthly_mortgage_payment + vastike) / net_salary) * 100
-    percentage_investment_mortgage = (monthly_investment / net_salary) * 100
-    total_expenses_mortgage = total_monthly_mortgage_payment + vastike + monthly_investment  # Added vastike
-    percentage_left_mortgage = 100 - ((total_expenses_mortgage / net_salary) * 100)
-    amount_left_mortgage = net_salary - total_expenses_mortgage
-else:
-    percentage_principal = percentage_interest = percentage_total_mortgage = percentage_vastike = percentage_investment_mortgage = percentage_left_mortgage = amount_left_mortgage = 0
+if net_salary <= 0:
     st.error("Nettopalkan on oltava suurempi kuin nolla prosenttilaskelmia varten.")
 
-# Create a DataFrame for the mortgage scenario
-mortgage_data = {
-    'Erä': [
-        'Kuukausittainen lyhennysmaksu',
-        'Kuukausittainen korkomaksu',
-        'Kuukausittainen vastike',  # Vastike
-        'Asuntolainan kokonaiskuukausimaksu',
-        'Kuukausittainen sijoitus',
-        'Jäljelle jäävä summa kulujen jälkeen'
-    ],
-    'Nettopalkan prosenttiosuus (%)': [
-        format_number_finnish(percentage_principal, is_percentage=True),
-        format_number_finnish(percentage_interest, is_percentage=True),
-        format_number_finnish(percentage_vastike, is_percentage=True),  # Percentage for vastike
-        format_number_finnish(percentage_total_mortgage, is_percentage=True),
-        format_number_finnish(percentage_investment_mortgage, is_percentage=True),
-        format_number_finnish(percentage_left_mortgage, is_percentage=True)
-    ],
-    'Summa (€)': [
-        format_number_finnish(monthly_principal_payment),
-        format_number_finnish(monthly_interest_payment),
-        format_number_finnish(vastike),  # Vastike
-        format_number_finnish(total_monthly_mortgage_payment + vastike),  # Total mortgage + vastike
-        format_number_finnish(monthly_investment),
-        format_number_finnish(amount_left_mortgage)
-    ]
-}
-
-mortgage_df = pd.DataFrame(mortgage_data)
+def build_mortgage_df():
+    # Create a DataFrame for the mortgage scenario
+    mortgage_data = {
+        'Erä': [
+            'Kuukausittainen lyhennysmaksu',
+            'Kuukausittainen korkomaksu',
+            'Kuukausittainen vastike',  # Vastike
+            'Asuntolainan kokonaiskuukausimaksu',
+            'Kuukausittainen sijoitus',
+            'Jäljelle jäävä summa kulujen jälkeen'
+        ],
+        'Nettopalkan prosenttiosuus (%)': [
+            salary_allocation['percentage_principal'],
+            salary_allocation['percentage_interest'],
+            salary_allocation['percentage_vastike'],  # Percentage for vastike
+            salary_allocation['percentage_total_mortgage'],
+            salary_allocation['percentage_investment_mortgage'],
+            salary_allocation['percentage_left_mortgage']
+        ],
+        'Summa (€)': [
+            amortization['monthly_principals'][0],
+            amortization['monthly_interests'][0],
+            vastike,  # Vastike
+            amortization['monthly_payment'] + vastike,  # Total mortgage + vastike
+            monthly_investment,
+            salary_allocation['amount_left_mortgage']
+        ]
+    }
+
+    mortgage_df = pd.DataFrame(mortgage_data)
+
+    # Format whole columns at once
+    mortgage_df = format_frame_finnish(mortgage_df, ['Nettopalkan prosenttiosuus (%)'], is_percentage=True)
+    return format_frame_finnish(mortgage_df, ['Summa (€)'])
+
+mortgage_df = render_once(
+    ('mortgage_allocation', tokens['amortization'], tokens['salary_allocation'], vastike, monthly_investment),
+    build_mortgage_df
+)
 
 # Display the mortgage scenario table without Index Columns
 st.write('### Asuntolaina skenaario (€) - nettopalkan jakautuminen')
 st.dataframe(mortgage_df)
 
-# Renting scenario calculations
-
-# Calculate percentages of net salary
-if net_salary > 0:
-    percentage_rent = (monthly_rent / net_salary) * 100
-    percentage_investment_rent = (monthly_investment / net_salary) * 100
-    total_expenses_rent = monthly_rent + monthly_investment
-    percentage_left_rent = 100 - ((total_expenses_rent / net_salary) * 100)
-    amount_left_rent = net_salary - total_expenses_rent
-else:
-    percentage_rent = percentage_investment_rent = percentage_left_rent = amount_left_rent = 0
+if net_salary <= 0:
     st.error("Nettopalkan on oltava suurempi kuin nolla prosenttilaskelmia varten.")
 
-# Create a DataFrame for the renting scenario
-rent_data = {
-    'Erä': [
-        'Kuukausittainen vuokramaksu',
-        'Kuukausittainen sijoitus',
-        'Jäljelle jäävä summa kulujen jälkeen'
-    ],
-    'Nettopalkan prosenttiosuus (%)': [
-        format_number_finnish(percentage_rent, is_percentage=True),
-        format_number_finnish(percentage_investment_rent, is_percentage=True),
-        format_number_finnish(percentage_left_rent, is_percentage=True)
-    ],
-    'Summa (€)': [
-        format_number_finnish(monthly_rent),
-        format_number_finnish(monthly_investment),
-        format_number_finnish(amount_left_rent)
-    ]
-}
-
-# **Include additional investments in the rent scenario if applicable**
-if additional_monthly_investment > 0:
-    rent_data['Erä'].extend([
-        'Kuukausittainen lisäsijoitus',
-        'Sijoitusten kokonaisarvo vuokrausskenaariossa'
-    ])
-    rent_data['Nettopalkan prosenttiosuus (%)'].extend([
-        format_number_finnish((additional_monthly_investment / net_salary) * 100, is_percentage=True),
-        format_number_finnish((total_investment_rent / net_salary) * 100, is_percentage=True)
-    ])
-    rent_data['Summa (€)'].extend([
-        format_number_finnish(additional_monthly_investment),
-        format_number_finnish(total_investment_rent)
-    ])
-
-rent_df = pd.DataFrame(rent_data)
+def build_rent_df():
+    # Create a DataFrame for the renting scenario
+    rent_data = {
+        'Erä': [
+            'Kuukausittainen vuokramaksu',
+            'Kuukausittainen sijoitus',
+            'Jäljelle jäävä summa kulujen jälkeen'
+        ],
+        'Nettopalkan prosenttiosuus (%)': [
+            salary_allocation['percentage_rent'],
+            salary_allocation['percentage_investment_rent'],
+            salary_allocation['percentage_left_rent']
+        ],
+        'Summa (€)': [
+            monthly_rent,
+            monthly_investment,
+            salary_allocation['amount_left_rent']
+        ]
+    }
+
+    # **Include additional investments in the rent scenario if applicable**
+    if cash_flow['additional_monthly_investment'] > 0:
+        rent_data['Erä'].extend([
+            'Kuukausittainen lisäsijoitus',
+            'Sijoitusten kokonaisarvo vuokrausskenaariossa'
+        ])
+        rent_data['Nettopalkan prosenttiosuus (%)'].extend([
+            salary_allocation['percentage_additional_investment'],
+            salary_allocation['percentage_investment_total_rent']
+        ])
+        rent_data['Summa (€)'].extend([
+            cash_flow['additional_monthly_investment'],
+            investments['total'][1]
+        ])
+
+    rent_df = pd.DataFrame(rent_data)
+
+    # Format whole columns at once
+    rent_df = format_frame_finnish(rent_df, ['Nettopalkan prosenttiosuus (%)'], is_percentage=True)
+    return format_frame_finnish(rent_df, ['Summa (€)'])
+
+rent_df = render_once(
+    ('rent_allocation', tokens['salary_allocation'], tokens['cash_flow'], tokens['investments'], monthly_rent, monthly_investment),
+    build_rent_df
+)
 
 # Display the renting scenario table without Index Columns
 st.write('### Vuokraus skenaario (€) - nettopalkan jakautuminen')
 st.dataframe(rent_df)
 
-# Calculate the difference between "Jäljelle jäävä summa kulujen jälkeen" after renting and taking the loan
-difference = amount_left_rent - amount_left_mortgage
+# Housing costs as a share of the net salary over the loan term, when the salary or the vastike grows
+if net_salary > 0 and (salary_growth or vastike_growth):
+    salary_trend = values['salary']
+    st.write('### Asumiskulujen osuus nettopalkasta laina-aikana')
+    st.write(
+        f"Lainan maksuerä ja vastike ovat ensimmäisenä vuonna {format_number_finnish(salary_trend['housing_cost_share'][0], is_percentage=True)} "
+        f"ja viimeisenä vuonna {format_number_finnish(salary_trend['housing_cost_share'][-1], is_percentage=True)} nettopalkasta."
+    )
+    salary_trend_chart = charts.line_chart(
+        'Asumiskulujen osuus nettopalkasta', 'Vuodet', 'Osuus nettopalkasta (%)', np.arange(1, loan_term + 1), [
+            charts.series('Lainan maksuerä ja vastike', salary_trend['housing_cost_share'], '#1f77b4'),
+        ]
+    )
+    show_chart(('salary_trend_chart', tokens['salary']), salary_trend_chart, 'asumiskulujen_osuus.png')
+
 st.write('### Ero nettosummissa kulujen jälkeen')
-if difference > 0:
-    st.write(f"Ero asuntolaina- ja vuokraus-skenaarioiden välillä on: **€{format_number_finnish(difference)}**")
+if cash_flow['difference'] > 0:
+    st.write(f"Ero asuntolaina- ja vuokraus-skenaarioiden välillä on: **€{format_number_finnish(cash_flow['difference'])}**")
     
-    # Add the difference to the existing monthly investment
-    new_monthly_investment = monthly_investment + difference
-    st.write(f"Lisätään tämä ero kuukausittaiseen sijoitukseen: **€{format_number_finnish(difference)}**")
+    st.write(f"Lisätään tämä ero kuukausittaiseen sijoitukseen: **€{format_number_finnish(cash_flow['difference'])}**")
     
-    # New investment calculations with increased monthly investment
-    cumulative_investment_new = []
-    for n in range(1, total_investment_period + 1):
-        if n <= active_investment_period:
-            # During active investment period
-            if annual_return_rate != 0:
-                future_value_new = starting_amount * (1 + annual_return_rate) ** n + \
-                    new_monthly_investment * 12 * ((1 + annual_return_rate) ** n - 1) / annual_return_rate
-            else:
-                future_value_new = starting_amount + new_monthly_investment * 12 * n
-        else:
-            # During passive investment period
-            years_after_active = n - active_investment_period
-            value_at_end_of_active_new = cumulative_investment_new[active_investment_period - 1]
-            future_value_new = value_at_end_of_active_new * (1 + annual_return_rate) ** years_after_active
-        cumulative_investment_new.append(future_value_new)
-
-    cumulative_investment_new = np.array(cumulative_investment_new)
-
-    # Adjust investment array to match the loan term years
-    if total_investment_period < loan_term:
-        adjusted_cumulative_investment_new = np.append(
-            cumulative_investment_new,
-            [cumulative_investment_new[-1]] * (loan_term - total_investment_period)
-        )
-    elif total_investment_period > loan_term:
-        adjusted_cumulative_investment_new = cumulative_investment_new[:loan_term]
-    else:
-        adjusted_cumulative_investment_new = cumulative_investment_new
-
-    # Total investment amount at the end of the total investment period
-    total_investment_new = cumulative_investment_new[-1]
-
-    # Total investment over active and passive periods
-    if active_investment_period > 0:
-        total_investment_active_new = cumulative_investment_new[active_investment_period - 1]
-    else:
-        total_investment_active_new = 0
-
-    total_investment_passive_new = total_investment_new - total_investment_active_new
-
     # Plot the investment scenarios
     st.write('### Sijoituksen vertailu')
 
-    fig_new, ax_new = plt.subplots(figsize=(10, 6))
-    ax_new.plot(investment_years, cumulative_investment, label='Sijoituksen arvo ilman erotusta', color='#2ca02c')
-    ax_new.plot(investment_years, cumulative_investment_new, label='Sijoituksen arvo lisätyllä erolla', color='#d62728')
-    
-    ax_new.set_xlabel('Vuodet')
-    ax_new.set_ylabel('Sijoituksen arvo (€)')
-    ax_new.set_title('Sijoituksen vertailu')
-    ax_new.legend()
-    ax_new.grid(True)
-    
-    # Format y-axis with Finnish number formatting
-    ax_new.yaxis.set_major_formatter(mtick.FuncFormatter(lambda x, pos: format_number_finnish(x)))
-    
-    st.pyplot(fig_new)
-    
-    # Compute net worth for comparison
-    property_value_end = initial_property_value * (1 + 0.02) ** loan_term  # Updated property value calculation
-    net_worth_house = total_investment + property_value_end
-    net_worth_rent = total_investment_new
-    difference_net_worth = net_worth_house - net_worth_rent
+    comparison_chart = charts.line_chart(
+        'Sijoituksen vertailu', 'Vuodet', 'Sijoituksen arvo (€)', investment_years, [
+            charts.series('Sijoituksen arvo ilman erotusta', investments['cumulative'][0], '#2ca02c'),
+            charts.series('Sijoituksen arvo lisätyllä erolla', investments['cumulative'][2], '#d62728'),
+        ]
+    )
+    show_chart(('comparison_chart', tokens['investments']), comparison_chart, 'sijoitusvertailu.png')
 
 else:
     st.write("Asuntolaina- ja vuokrausskenaarioiden välillä ei ole ylimääräistä rahaa sijoitettavaksi.")
-    property_value_end = initial_property_value * (1 + 0.02) ** loan_term  # Updated property value calculation
-    net_worth_house = total_investment + property_value_end
-    net_worth_rent = total_investment  # No extra investment
-    difference_net_worth = net_worth_house - net_worth_rent
-
-# Function to generate financial advice
-def generate_financial_advice(
-    total_mortgage_payments,
-    total_rent_paid,
-    total_investment,
-    amount_left_mortgage,
-    amount_left_rent,
-    net_salary,
-    total_expenses_mortgage,
-    total_expenses_rent,
-    total_investment_active,
-    total_investment_passive,
-    passive_investment_period,
-    active_investment_period,
-    difference,
-    total_investment_new,
-    total_investment_active_new,
-    total_investment_passive_new,
-    property_value_end,
-    net_worth_house,
-    net_worth_rent,
-    difference_net_worth,
-    total_vastike_paid  # New parameter for vastike
-):
-    # Analyze the financial data and generate advice
-    advice = ""
-    
-    # Compare renting and buying
-    if (total_mortgage_payments + total_vastike_paid) < total_rent_paid:
-        advice += "Asuntolainan kokonaismaksut ja vastikkeet ovat pienemmät kuin maksettu vuokra laina-aikana. Oman asunnon ostaminen voi olla taloudellisesti kannattavampaa pitkällä aikavälillä.\n\n"
-    else:
-        advice += "Maksettu vuokra laina-aikana on pienempi kuin asuntolainan kokonaismaksut ja vastikkeet. Vuokraaminen saattaa olla edullisempaa tämän ajanjakson aikana.\n\n"
-    
-    # Compare total rent paid with total interest paid during loan period
-    rent_vs_interest_difference = abs(total_rent_paid - (total_mortgage_payments + total_vastike_paid))
-    advice += f"Kokonaisvuokra maksettu laina-aikana on {format_number_finnish(total_rent_paid)} €, kun taas kokonaiskorko ja vastike maksettu laina-aikana on {format_number_finnish(total_mortgage_payments + total_vastike_paid)} €. "
-    if rent_vs_interest_difference <= (total_mortgage_payments + total_vastike_paid) * 0.1:  # Within 10%
-        advice += "Koska vuokra- ja korko-vastike-maksujen erotus on pieni, asuntolainan ottaminen ja asunnon ostaminen voi olla järkevää.\n\n"
-    else:
-        advice += "Koska vuokra- ja korko-vastike-maksujen erotus on merkittävä, kannattaa harkita tarkkaan asuntolainan ottamista.\n\n"
-    
-    # Comment on monthly budget distribution
-    mortgage_budget_percentage = ((total_expenses_mortgage) / net_salary) * 100
-    rent_budget_percentage = ((total_expenses_rent) / net_salary) * 100
-    
-    advice += f"Asuntolainaskenaariossa kuukausittaiset kulut ovat {format_number_finnish(total_expenses_mortgage)} € (laina- ja sijoituskulut), mikä on {format_number_finnish(mortgage_budget_percentage, is_percentage=True)} nettokuukausituloistasi.\n"
-    advice += f"Vuokrausskenaariossa kuukausittaiset kulut ovat {format_number_finnish(total_expenses_rent)} € (vuokra- + sijoituskulut), mikä on {format_number_finnish(rent_budget_percentage, is_percentage=True)} nettokuukausituloistasi.\n\n"
-    
-    # Discuss net wealth during loan period and lifetime
-    advice += f"Aktiivisen sijoitusajan ({active_investment_period} vuotta) aikana sijoitustesi arvo kasvaa {format_number_finnish(total_investment_active)} €.\n"
-    advice += f"Passiivisen sijoitusajan ({passive_investment_period} vuotta) aikana sijoitustesi arvo kasvaa {format_number_finnish(total_investment_passive)} €.\n"
-    advice += f"Sijoitusten kokonaisarvo sijoitusajan lopussa on {format_number_finnish(total_investment)} €.\n\n"
-    
-    # Add information about the difference and new investment scenario
-    if difference > 0:
-        advice += f"Vuokraskenaariossa {format_number_finnish(difference)} € enemmän on sijoitettu kuukausittaain. Tämä ylimääräinen kuukausittainen sijoitus kasvattaa sijoitustesi kokonaisarvoa siihen asti, kunnes pääset eläkkeelle.\n"
-        # Calculate percentage increase in net worth due to the difference
-        if total_investment > 0:
-            percentage_increase = ((total_investment_new - total_investment) / total_investment) * 100
-            advice += f"Sijoitustesi kokonaisarvo lisätyllä erolla on {format_number_finnish(total_investment_new)} €, mikä on {format_number_finnish(percentage_increase)} % enemmän kuin ilman erotusta.\n\n"
-        else:
-            advice += f"Sijoitustesi kokonaisarvo lisätyllä erolla on {format_number_finnish(total_investment_new)} €.\n\n"
-    
-    # Add information about property value with bold text
-    advice += f"**Asunnon arvo kun laina-aika loppuu:** {format_number_finnish(property_value_end)} €.\n\n"
-    
-    # Compare net worth in both scenarios
-    advice += "### Nettovarallisuuden vertailu\n\n"
-    if net_worth_house > net_worth_rent:
-        difference_net_worth_formatted = format_number_finnish(abs(difference_net_worth))
-        advice += f"Asuntolaina- ja sijoitusskenaariossa nettovarallisuutesi eläkkeelle jäätyäsi on suurempi kuin vuokraus- ja sijoitusskenaariossa. Ero on **€{difference_net_worth_formatted}**.\n\n"
-    elif net_worth_house < net_worth_rent:
-        difference_net_worth_formatted = format_number_finnish(abs(difference_net_worth))
-        advice += f"Vuokraus- ja sijoitusskenaariossa nettovarallisuutesi eläkkeelle jäätyäsi on suurempi kuin asuntolaina- ja sijoitusskenaariossa. Ero on **€{difference_net_worth_formatted}**.\n\n"
+
+# Variable-rate loan on simulated reference rate paths
+if variable_loan:
+    st.write('### Vaihtuvakorkoisen lainan kuukausierän vaihteluväli')
+
+    variable_rate_token = (
+        'variable_rate', loan_amount, loan_term, net_salary, loan_margin, reference_rate,
+        long_term_reference_rate, reference_rate_volatility, reset_months
+    )
+    variable_loan_result = render_once(variable_rate_token, lambda: variable_rate.simulate_variable_rate(
+        loan_amount,
+        loan_margin,
+        loan_term,
+        reference_rate,
+        reset_months,
+        net_salary,
+        long_term_rate=long_term_reference_rate,
+        volatility=reference_rate_volatility
+    ))
+
+    # Average monthly payment of each year
+    payment_bands = variable_loan_result['payment_bands'].reshape(-1, loan_term, 12).mean(axis=2)
+    variable_rate_chart = charts.band_chart(
+        'Kuukausierä vaihtuvalla korolla', 'Vuodet', 'Kuukausierä (€)', years, [
+            charts.band('Kuukausierä (P5-P95)', payment_bands[0], payment_bands[1], payment_bands[2], '#1f77b4'),
+        ]
+    )
+    show_chart(variable_rate_token + ('chart',), variable_rate_chart, 'vaihtuvakorko.png')
+
+    def build_variable_rate_df():
+        variable_rate_df = pd.DataFrame({
+            'Persentiili': [f'P{p}' for p in variable_loan_result['percentiles']],
+            'Korot yhteensä (€)': variable_loan_result['total_interest_percentiles'],
+            'Suurin kuukausierä nettopalkasta (%)': variable_loan_result['worst_payment_ratio_percentiles'],
+        })
+        variable_rate_df = format_frame_finnish(variable_rate_df, ['Korot yhteensä (€)'])
+        return format_frame_finnish(variable_rate_df, ['Suurin kuukausierä nettopalkasta (%)'], is_percentage=True)
+
+    st.dataframe(render_once(variable_rate_token + ('table',), build_variable_rate_df))
+
+# Buy vs rent from every historical start month
+if historical_backtest:
+    st.write('### Historiallinen testaus')
+    history = load_history()
+    if history is None:
+        st.info('Historiallista tuottoaineistoa ei ole asennettu. Luo se kuukausittaisista indekseistä komennolla `python backtest.py indeksit.csv`.')
+    elif len(history) < max(PENSION_AGE - age, loan_term) * 12:
+        st.info('Historiallinen aineisto on liian lyhyt näin pitkälle sijoitusajalle.')
     else:
-        advice += "Asuntolaina- ja vuokrausskenaarioissa nettovarallisuutesi eläkkeelle jäätyäsi on sama.\n\n"
-    
-    advice += "\n"
-    # Consolidated disclaimers at the end
-    
-    # Suggest using extra money for investments based on scenarios
-    advice += "\n### Suositukset osto- ja vuokrausskenaareihin perustuen\n\n"
-    
-    # Scenario 1: Low Percentage of Income Spent on Mortgage
-    if mortgage_budget_percentage < 30:
-        advice += "#### Hyvä tilanne ottaa asuntolaina\n"
-        advice += "- **Nettotulo:** Vähän yli 3 000 € kuukaudessa.\n"
-        advice += "- **Asuntolainan osuus nettotulosta:** Alle 30 %, mikä tarkoittaa, että sinulla on riittävästi tuloja kattamaan lainan, vastikkeet ja muiden kulujen lisäksi myös sijoituksia.\n"
-        advice += "- **Oma omistus laina-aikana ja laina-aika päätyttyä:** Asunto on omistuksessasi, etkä joudu maksamaan lainan korkoja enää.\n\n"
-    
-    # Scenario 2: Moderate Percentage of Income Spent on Mortgage
-    if 30 <= mortgage_budget_percentage < 40:
-        advice += "#### Kohtalainen tilanne ottaa asuntolaina\n"
-        advice += "- **Nettotulo:** Keskitasoinen, riittää lainan kattamiseen, mutta sijoituksiin jää vähemmän rahaa.\n"
-        advice += "- **Asuntolainan osuus nettotulosta:** 30-40 %, mikä on sallittua, mutta varo liiallista sitoutumista talouteen.\n\n"
-    
-    # Scenario 3: High Rent vs. Interest Comparison
-    if rent_vs_interest_difference <= (total_mortgage_payments + total_vastike_paid) * 0.1:
-        advice += "#### Vuokra ja korko ovat samansuuruiset\n"
-        advice += "- Vuokra- ja korko-vastike-maksujen lähellä oleva ero tekee asuntolainan ottamisesta ja asunnon ostamisesta houkuttelevan vaihtoehdon, sillä omistusasunto luo pitkäaikaista varallisuutta.\n\n"
-    
-    # Scenario 4: Continuous Rent vs. Ownership Post-Loan
-    if loan_term > 20:  # Assuming long-term ownership
-        advice += "#### Pitkäaikainen omistusasunto\n"
-        advice += "- Laina-aikana maksamasi korkojen ja vastikkeiden jälkeen sinulla on oma asunto ilman kuukausittaisia lainakuluja, mikä voi merkittävästi vähentää kuukausittaisia kuluja eläkkeelle jäätyttyäsi.\n\n"
-    
-    # Scenario 5: Investment Growth Potential
-    if difference > 0 and (total_investment_new > total_investment):
-        advice += "#### Investointimahdollisuudet\n"
-        advice += "- Lisätty sijoitus ero aiheuttaa merkittävän kasvun sijoitustesi arvossa, mikä parantaa nettovarallisuuttasi merkittävästi eläkkeelle päästyäsi.\n\n"
-    
-    # Scenario 6: Rent Continuity
-    if net_worth_house > net_worth_rent:
-        advice += "#### Vuokra jatkuvasti elämän aikana\n"
-        advice += "- Jos jatkat vuokraamista elämän aikana, kuukausittaiset vuokrakulut jatkuvat, kun taas omistusasunnossa maksat vain kiinteitä lainakuluja ja vastikkeita laina-aikan jälkeen.\n\n"
-    
-    # Scenario 7: Financial Stability and Ownership Security
-    advice += "#### Taloudellinen vakaus ja omistuksen turva\n"
-    advice += "- Omistusasunto tarjoaa taloudellisen vakauden, sillä se ei ole riippuvainen vuokranantajan päätöksistä, kuten vuokrankorotuksista tai asunnon myymisestä.\n\n"
-    
-    return advice
-
-# Call the advice function with the new parameter for vastike
-advice_text = generate_financial_advice(
-    total_mortgage_payments,
-    total_rent_paid,
-    total_investment,
-    amount_left_mortgage,
-    amount_left_rent,
-    net_salary,
-    total_expenses_mortgage,
-    total_expenses_rent,
-    total_investment_active,
-    total_investment_passive,
-    passive_investment_period,
-    active_investment_period,
-    difference,
-    total_investment_new if additional_monthly_investment > 0 else 0,
-    total_investment_active_new if additional_monthly_investment > 0 else 0,
-    total_investment_passive_new if additional_monthly_investment > 0 else 0,
-    property_value_end,
-    net_worth_house,
-    net_worth_rent,
-    difference_net_worth,
-    total_vastike_paid  # Passing the vastike
-)
+        backtest_token = (
+            'backtest', tokens['cash_flow'], starting_amount, monthly_investment, active_investment_period,
+            age, initial_property_value, loan_term
+        )
+        backtest_result = render_once(backtest_token, lambda: backtest.backtest(
+            history,
+            starting_amount,
+            monthly_investment,
+            max(cash_flow['difference'], 0),
+            active_investment_period,
+            PENSION_AGE - age,
+            initial_property_value,
+            loan_term
+        ))
+
+        start_months = backtest_result['start_months']
+        st.write(
+            f"Aloituskuukausia {len(start_months)} ({start_months[0] // 100}–{start_months[-1] // 100}). "
+            f"Vuokraus päihittää asuntolainan {format_number_finnish(backtest_result['probability_rent_wins'] * 100, is_percentage=True)} aloituskuukausista."
+        )
+        backtest_chart = charts.line_chart(
+            'Nettovarallisuuden ero aloitusvuoden mukaan', 'Aloitusvuosi', 'Ero (€)', start_months // 100 + (start_months % 100 - 1) / 12, [
+                charts.series('Asuntolaina - vuokraus', backtest_result['difference_net_worth'], '#1f77b4'),
+            ]
+        )
+        show_chart(backtest_token + ('chart',), backtest_chart, 'historiallinen_testaus.png')
+
+        def build_backtest_df():
+            backtest_df = pd.DataFrame({
+                'Persentiili': [f'P{p}' for p in backtest_result['percentiles']],
+                'Nettovarallisuus asuntolainalla (€)': backtest_result['net_worth_house_percentiles'],
+                'Nettovarallisuus vuokralla (€)': backtest_result['net_worth_rent_percentiles'],
+                'Ero (€)': backtest_result['difference_percentiles'],
+            })
+            return format_frame_finnish(backtest_df, ['Nettovarallisuus asuntolainalla (€)', 'Nettovarallisuus vuokralla (€)', 'Ero (€)'])
+
+        st.dataframe(render_once(backtest_token + ('table',), build_backtest_df))
+
+# Extra payments and payment holidays, compared with the plain annuity
+if extra_repayment:
+    st.write('### Ylimääräiset lyhennykset ja lyhennysvapaa')
+
+    prepayment_token = (
+        'prepayment', tokens['amortization'], investment_rate, lump_sum, lump_sum_year,
+        monthly_extra, holiday_year, holiday_months
+    )
 
-# Display the financial advice
-st.write('### Henkilökohtainen taloudellinen analyysi')
-st.write(advice_text)
+    def build_prepayment():
+        n_months = loan_term * 12
+        extra_payments = prepayment.extra_payment_vector(
+            n_months, {(lump_sum_year - 1) * 12 + 1: lump_sum}, monthly=monthly_extra
+        )
+        holidays = prepayment.holiday_vector(n_months, (holiday_year - 1) * 12 + 1, holiday_months)
+        schedule = prepayment.prepayment_schedule(loan_amount, loan_rate, loan_term, extra_payments, holidays)
+        schedule['investable_cash_value'] = prepayment.investable_cash_value(schedule['investable_cash'], investment_rate)
+        return schedule
+
+    prepayment_result = render_once(prepayment_token, build_prepayment)
+    payoff_years, payoff_months = divmod(int(prepayment_result['payoff_month']), 12)
+    months_saved = int(prepayment_result['months_saved'])
+    st.write(
+        f"Laina on maksettu **{payoff_years} vuoden ja {payoff_months} kuukauden** kuluttua, "
+        f"{abs(months_saved)} kuukautta {'aiemmin' if months_saved >= 0 else 'myöhemmin'} kuin tasaerälainalla."
+    )
 
-# New cell with personal and bank interest calculations
+    def build_prepayment_df():
+        prepayment_df = pd.DataFrame({
+            'Kuvaus': [
+                'Korot yhteensä',
+                'Säästetty korko',
+                'Vapautuva kassavirta sijoitettuna',
+            ],
+            'Summa (€)': [
+                prepayment_result['total_interest'],
+                prepayment_result['interest_saved'],
+                prepayment_result['investable_cash_value'],
+            ]
+        })
+        return format_frame_finnish(prepayment_df, ['Summa (€)'])
+
+    st.dataframe(render_once(prepayment_token + ('table',), build_prepayment_df))
+    st.write("Vapautuva kassavirta on kuukausierien ero tasaerälainaan verrattuna sijoitettuna sijoituksen tuottoprosentilla: ylimääräiset lyhennykset pienentävät sitä ja laina-ajan lyhenemisen jälkeen vapautuvat kuukausierät kasvattavat sitä.")
+
+    # Balance at the end of every year, the horizon covers the years added by the payment holiday
+    prepayment_balance = prepayment.annual_balance(prepayment_result['balance'])
+    prepayment_years = np.arange(1, len(prepayment_balance) + 1)
+    baseline_balance = prepayment.baseline_annual_balance(
+        loan_amount, amortization['cumulative_annual_principal'], len(prepayment_years)
+    )
+    prepayment_chart = charts.line_chart(
+        'Lainan jäljellä oleva pääoma', 'Vuodet', 'Pääoma (€)', prepayment_years, [
+            charts.series('Tasaerälaina', baseline_balance, '#1f77b4'),
+            charts.series('Ylimääräisillä lyhennyksillä', prepayment_balance, '#2ca02c'),
+        ]
+    )
+    show_chart(prepayment_token + ('chart',), prepayment_chart, 'ylimaaraiset_lyhennykset.png')
 
-import numpy as np
+# Monte Carlo simulation of the investments on random annual returns
+if stochastic_returns:
+    st.write('### Sijoitusten vaihteluväli (Monte Carlo)')
 
-# Debt-to-Income (DTI) Ratio
-# Use monthly mortgage payment, maintenance (vastike) as debt payments
-total_monthly_debt_payments = monthly_payment + vastike
-gross_monthly_income = net_salary  # Replace with gross income if available
-dti_ratio = (total_monthly_debt_payments / gross_monthly_income) * 100 if gross_monthly_income > 0 else np.nan
-
-# Loan-to-Value (LTV) Ratio
-ltv_ratio = (loan_amount / initial_property_value) * 100 if initial_property_value > 0 else np.nan
-
-# Monthly Payment Estimate (PITI) - simplified to mortgage + maintenance (vastike)
-total_monthly_piti = monthly_payment + vastike
-piti_percentage_income = (total_monthly_piti / gross_monthly_income) * 100 if gross_monthly_income > 0 else np.nan
-
-# Affordability Index (AI) - should be >1 to be considered affordable
-monthly_expenses = vastike + monthly_investment
-affordability_index = (gross_monthly_income - total_monthly_debt_payments - monthly_expenses) / total_monthly_piti if total_monthly_piti > 0 else np.nan
-
-# Expected Appreciation and Equity Growth
-annual_appreciation_rate = 0.02  # Assuming 2% annual appreciation
-future_property_value = initial_property_value * (1 + annual_appreciation_rate) ** loan_term
-
-# Creating a DataFrame to summarize the calculations
-calculations_data = {
-    "Mittari": [
-        "Velan suhde tuloihin (DTI)",
-        "Laina-suhde arvoon (LTV)",
-        "Kuukausittainen PITI",
-        "PITI nettokuukausitulojen prosenttiosuutena",
-        "Asumisen varaa mittari (AI)",
-        "Odotettu arvonnousu laina-ajan lopussa"
-    ],
-    "Arvo": [
-        f"{format_number_finnish(dti_ratio, is_percentage=True)}" if not np.isnan(dti_ratio) else "-",
-        f"{format_number_finnish(ltv_ratio, is_percentage=True)}" if not np.isnan(ltv_ratio) else "-",
-        f"{format_number_finnish(total_monthly_piti)} €",
-        f"{format_number_finnish(piti_percentage_income, is_percentage=True)}" if not np.isnan(piti_percentage_income) else "-",
-        format_number_finnish(affordability_index) if not np.isnan(affordability_index) else "-",
-        f"{format_number_finnish(future_property_value)} €"
-    ]
-}
+    simulation_token = (
+        'monte_carlo', tokens['cash_flow'], tokens['net_worth'], starting_amount, monthly_investment,
+        active_investment_period, age, return_mean, return_volatility, return_distribution, n_paths, seed
+    )
+    simulation = render_once(simulation_token, lambda: montecarlo.simulate_net_worth(
+        starting_amount,
+        monthly_investment,
+        cash_flow['difference'],
+        net_worth['property_value_end'],
+        return_mean / 100,
+        return_volatility / 100,
+        active_investment_period,
+        PENSION_AGE - age,
+        n_paths=n_paths,
+        distribution=return_distribution,
+        seed=seed
+    ))
+
+    bands = simulation['bands']
+    monte_carlo_bands = [charts.band('Asuntolaina skenaario (P5-P95)', bands[0, 0], bands[0, 1], bands[0, 2], '#2ca02c')]
+    if cash_flow['difference'] > 0:
+        monte_carlo_bands.append(charts.band('Vuokraus skenaario (P5-P95)', bands[1, 0], bands[1, 1], bands[1, 2], '#d62728'))
+    monte_carlo_chart = charts.band_chart(
+        'Sijoituksen arvon vaihteluväli', 'Vuodet', 'Sijoituksen arvo (€)', simulation['investment_years'], monte_carlo_bands
+    )
+    show_chart(simulation_token + ('chart',), monte_carlo_chart, 'montecarlo.png')
+
+    st.write(f"Todennäköisyys, että vuokraus päihittää asuntolainan: **{format_number_finnish(simulation['probability_rent_wins'] * 100, is_percentage=True)}**")
+
+    def build_monte_carlo_df():
+        monte_carlo_df = pd.DataFrame({
+            'Persentiili': [f'P{p}' for p in simulation['percentiles']],
+            'Nettovarallisuus asuntolainalla (€)': simulation['net_worth_house'],
+            'Nettovarallisuus vuokralla (€)': simulation['net_worth_rent'],
+        })
+        return format_frame_finnish(monte_carlo_df, ['Nettovarallisuus asuntolainalla (€)', 'Nettovarallisuus vuokralla (€)'])
 
-# Creating a DataFrame to display
-financial_analysis_df = pd.DataFrame(calculations_data)
+    st.dataframe(render_once(simulation_token + ('table',), build_monte_carlo_df))
+
+# Display the financial advice
+st.write('### Henkilökohtainen taloudellinen analyysi')
+st.write(values['advice'])
+
+def build_financial_analysis_df():
+    # Creating a DataFrame to summarize the calculations
+    dti_ratio = metrics['dti_ratio']
+    ltv_ratio = metrics['ltv_ratio']
+    piti_percentage_income = metrics['piti_percentage_income']
+    affordability_index = metrics['affordability_index']
+
+    calculations_data = {
+        "Mittari": [
+            "Velan suhde tuloihin (DTI)",
+            "Laina-suhde arvoon (LTV)",
+            "Kuukausittainen PITI",
+            "PITI nettokuukausitulojen prosenttiosuutena",
+            "Asumisen varaa mittari (AI)",
+            "Odotettu arvonnousu laina-ajan lopussa"
+        ],
+        "Arvo": [
+            f"{format_number_finnish(dti_ratio, is_percentage=True)}" if not np.isnan(dti_ratio) else "-",
+            f"{format_number_finnish(ltv_ratio, is_percentage=True)}" if not np.isnan(ltv_ratio) else "-",
+            f"{format_number_finnish(metrics['total_monthly_piti'])} €",
+            f"{format_number_finnish(piti_percentage_income, is_percentage=True)}" if not np.isnan(piti_percentage_income) else "-",
+            format_number_finnish(affordability_index) if not np.isnan(affordability_index) else "-",
+            f"{format_number_finnish(net_worth['property_value_end'])} €"
+        ]
+    }
+
+    return pd.DataFrame(calculations_data)
+
+financial_analysis_df = render_once(('financial_analysis', tokens['metrics'], tokens['net_worth']), build_financial_analysis_df)
 
 # Display the analysis table
 st.write("### Taloudelliset mittarit lainapäätöksen tueksi")
 st.dataframe(financial_analysis_df)
 
+def build_solvers_df():
+    # Solve the break-even points and the loan limits for the current inputs
+    solved = {name: float(value[0]) for name, value in solvers.solve_profiles(profile).items()}
+    solvers_data = {
+        "Mittari": [
+            "Vuokra, jolla vuokraus ja asuntolaina ovat yhtä kannattavia",
+            "Sijoitusten tuotto, jolla vuokraus ja asuntolaina ovat yhtä kannattavia",
+            f"Suurin lainasumma, jolla DTI pysyy alle {solvers.MAX_DTI_RATIO} %",
+            f"Lyhin laina-aika, jolla DTI pysyy alle {solvers.MAX_DTI_RATIO} %"
+        ],
+        "Arvo": [
+            f"{format_number_finnish(solved['break_even_rent'])} €" if not np.isnan(solved['break_even_rent']) else "-",
+            format_number_finnish(solved['break_even_investment_rate'], is_percentage=True) if not np.isnan(solved['break_even_investment_rate']) else "-",
+            f"{format_number_finnish(solved['max_affordable_loan'])} €" if not np.isnan(solved['max_affordable_loan']) else "-",
+            f"{int(solved['min_loan_term'])} vuotta" if not np.isnan(solved['min_loan_term']) else "-"
+        ]
+    }
+    return pd.DataFrame(solvers_data)
+
+solvers_df = render_once(('solvers', profile_token), build_solvers_df)
+
+# Display the break-even and affordability table
+st.write("### Tasapainopisteet ja lainanvara")
+st.dataframe(solvers_df)
+
+# Sensitivity heatmap of the net worth difference over two parameters, the other inputs as set in the sidebar
+if show_sensitivity:
+    st.write('### Herkkyysanalyysi: asuntolaina vai vuokraus')
+
+    sensitivity_token = ('sensitivity', profile_token, sensitivity_x, sensitivity_y, sensitivity_resolution)
+    grid = render_once(sensitivity_token, lambda: sensitivity.sensitivity_grid(
+        profile, sensitivity_x, sensitivity_y, sensitivity_resolution
+    ))
+    contour_x, contour_y = sensitivity.break_even_points(grid['x'], grid['y'], grid['difference_net_worth'])
+
+    sensitivity_chart = charts.heatmap(
+        'Nettovarallisuuden ero (asuntolaina - vuokraus)',
+        sensitivity.SENSITIVITY_PARAMETERS[sensitivity_x][0],
+        sensitivity.SENSITIVITY_PARAMETERS[sensitivity_y][0],
+        'Ero (€)',
+        grid['x'],
+        grid['y'],
+        grid['difference_net_worth'],
+        contour_x,
+        contour_y
+    )
+    show_chart(sensitivity_token + ('chart',), sensitivity_chart, 'herkkyys.png')
+    st.write('Sininen alue: asuntolaina tuottaa suuremman nettovarallisuuden. Punainen alue: vuokraus tuottaa suuremman nettovarallisuuden. Musta viiva on tasapainopiste.')
+
 # Abbreviations and definitions in Finnish and English
-st.write("""
+st.write(f"""
 ---
 ### Lyhenteet ja niiden laskentatavat
 **Velan suhde tuloihin (DTI) - Debt-to-Income Ratio:** Velan (kuukausittaisen asuntolainan maksuerän, vastikkeen ja sijoituksen) suhde kuukausituloihin. Laskenta: `DTI = (velan kuukausimaksut / kuukausitulot) * 100`.
@@ -740,16 +737,16 @@ st.write("""
 
 **Asumisen varaa mittari (AI) - Affordability Index (AI):** Arvioi, onko asuntolainan maksaminen taloudellisesti kestävää. Arvon tulisi olla yli 1, jotta asuminen katsotaan edulliseksi. Laskenta: `AI = (kuukausitulot - velan kuukausimaksut - muut kuukausikulut) / PITI`.
 
-**Odotettu arvonnousu laina-ajan lopussa - Expected Appreciation and Equity Growth:** Ennustettu asunnon arvo laina-ajan lopussa, oletuksena 2% vuotuinen arvonnousu. Laskenta: `Arvonnousu = asunnon arvo * (1 + vuotuinen arvonnousu) ** laina-aika`.
+**Odotettu arvonnousu laina-ajan lopussa - Expected Appreciation and Equity Growth:** Ennustettu asunnon arvo laina-ajan lopussa, oletuksena {property_appreciation:g}% vuotuinen arvonnousu. Laskenta: `Arvonnousu = asunnon arvo * (1 + vuotuinen arvonnousu) ** laina-aika`.
 """)
 
 
 # Consolidated disclaimers at the end
-st.write("""
+st.write(f"""
 ---
 **Disclaimer:**
 - Odotettu eläkeikä on 69 vuotta.
-- Oletettu 2% vuotuinen arvonnousu asunnolle.
+- Oletettu {property_appreciation:g}% vuotuinen arvonnousu asunnolle.
 """)
 
 # Fine print section with reduced font size while maintaining LaTeX rendering
@@ -826,3 +823,24 @@ with st.expander("Laskukaavat"):
     st.markdown("</div>", unsafe_allow_html=True)
 
 st.markdown("</div>", unsafe_allow_html=True)
+
+# Debug panel with the timings and the cache counters, shown with ?debug=1 in the URL or EGNA_PERF=1
+if timer.enabled:
+    timer.count('render_cache_hits', timer.counters.get('render_calls', 0) - timer.counters.get('render_builds', 0))
+    report = timer.report()
+    timer.flush(app='app.py')
+    with st.sidebar.expander('Debug'):
+        st.write(f"Ajo kesti {format_number_finnish(report['total_ms'])} ms")
+        st.dataframe(pd.DataFrame({
+            'Vaihe': ['  ' * span['depth'] + span['name'] for span in report['spans']],
+            'ms': [span['ms'] for span in report['spans']],
+        }))
+        st.write('Laskurit', report['counters'])
+        st.write('Uudelleen lasketut solmut', run['recomputed'])
+        cache_stats = SHARED_CACHE.stats()
+        st.write(
+            f"Välimuisti: {format_number_finnish(cache_stats['bytes'] / 1024 ** 2)} / "
+            f"{format_number_finnish(cache_stats['max_bytes'] / 1024 ** 2)} Mt, "
+            f"osumaprosentti {format_number_finnish(cache_stats['hit_rate'] * 100, is_percentage=True)}"
+        )
+        st.write(cache_stats)
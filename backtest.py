@@ -0,0 +1,106 @@
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Monthly returns as a structured array: month as YYYYMM, equity and house price returns as fractions
+HISTORY_PATH = Path(__file__).resolve().parent / 'data' / 'historical_returns.npy'
+HISTORY_DTYPE = np.dtype([('month', '<i4'), ('equity', '<f4'), ('house', '<f4')])
+
+
+# Function to open the monthly return history memory-mapped, so only the pages a backtest reads
+# are loaded and every process shares them. Returns None when the file has not been built.
+def load_history(path=HISTORY_PATH):
+    if not Path(path).exists():
+        return None
+    return np.load(path, mmap_mode='r')
+
+
+# Function to build the history file from a CSV of monthly index levels with the columns
+# month (e.g. 1990-01), equity_index (a total return index) and house_index. Gaps in the
+# house index, e.g. a quarterly series, are filled by geometric interpolation.
+def build_history(csv_path, output_path=HISTORY_PATH):
+    import pandas as pd
+
+    df = pd.read_csv(csv_path)
+    missing = {'month', 'equity_index', 'house_index'} - set(df.columns)
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(sorted(missing))}")
+
+    months = pd.PeriodIndex(df['month'], freq='M')
+    df = df.set_index(months).sort_index()
+    df = df.reindex(pd.period_range(df.index[0], df.index[-1], freq='M'))
+    if df['equity_index'].isna().any():
+        raise ValueError('The equity index must have a value for every month')
+    house = np.exp(np.log(df['house_index']).interpolate())
+
+    history = np.empty(len(df) - 1, dtype=HISTORY_DTYPE)
+    history['month'] = df.index[1:].year * 100 + df.index[1:].month
+    history['equity'] = df['equity_index'].pct_change().to_numpy()[1:]
+    history['house'] = house.pct_change().to_numpy()[1:]
+
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    np.save(output_path, history)
+    return history
+
+
+# Function to run the investment and property value of both scenarios from every possible
+# historical start month at once. Contributions are made at the end of each month of the active
+# period. With G the cumulative growth of the index, the value after n months from start s is
+#   V(s) = S * G[s+n] / G[s] + C * G[s+n] * (H[s+a] - H[s]),   H[t] = sum_{j<=t} 1 / G[j]
+# so every rolling window is read from the prefix products and sums without a loop.
+def backtest(history, starting_amount, monthly_investment, extra_monthly_investment,
+             active_investment_period, total_investment_period, initial_property_value, loan_term,
+             percentiles=(5, 50, 95)):
+    n_months = total_investment_period * 12
+    active_months = active_investment_period * 12
+    loan_months = loan_term * 12
+    windows = len(history) - max(n_months, loan_months) + 1
+    if windows < 1:
+        raise ValueError(f'The history has {len(history)} months, the backtest needs at least {max(n_months, loan_months)}')
+
+    equity_growth = np.concatenate([[1.0], np.cumprod(1 + np.asarray(history['equity'], dtype=float))])
+    inverse_growth = np.concatenate([[0.0], np.cumsum(1 / equity_growth[1:])])
+    house_growth = np.concatenate([[1.0], np.cumprod(1 + np.asarray(history['house'], dtype=float))])
+
+    start = np.arange(windows)
+    end_growth = equity_growth[start + n_months]
+    contributions = end_growth * (inverse_growth[start + active_months] - inverse_growth[start])
+    initial = starting_amount * end_growth / equity_growth[start]
+
+    total_investment = initial + monthly_investment * contributions
+    property_value_end = initial_property_value * house_growth[start + loan_months] / house_growth[start]
+    net_worth_house = total_investment + property_value_end
+    if extra_monthly_investment > 0:
+        net_worth_rent = initial + (monthly_investment + extra_monthly_investment) * contributions
+    else:
+        net_worth_rent = total_investment
+    difference_net_worth = net_worth_house - net_worth_rent
+
+    return {
+        'start_months': np.asarray(history['month'][:windows]),
+        'net_worth_house': net_worth_house,
+        'net_worth_rent': net_worth_rent,
+        'difference_net_worth': difference_net_worth,
+        'percentiles': np.asarray(percentiles),
+        'net_worth_house_percentiles': np.percentile(net_worth_house, percentiles),
+        'net_worth_rent_percentiles': np.percentile(net_worth_rent, percentiles),
+        'difference_percentiles': np.percentile(difference_net_worth, percentiles),
+        'probability_rent_wins': float(np.mean(difference_net_worth < 0)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the historical monthly return file used by the backtest.')
+    parser.add_argument('csv', help='CSV with the columns month, equity_index and house_index')
+    parser.add_argument('--output', default=str(HISTORY_PATH), help='output .npy file')
+    args = parser.parse_args(argv)
+
+    history = build_history(args.csv, args.output)
+    first, last = history['month'][0], history['month'][-1]
+    print(f'{len(history)} months {first // 100}-{first % 100:02d} to {last // 100}-{last % 100:02d} written to {args.output}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from scenarios import DEFAULT_PROFILE, evaluate_profiles
+
+# Rows per chunk, each chunk is read, scored and written on its own so memory stays flat
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+# Function to read the profiles in chunks from a CSV or a Parquet file
+def read_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    if Path(path).suffix.lower() == '.parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+# Function to score one chunk of profiles with the same model as the app.
+# The profile columns are stored as floats so every chunk writes the same column types.
+def score_chunk(chunk, solve=False):
+    columns = [name for name in DEFAULT_PROFILE if name in chunk.columns]
+    chunk = chunk.astype({name: float for name in columns})
+    results = [chunk, evaluate_profiles(chunk)]
+    if solve:
+        from solvers import solve_profiles
+        results.append(solve_profiles(chunk))
+    return pd.concat(results, axis=1)
+
+
+# Writes the scored chunks one after another to a CSV or a Parquet file
+class ChunkWriter:
+    def __init__(self, path):
+        self.path = path
+        self.parquet = Path(path).suffix.lower() == '.parquet'
+        self.writer = None
+        self.rows = 0
+
+    def write(self, frame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.path, table.schema)
+            self.writer.write_table(table.cast(self.writer.schema))
+        else:
+            frame.to_csv(self.path, mode='w' if self.rows == 0 else 'a', header=self.rows == 0, index=False)
+        self.rows += len(frame)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+# Function to score every profile of the input file and write the results to the output file.
+# With several workers the chunks are scored in a process pool, keeping at most two chunks per
+# worker in flight and writing them in input order.
+def run(input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, workers=1, solve=False):
+    writer = ChunkWriter(output_path)
+    try:
+        if workers <= 1:
+            for chunk in read_chunks(input_path, chunk_size):
+                writer.write(score_chunk(chunk, solve))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = deque()
+                for chunk in read_chunks(input_path, chunk_size):
+                    pending.append(executor.submit(score_chunk, chunk, solve))
+                    if len(pending) >= 2 * workers:
+                        writer.write(pending.popleft().result())
+                while pending:
+                    writer.write(pending.popleft().result())
+    finally:
+        writer.close()
+    return writer.rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Score mortgage, rent and investment profiles from a CSV or Parquet file without the UI.'
+    )
+    parser.add_argument('input', help='CSV or Parquet file with one profile per row, missing columns use the app defaults')
+    parser.add_argument('output', help='CSV or Parquet file for the input columns and the results')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='rows per chunk')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--solve', action='store_true', help='add the break-even and affordability columns')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    rows = run(args.input, args.output, args.chunk_size, args.workers, args.solve)
+    print(f'{rows} profiles scored in {time.perf_counter() - start:.1f} s', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
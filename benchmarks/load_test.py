@@ -0,0 +1,297 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+from tornado.websocket import websocket_connect
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Sliders dragged in the calculator, by label
+CALCULATOR_SLIDERS = ['Lainakorko (%)', 'Lainan kokonaissumma (€)', 'Kuukausittainen vuokra (€)', 'Laina-aika (vuodet)']
+
+WIDGET_KINDS = ('slider', 'radio', 'checkbox', 'number_input', 'selectbox')
+
+# Answer options of the triage questions, by index
+TRIAGE_NO = 1
+TRIAGE_YES = 2
+
+
+# One simulated browser session talking to the Streamlit server over its websocket, the same
+# way the frontend does: rerun requests carry the state of every widget the session has set,
+# and a rerun is over when the server reports the script finished. Like the frontend, widgets
+# that the run did not render again are forgotten with their state; after a fragment rerun
+# only the widgets of that fragment can go away. The elements of the last run are kept in elements.
+class Session:
+    def __init__(self, url):
+        self.url = url
+        self.connection = None
+        self.widgets = {}
+        self.widget_fragments = {}
+        self.widget_states = {}
+        self.cached_messages = {}
+        self.elements = []
+
+    async def connect(self):
+        self.connection = await websocket_connect(self.url + '/_stcore/stream')
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+    # Send a rerun with the current widget states, returns the latency until the script finished in ms.
+    # With a fragment id only that fragment reruns, as the frontend requests for widgets inside a fragment.
+    async def rerun(self, fragment_id=None):
+        message = BackMsg()
+        message.rerun_script.widget_states.widgets.extend(self.widget_states.values())
+        if fragment_id:
+            message.rerun_script.fragment_id = fragment_id
+        self.elements = []
+        start = time.perf_counter()
+        await self.connection.write_message(message.SerializeToString(), binary=True)
+        while True:
+            raw = await self.connection.read_message()
+            if raw is None:
+                raise ConnectionError('The server closed the websocket')
+            forward = ForwardMsg()
+            forward.ParseFromString(raw)
+            kind = forward.WhichOneof('type')
+            if kind == 'ref_hash':
+                # Messages the session has seen before are sent only by reference
+                forward = self.cached_messages.get(forward.ref_hash, forward)
+                kind = forward.WhichOneof('type')
+            elif forward.hash:
+                self.cached_messages[forward.hash] = forward
+            if kind == 'delta':
+                self._collect_widget(forward.delta)
+            elif kind == 'script_finished':
+                if forward.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue
+                latency = (time.perf_counter() - start) * 1000
+                self._remove_stale_widgets(fragment_id)
+                return latency
+
+    def _collect_widget(self, delta):
+        if delta.WhichOneof('type') != 'new_element':
+            return
+        element = delta.new_element
+        self.elements.append(element)
+        kind = element.WhichOneof('type')
+        if kind in WIDGET_KINDS:
+            widget = getattr(element, kind)
+            self.widgets[widget.id] = (kind, widget)
+            self.widget_fragments[widget.id] = delta.fragment_id
+
+    def _remove_stale_widgets(self, fragment_id):
+        kinds = [(element, element.WhichOneof('type')) for element in self.elements]
+        rendered = {getattr(element, kind).id for element, kind in kinds if kind in WIDGET_KINDS}
+        for widget_id in list(self.widgets):
+            if widget_id not in rendered and (not fragment_id or self.widget_fragments[widget_id] == fragment_id):
+                del self.widgets[widget_id], self.widget_fragments[widget_id]
+                self.widget_states.pop(widget_id, None)
+
+    def find(self, kind, label=None, key=None):
+        for widget_id, (widget_kind, widget) in self.widgets.items():
+            if widget_kind != kind:
+                continue
+            if (label is not None and widget.label == label) or (key is not None and widget_id.endswith('-' + key)):
+                return widget
+        return None
+
+    def set_slider(self, slider, value):
+        state = WidgetState(id=slider.id)
+        state.double_array_value.data[:] = [value]
+        self.widget_states[slider.id] = state
+
+    def set_radio(self, radio, index):
+        self.widget_states[radio.id] = WidgetState(id=radio.id, int_value=index)
+
+
+# Calculator session: drag the loan sliders to random positions, one rerun per position
+async def drag_sliders(session, interactions, rng):
+    latencies = [await session.rerun()]
+    for _ in range(interactions):
+        slider = session.find('slider', label=CALCULATOR_SLIDERS[rng.integers(len(CALCULATOR_SLIDERS))])
+        steps = int(round((slider.max - slider.min) / slider.step))
+        session.set_slider(slider, slider.min + slider.step * int(rng.integers(steps + 1)))
+        latencies.append(await session.rerun())
+    return latencies
+
+
+# Triage session: answer question_1, question_2, ... one at a time, mostly "Ei" so the chain goes
+# deep, and start over from the first question when an outcome is reached. Answers rerun only the
+# fragment of the question, like in the browser.
+async def answer_triage(session, interactions, rng):
+    latencies = [await session.rerun()]
+    answered = 0
+    for _ in range(interactions):
+        radio = None
+        for number in range(1, 14):
+            candidate = session.find('radio', key=f'question_{number}')
+            if candidate is not None and candidate.id not in session.widget_states:
+                radio = candidate
+                break
+        if radio is None or answered >= 13:
+            # Outcome reached, start a new patient
+            session.widget_states.clear()
+            session.widgets.clear()
+            session.widget_fragments.clear()
+            answered = 0
+            latencies.append(await session.rerun())
+        else:
+            session.set_radio(radio, TRIAGE_YES if rng.random() < 0.1 else TRIAGE_NO)
+            answered += 1
+            latencies.append(await session.rerun(session.widget_fragments.get(radio.id)))
+    return latencies
+
+
+SCENARIOS = {
+    'app': ('app.py', drag_sliders),
+    'app_ct': ('app_ct.py', answer_triage),
+}
+
+
+# Function to read the resident memory of a process in MB from /proc, None where that is not available
+def process_rss_mb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# Function to start the app on a local headless Streamlit server and wait until it answers
+def start_server(script, port, timeout=60):
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', str(ROOT / script),
+         '--server.headless', 'true', '--server.port', str(port), '--browser.gatherUsageStats', 'false'],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1) as response:
+                if response.read() == b'ok':
+                    return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f'Streamlit server for {script} did not start within {timeout} s')
+
+
+# Function to run a number of concurrent sessions against the server and collect their rerun latencies,
+# sampling the server memory while they run
+async def run_level(url, interact, sessions, interactions, seed, server_pid=None):
+    peak_rss = [process_rss_mb(server_pid) if server_pid else None]
+
+    async def sample_rss():
+        while True:
+            rss = process_rss_mb(server_pid)
+            if rss is not None:
+                peak_rss[0] = max(peak_rss[0] or 0, rss)
+            await asyncio.sleep(0.2)
+
+    async def one_session(number):
+        session = Session(url)
+        try:
+            await session.connect()
+            return await interact(session, interactions, np.random.default_rng([seed, number]))
+        finally:
+            session.close()
+
+    sampler = asyncio.create_task(sample_rss()) if server_pid else None
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one_session(number) for number in range(sessions)), return_exceptions=True)
+    duration = time.perf_counter() - start
+    if sampler is not None:
+        sampler.cancel()
+
+    errors = [repr(result) for result in results if isinstance(result, BaseException)]
+    latencies = np.array([latency for result in results if not isinstance(result, BaseException) for latency in result])
+    report = {
+        'sessions': sessions,
+        'reruns': int(latencies.size),
+        'errors': errors,
+        'duration_s': duration,
+        'throughput_reruns_per_s': latencies.size / duration if duration else 0.0,
+        'server_rss_mb': process_rss_mb(server_pid) if server_pid else None,
+        'server_peak_rss_mb': peak_rss[0],
+    }
+    if latencies.size:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        report.update({'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99, 'max_ms': float(latencies.max())})
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Drive concurrent simulated sessions against a Streamlit app.')
+    parser.add_argument('scenario', choices=list(SCENARIOS), help='app to load: the calculator or the triage app')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 5, 10, 25], help='concurrent sessions per level')
+    parser.add_argument('--interactions', type=int, default=20, help='widget interactions per session')
+    parser.add_argument('--url', help='use an already running server instead of starting one, e.g. http://localhost:8501')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='JSON file for the results')
+    args = parser.parse_args(argv)
+
+    script, interact = SCENARIOS[args.scenario]
+    server = None
+    if args.url:
+        url = args.url.rstrip('/').replace('http://', 'ws://').replace('https://', 'wss://')
+    else:
+        port = free_port()
+        server = start_server(script, port)
+        url = f'ws://127.0.0.1:{port}'
+
+    levels = []
+    try:
+        for sessions in args.sessions:
+            report = asyncio.run(run_level(
+                url, interact, sessions, args.interactions, args.seed, server.pid if server else None
+            ))
+            levels.append(report)
+            print(
+                f"{sessions:4d} sessions: p50 {report.get('p50_ms', float('nan')):8.1f} ms"
+                f"  p95 {report.get('p95_ms', float('nan')):8.1f} ms  p99 {report.get('p99_ms', float('nan')):8.1f} ms"
+                f"  {report['throughput_reruns_per_s']:7.1f} reruns/s  RSS {report['server_peak_rss_mb'] or float('nan'):7.1f} MB"
+                f"  errors {len(report['errors'])}",
+                file=sys.stderr
+            )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    result = {
+        'scenario': args.scenario,
+        'interactions': args.interactions,
+        'cpu_count': os.cpu_count(),
+        'levels': levels,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2))
+    else:
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,362 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np
+import pandas as pd
+
+import charts
+from amortization import amortization_schedule
+from calculator import GRAPH, evaluate
+from formatting import format_frame_finnish
+from investment import investment_growth
+from prepayment import prepayment_schedule
+from scenarios import DEFAULT_PROFILE
+
+LOAN_TERMS = range(5, 41)
+
+# Loans timed in both amortization modes, (loan amount, loan rate, loan term)
+EXACT_VS_FLOAT_LOANS = [(300_000, 3.0, 25), (2_000_000, 5.0, 40), (2_000_000, 10.0, 40)]
+
+# Sidebar slider changed in the rerun benchmark
+LOAN_RATE_LABEL = 'Lainakorko (%)'
+
+
+# Function to time a function several times, returns the statistics in milliseconds
+def time_calls(func, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return summarize(timings)
+
+
+# Function to get the statistics of timings in milliseconds
+def summarize(timings):
+    return {
+        'repeat': len(timings),
+        'min_ms': min(timings),
+        'median_ms': statistics.median(timings),
+        'mean_ms': statistics.fmean(timings),
+        'max_ms': max(timings),
+    }
+
+
+# Function to measure the peak memory allocated by Python and NumPy while calling a function, in MB
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def clear_graph_caches():
+    GRAPH.cache.clear()
+
+
+# Function to find a sidebar slider of an AppTest by its label, so added or reordered
+# sidebar sections do not change which widget is benchmarked
+def sidebar_slider(at, label):
+    for slider in at.sidebar.slider:
+        if slider.label == label:
+            return slider
+    raise LookupError(f"No sidebar slider labelled '{label}'")
+
+
+# Full script reruns of the calculator: the first run, reruns with a new loan rate every time
+# (node caches miss) and reruns cycling through the same few rates (node caches hit)
+def bench_app_reruns(repeat):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / 'app.py'), default_timeout=120)
+    start = time.perf_counter()
+    at.run()
+    first_run_ms = (time.perf_counter() - start) * 1000
+
+    rates = iter(np.round(np.linspace(0.1, 9.9, repeat), 1))
+    new_inputs = time_calls(lambda: sidebar_slider(at, LOAN_RATE_LABEL).set_value(float(next(rates))).run(), repeat)
+
+    cached_rates = [2.0, 3.0, 4.0]
+    for rate in cached_rates:
+        sidebar_slider(at, LOAN_RATE_LABEL).set_value(rate).run()
+    cycle = iter(cached_rates * repeat)
+    cached_inputs = time_calls(lambda: sidebar_slider(at, LOAN_RATE_LABEL).set_value(next(cycle)).run(), repeat)
+
+    return {'first_run_ms': first_run_ms, 'new_inputs': new_inputs, 'cached_inputs': cached_inputs}
+
+
+# Reruns of the triage app on a local server while answering the first five questions. The
+# answers go over the websocket like in the browser, so they rerun only the question chain
+# fragment; AppTest can only do full script reruns.
+def bench_app_ct_reruns(repeat):
+    import asyncio
+    from load_test import TRIAGE_NO, Session, free_port, start_server
+
+    async def answer_chain(url):
+        session = Session(url)
+        await session.connect()
+        try:
+            first_run = await session.rerun()
+            answers = []
+            for number in range(1, 6):
+                radio = session.find('radio', key=f'question_{number}')
+                session.set_radio(radio, TRIAGE_NO)
+                answers.append(await session.rerun(session.widget_fragments[radio.id]))
+            return first_run, answers
+        finally:
+            session.close()
+
+    port = free_port()
+    server = start_server('app_ct.py', port)
+    try:
+        runs = [asyncio.run(answer_chain(f'ws://127.0.0.1:{port}')) for _ in range(repeat)]
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    return {
+        'session_first_run': summarize([first_run for first_run, _ in runs]),
+        'fragment_rerun': summarize([answer for _, answers in runs for answer in answers]),
+        'answer_five_questions': summarize([sum(answers) for _, answers in runs]),
+    }
+
+
+# Pure compute paths across every loan term of the sidebar
+def bench_compute(repeat):
+    profile = dict(DEFAULT_PROFILE)
+    results = {'amortization_schedule': {}, 'amortization_schedule_exact': {}, 'investment_growth': {}, 'graph_cold': {}}
+    for loan_term in LOAN_TERMS:
+        results['amortization_schedule'][loan_term] = time_calls(
+            lambda: amortization_schedule(profile['loan_amount'], profile['loan_rate'], loan_term), repeat
+        )
+        results['amortization_schedule_exact'][loan_term] = time_calls(
+            lambda: amortization_schedule(profile['loan_amount'], profile['loan_rate'], loan_term, exact=True), repeat
+        )
+        results['investment_growth'][loan_term] = time_calls(
+            lambda: investment_growth(0, [500, 500, 822.6], 0.05, 25, 39, loan_term), repeat
+        )
+
+        def graph_cold():
+            clear_graph_caches()
+            evaluate(**{**profile, 'loan_term': loan_term})
+
+        results['graph_cold'][loan_term] = time_calls(graph_cold, repeat)
+
+    # Exact cents mode against the float mode on the same loans, ratio of the medians
+    results['exact_vs_float'] = {}
+    for loan_amount, loan_rate, loan_term in EXACT_VS_FLOAT_LOANS:
+        exact = time_calls(lambda: amortization_schedule(loan_amount, loan_rate, loan_term, exact=True), repeat)
+        fast = time_calls(lambda: amortization_schedule(loan_amount, loan_rate, loan_term), repeat)
+        results['exact_vs_float'][f'{loan_amount}_{loan_rate}_{loan_term}'] = {
+            'exact': exact,
+            'float': fast,
+            'ratio': exact['median_ms'] / fast['median_ms'],
+        }
+
+    # Batch of 1000 random recurring extra payment strategies on a 25 year loan
+    strategies = np.random.default_rng(0).random((1_000, 25 * 12)) * 300
+    results['prepayment_strategies'] = time_calls(
+        lambda: prepayment_schedule(profile['loan_amount'], profile['loan_rate'], 25, strategies), repeat
+    )
+    return results
+
+
+# Finnish formatting of the annual values table of a 40 year loan
+def bench_formatting(repeat):
+    amortization = amortization_schedule(300_000, 3.0, 40)
+    df = pd.DataFrame({
+        'Vuosi': np.arange(1, 41),
+        'Asuntolainan kokonaissumma (€)': amortization['cumulative_mortgage_cost'],
+        'Asuntolainan korko (€)': amortization['cumulative_annual_interest'],
+        'Asuntolainan lyhennys (€)': amortization['cumulative_annual_principal'],
+    })
+    return {'annual_table': time_calls(lambda: format_frame_finnish(df, list(df.columns[1:])), repeat)}
+
+
+# Building the Vega-Lite payload of the main chart and exporting it as a PNG
+def bench_rendering(repeat):
+    amortization = amortization_schedule(300_000, 3.0, 25)
+    chart = charts.line_chart(
+        'Taloudellinen vertailu laina-ajan yli', 'Vuodet', 'Kumulatiivinen summa (€)', np.arange(1, 26), [
+            charts.series('Asuntolainan kokonaissumma', amortization['cumulative_mortgage_cost'], '#1f77b4'),
+            charts.series('Asuntolainan korko', amortization['cumulative_annual_interest'], '#aec7e8', dashed=True),
+        ]
+    )
+    return {
+        'vega_lite': time_calls(lambda: charts.vega_lite(chart), repeat),
+        'export_png': time_calls(lambda: charts.export_png(chart), max(1, repeat // 4)),
+    }
+
+
+# Function to run code in a fresh interpreter in the repository root and parse the JSON it prints last
+def fresh_python(code):
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True,
+        env={**os.environ, 'PYTHONPATH': str(ROOT)}
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+IMPORT_TIME_CODE = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{
+    'ms': (time.perf_counter() - start) * 1000,
+    'heavy_modules': [name for name in ('pandas', 'matplotlib', 'pyarrow') if name in sys.modules],
+}}))
+'''
+
+FIRST_RUN_CODE = '''
+import json, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+AppTest.from_file({script!r}, default_timeout=120).run()
+print(json.dumps({{'ms': (time.perf_counter() - start) * 1000}}))
+'''
+
+
+# Cold start in fresh interpreters: the import time of the compute core, the chart helpers and
+# the batch CLI with the heavy modules they pull in, and the first script run of both apps
+def bench_startup(repeat):
+    repeat = max(1, repeat // 4)
+    results = {'import': {}, 'first_run': {}}
+    for module in ('calculator', 'scenarios', 'charts', 'batch'):
+        runs = [fresh_python(IMPORT_TIME_CODE.format(module=module)) for _ in range(repeat)]
+        results['import'][module] = {
+            'median_ms': statistics.median(run['ms'] for run in runs),
+            'heavy_modules': runs[0]['heavy_modules'],
+        }
+    for script in ('app.py', 'app_ct.py'):
+        runs = [fresh_python(FIRST_RUN_CODE.format(script=str(ROOT / script))) for _ in range(repeat)]
+        results['first_run'][script] = {'median_ms': statistics.median(run['ms'] for run in runs)}
+    return results
+
+
+# Peak memory of the main code paths
+def bench_memory():
+    amortization = amortization_schedule(300_000, 3.0, 25)
+    chart = charts.line_chart('Taloudellinen vertailu laina-ajan yli', 'Vuodet', 'Kumulatiivinen summa (€)', np.arange(1, 26), [
+        charts.series('Asuntolainan kokonaissumma', amortization['cumulative_mortgage_cost'], '#1f77b4'),
+        charts.series('Asuntolainan korko', amortization['cumulative_annual_interest'], '#aec7e8', dashed=True),
+        charts.series('Asuntolainan lyhennys', amortization['cumulative_annual_principal'], '#ffbb78', dashed=True),
+    ])
+
+    def graph_cold():
+        clear_graph_caches()
+        evaluate(**{**DEFAULT_PROFILE, 'loan_term': 40})
+
+    def app_first_run():
+        from streamlit.testing.v1 import AppTest
+        clear_graph_caches()
+        AppTest.from_file(str(ROOT / 'app.py'), default_timeout=120).run()
+
+    # Import matplotlib before measuring, so the PNG export is measured without the one-off import
+    charts.export_png(chart)
+
+    return {
+        'graph_cold_mb': peak_memory(graph_cold),
+        'export_png_mb': peak_memory(lambda: charts.export_png(chart)),
+        'app_first_run_mb': peak_memory(app_first_run),
+    }
+
+
+def metadata():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import streamlit
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'streamlit': streamlit.__version__,
+    }
+
+
+BENCHMARKS = {
+    'app_reruns': bench_app_reruns,
+    'app_ct_reruns': bench_app_ct_reruns,
+    'compute': bench_compute,
+    'formatting': bench_formatting,
+    'rendering': bench_rendering,
+    'startup': bench_startup,
+}
+
+
+# Function to flatten the nested results into {'compute.graph_cold.25.median_ms': value}
+def flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+# Function to print the timings and memory of two result files side by side,
+# marking the ones that grew by more than the threshold
+def compare(old_path, new_path, threshold=0.1):
+    old = flatten(json.loads(Path(old_path).read_text())['results'])
+    new = flatten(json.loads(Path(new_path).read_text())['results'])
+    regressions = 0
+    for name in sorted(old.keys() & new.keys()):
+        if not name.endswith(('median_ms', '_mb', 'first_run_ms')):
+            continue
+        ratio = new[name] / old[name] if old[name] else float('inf')
+        flag = 'REGRESSION' if ratio > 1 + threshold else ''
+        regressions += bool(flag)
+        print(f'{name:60s} {old[name]:12.3f} {new[name]:12.3f} {ratio:7.2f}x {flag}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the calculator and the triage app, results as JSON.')
+    parser.add_argument('--output', help='JSON file for the results, default benchmarks/results/<commit>.json')
+    parser.add_argument('--repeat', type=int, default=20, help='timed calls per benchmark')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS) + ['memory'], help='run only these benchmarks')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two result files instead of running')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative slowdown reported as a regression')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, threshold=args.threshold) else 0)
+
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if args.only is None or name in args.only:
+            print(f'Running {name}...', file=sys.stderr)
+            results[name] = bench(args.repeat)
+    if args.only is None or 'memory' in args.only:
+        results['memory'] = bench_memory()
+
+    report = {'metadata': metadata(), 'results': results}
+    output = Path(args.output) if args.output else ROOT / 'benchmarks' / 'results' / f"{report['metadata']['commit'] or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f'Results written to {output}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
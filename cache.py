@@ -0,0 +1,105 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+# Function to estimate the memory held by a cached value in bytes. Counts the buffers of NumPy
+# arrays and pandas objects and walks through dicts, lists and tuples; anything else by getsizeof.
+def sizeof(value):
+    if hasattr(value, 'memory_usage'):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, 'sum') else usage)
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(key) + sizeof(item) for key, item in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value)
+    return sys.getsizeof(value)
+
+
+# In-process LRU cache with an optional maximum number of entries, an optional memory budget in
+# bytes and an optional time-to-live in seconds. Lives at module level, so every Streamlit session
+# in the process shares the same entries. Pinned entries do not expire, but are still evicted
+# when the cache is over its limits.
+class LRUCache:
+    def __init__(self, max_entries=256, ttl=None, max_bytes=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._pinned = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    # Return the cached value or _MISSING, refreshing the entry as most recently used
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if (entry is not _MISSING and self.ttl is not None and key not in self._pinned
+                    and time.monotonic() - entry[0] > self.ttl):
+                del self._entries[key]
+                self.bytes -= entry[2]
+                self.expirations += 1
+                entry = _MISSING
+            if entry is _MISSING:
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        size = sizeof(value) if self.max_bytes is not None else 0
+        # A value larger than the whole budget would only evict everything else
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[2]
+            self._entries[key] = (time.monotonic(), value, size)
+            self.bytes += size
+            # Evict the least recently used entries over the limits
+            while ((self.max_entries is not None and len(self._entries) > self.max_entries)
+                   or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self._pinned.discard(evicted_key)
+                self.bytes -= evicted[2]
+                self.evictions += 1
+
+    # Exempt a cached entry from the time-to-live
+    def pin(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._pinned.add(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._pinned.clear()
+            self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'pinned': len(self._pinned),
+            'max_entries': self.max_entries,
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
@@ -0,0 +1,388 @@
+import itertools
+import os
+
+import numpy as np
+
+from amortization import amortization_schedule
+from cache import LRUCache
+from formatting import format_number_finnish
+from graph import ComputationGraph, Node
+from investment import investment_growth
+from parameters import cumulative_annual, final_growth_factor, yearly_values
+from scenarios import DEFAULT_PROFILE, PENSION_AGE
+
+# Memory budget of the result cache shared by every session, can be set with EGNA_CACHE_MB
+CACHE_MAX_MB = float(os.environ.get('EGNA_CACHE_MB', 256))
+CACHE_TTL = 60 * 60  # Seconds
+
+# Node values, tables and chart payloads of every session, evicted by LRU once over the budget
+SHARED_CACHE = LRUCache(max_entries=None, ttl=CACHE_TTL, max_bytes=int(CACHE_MAX_MB * 1024 ** 2))
+
+# Input combinations most users land on: the sidebar defaults with common rates, terms and rents
+PREWARM_PROFILES = [
+    {**DEFAULT_PROFILE, 'loan_rate': loan_rate, 'loan_term': loan_term, 'monthly_rent': monthly_rent}
+    for loan_rate, loan_term, monthly_rent in itertools.product(
+        [DEFAULT_PROFILE['loan_rate'], 2.0, 4.0, 5.0],
+        [DEFAULT_PROFILE['loan_term'], 20, 30],
+        [DEFAULT_PROFILE['monthly_rent'], 1_000, 1_500]
+    )
+]
+
+
+# Function to generate financial advice
+def generate_financial_advice(
+    total_mortgage_payments,
+    total_rent_paid,
+    total_investment,
+    amount_left_mortgage,
+    amount_left_rent,
+    net_salary,
+    total_expenses_mortgage,
+    total_expenses_rent,
+    total_investment_active,
+    total_investment_passive,
+    passive_investment_period,
+    active_investment_period,
+    difference,
+    total_investment_new,
+    total_investment_active_new,
+    total_investment_passive_new,
+    property_value_end,
+    net_worth_house,
+    net_worth_rent,
+    difference_net_worth,
+    total_vastike_paid,  # New parameter for vastike
+    loan_term
+):
+    # Analyze the financial data and generate advice
+    advice = ""
+    
+    # Compare renting and buying
+    if (total_mortgage_payments + total_vastike_paid) < total_rent_paid:
+        advice += "Asuntolainan kokonaismaksut ja vastikkeet ovat pienemmät kuin maksettu vuokra laina-aikana. Oman asunnon ostaminen voi olla taloudellisesti kannattavampaa pitkällä aikavälillä.\n\n"
+    else:
+        advice += "Maksettu vuokra laina-aikana on pienempi kuin asuntolainan kokonaismaksut ja vastikkeet. Vuokraaminen saattaa olla edullisempaa tämän ajanjakson aikana.\n\n"
+    
+    # Compare total rent paid with total interest paid during loan period
+    rent_vs_interest_difference = abs(total_rent_paid - (total_mortgage_payments + total_vastike_paid))
+    advice += f"Kokonaisvuokra maksettu laina-aikana on {format_number_finnish(total_rent_paid)} €, kun taas kokonaiskorko ja vastike maksettu laina-aikana on {format_number_finnish(total_mortgage_payments + total_vastike_paid)} €. "
+    if rent_vs_interest_difference <= (total_mortgage_payments + total_vastike_paid) * 0.1:  # Within 10%
+        advice += "Koska vuokra- ja korko-vastike-maksujen erotus on pieni, asuntolainan ottaminen ja asunnon ostaminen voi olla järkevää.\n\n"
+    else:
+        advice += "Koska vuokra- ja korko-vastike-maksujen erotus on merkittävä, kannattaa harkita tarkkaan asuntolainan ottamista.\n\n"
+    
+    # Comment on monthly budget distribution
+    if net_salary > 0:
+        mortgage_budget_percentage = ((total_expenses_mortgage) / net_salary) * 100
+        rent_budget_percentage = ((total_expenses_rent) / net_salary) * 100
+    else:
+        mortgage_budget_percentage = rent_budget_percentage = 0
+    
+    advice += f"Asuntolainaskenaariossa kuukausittaiset kulut ovat {format_number_finnish(total_expenses_mortgage)} € (laina- ja sijoituskulut), mikä on {format_number_finnish(mortgage_budget_percentage, is_percentage=True)} nettokuukausituloistasi.\n"
+    advice += f"Vuokrausskenaariossa kuukausittaiset kulut ovat {format_number_finnish(total_expenses_rent)} € (vuokra- + sijoituskulut), mikä on {format_number_finnish(rent_budget_percentage, is_percentage=True)} nettokuukausituloistasi.\n\n"
+    
+    # Discuss net wealth during loan period and lifetime
+    advice += f"Aktiivisen sijoitusajan ({active_investment_period} vuotta) aikana sijoitustesi arvo kasvaa {format_number_finnish(total_investment_active)} €.\n"
+    advice += f"Passiivisen sijoitusajan ({passive_investment_period} vuotta) aikana sijoitustesi arvo kasvaa {format_number_finnish(total_investment_passive)} €.\n"
+    advice += f"Sijoitusten kokonaisarvo sijoitusajan lopussa on {format_number_finnish(total_investment)} €.\n\n"
+    
+    # Add information about the difference and new investment scenario
+    if difference > 0:
+        advice += f"Vuokraskenaariossa {format_number_finnish(difference)} € enemmän on sijoitettu kuukausittaain. Tämä ylimääräinen kuukausittainen sijoitus kasvattaa sijoitustesi kokonaisarvoa siihen asti, kunnes pääset eläkkeelle.\n"
+        # Calculate percentage increase in net worth due to the difference
+        if total_investment > 0:
+            percentage_increase = ((total_investment_new - total_investment) / total_investment) * 100
+            advice += f"Sijoitustesi kokonaisarvo lisätyllä erolla on {format_number_finnish(total_investment_new)} €, mikä on {format_number_finnish(percentage_increase)} % enemmän kuin ilman erotusta.\n\n"
+        else:
+            advice += f"Sijoitustesi kokonaisarvo lisätyllä erolla on {format_number_finnish(total_investment_new)} €.\n\n"
+    
+    # Add information about property value with bold text
+    advice += f"**Asunnon arvo kun laina-aika loppuu:** {format_number_finnish(property_value_end)} €.\n\n"
+    
+    # Compare net worth in both scenarios
+    advice += "### Nettovarallisuuden vertailu\n\n"
+    if net_worth_house > net_worth_rent:
+        difference_net_worth_formatted = format_number_finnish(abs(difference_net_worth))
+        advice += f"Asuntolaina- ja sijoitusskenaariossa nettovarallisuutesi eläkkeelle jäätyäsi on suurempi kuin vuokraus- ja sijoitusskenaariossa. Ero on **€{difference_net_worth_formatted}**.\n\n"
+    elif net_worth_house < net_worth_rent:
+        difference_net_worth_formatted = format_number_finnish(abs(difference_net_worth))
+        advice += f"Vuokraus- ja sijoitusskenaariossa nettovarallisuutesi eläkkeelle jäätyäsi on suurempi kuin asuntolaina- ja sijoitusskenaariossa. Ero on **€{difference_net_worth_formatted}**.\n\n"
+    else:
+        advice += "Asuntolaina- ja vuokrausskenaarioissa nettovarallisuutesi eläkkeelle jäätyäsi on sama.\n\n"
+    
+    advice += "\n"
+    # Consolidated disclaimers at the end
+    
+    # Suggest using extra money for investments based on scenarios
+    advice += "\n### Suositukset osto- ja vuokrausskenaareihin perustuen\n\n"
+    
+    # Scenario 1: Low Percentage of Income Spent on Mortgage
+    if mortgage_budget_percentage < 30:
+        advice += "#### Hyvä tilanne ottaa asuntolaina\n"
+        advice += "- **Nettotulo:** Vähän yli 3 000 € kuukaudessa.\n"
+        advice += "- **Asuntolainan osuus nettotulosta:** Alle 30 %, mikä tarkoittaa, että sinulla on riittävästi tuloja kattamaan lainan, vastikkeet ja muiden kulujen lisäksi myös sijoituksia.\n"
+        advice += "- **Oma omistus laina-aikana ja laina-aika päätyttyä:** Asunto on omistuksessasi, etkä joudu maksamaan lainan korkoja enää.\n\n"
+    
+    # Scenario 2: Moderate Percentage of Income Spent on Mortgage
+    if 30 <= mortgage_budget_percentage < 40:
+        advice += "#### Kohtalainen tilanne ottaa asuntolaina\n"
+        advice += "- **Nettotulo:** Keskitasoinen, riittää lainan kattamiseen, mutta sijoituksiin jää vähemmän rahaa.\n"
+        advice += "- **Asuntolainan osuus nettotulosta:** 30-40 %, mikä on sallittua, mutta varo liiallista sitoutumista talouteen.\n\n"
+    
+    # Scenario 3: High Rent vs. Interest Comparison
+    if rent_vs_interest_difference <= (total_mortgage_payments + total_vastike_paid) * 0.1:
+        advice += "#### Vuokra ja korko ovat samansuuruiset\n"
+        advice += "- Vuokra- ja korko-vastike-maksujen lähellä oleva ero tekee asuntolainan ottamisesta ja asunnon ostamisesta houkuttelevan vaihtoehdon, sillä omistusasunto luo pitkäaikaista varallisuutta.\n\n"
+    
+    # Scenario 4: Continuous Rent vs. Ownership Post-Loan
+    if loan_term > 20:  # Assuming long-term ownership
+        advice += "#### Pitkäaikainen omistusasunto\n"
+        advice += "- Laina-aikana maksamasi korkojen ja vastikkeiden jälkeen sinulla on oma asunto ilman kuukausittaisia lainakuluja, mikä voi merkittävästi vähentää kuukausittaisia kuluja eläkkeelle jäätyttyäsi.\n\n"
+    
+    # Scenario 5: Investment Growth Potential
+    if difference > 0 and (total_investment_new > total_investment):
+        advice += "#### Investointimahdollisuudet\n"
+        advice += "- Lisätty sijoitus ero aiheuttaa merkittävän kasvun sijoitustesi arvossa, mikä parantaa nettovarallisuuttasi merkittävästi eläkkeelle päästyäsi.\n\n"
+    
+    # Scenario 6: Rent Continuity
+    if net_worth_house > net_worth_rent:
+        advice += "#### Vuokra jatkuvasti elämän aikana\n"
+        advice += "- Jos jatkat vuokraamista elämän aikana, kuukausittaiset vuokrakulut jatkuvat, kun taas omistusasunnossa maksat vain kiinteitä lainakuluja ja vastikkeita laina-aikan jälkeen.\n\n"
+    
+    # Scenario 7: Financial Stability and Ownership Security
+    advice += "#### Taloudellinen vakaus ja omistuksen turva\n"
+    advice += "- Omistusasunto tarjoaa taloudellisen vakauden, sillä se ei ole riippuvainen vuokranantajan päätöksistä, kuten vuokrankorotuksista tai asunnon myymisestä.\n\n"
+    
+    return advice
+
+
+# Computation nodes. Each node is a pure function of its dependencies, which are either
+# sidebar inputs or other nodes. Nodes returning small dicts of scalars are keyed downstream
+# on their values, e.g. the investments only change with vastike through cash_flow.
+
+def amortization_node(loan_amount, loan_rate, loan_term, exact_cents):
+    schedule = amortization_schedule(loan_amount, loan_rate, loan_term, exact=exact_cents)
+    schedule['total_interest_paid'] = schedule['cumulative_annual_interest'][-1]
+    schedule['total_principal_paid'] = schedule['cumulative_annual_principal'][-1]
+    schedule['total_mortgage_payments'] = schedule['total_interest_paid'] + schedule['total_principal_paid']
+    return schedule
+
+
+def maintenance_node(vastike, vastike_growth, loan_term):
+    # **Calculate total vastike (maintenance charges) during loan period**
+    cumulative_vastike = cumulative_annual({'value': vastike, 'growth': vastike_growth}, loan_term)
+    return {'cumulative_vastike': cumulative_vastike, 'total_vastike_paid': cumulative_vastike[-1]}
+
+
+def rent_node(monthly_rent, rent_growth, loan_term):
+    cumulative_rent = cumulative_annual({'value': monthly_rent, 'growth': rent_growth}, loan_term)
+    return {'cumulative_rent': cumulative_rent, 'total_rent_paid': cumulative_rent[-1]}
+
+
+def cash_flow_node(amortization, maintenance, rent, net_salary, loan_term):
+    # Calculate monthly expenses for mortgage scenario
+    annual_expenses_mortgage = amortization['total_mortgage_payments'] + maintenance['total_vastike_paid']
+    monthly_expenses_mortgage = annual_expenses_mortgage / (loan_term * 12)
+
+    # Rent and vastike averaged over the loan term, equal to the monthly values when they do not grow
+    average_monthly_rent = rent['total_rent_paid'] / (loan_term * 12)
+    average_vastike = maintenance['total_vastike_paid'] / (loan_term * 12)
+
+    # Calculate additional monthly investment for rent scenario
+    additional_monthly_investment = monthly_expenses_mortgage - average_monthly_rent if monthly_expenses_mortgage > average_monthly_rent else 0
+
+    # Difference in money left after expenses between renting and taking the loan
+    difference = (amortization['monthly_payment'] + average_vastike) - average_monthly_rent if net_salary > 0 else 0
+
+    return {'additional_monthly_investment': additional_monthly_investment, 'difference': difference}
+
+
+def investments_node(starting_amount, monthly_investment, investment_rate, active_investment_period, age, loan_term, cash_flow):
+    total_investment_period = PENSION_AGE - age
+
+    # One row per scenario: loan, rent with the additional investment and rent with the difference invested
+    investments = investment_growth(
+        starting_amount,
+        [
+            monthly_investment,
+            monthly_investment + cash_flow['additional_monthly_investment'],
+            monthly_investment + max(cash_flow['difference'], 0)
+        ],
+        investment_rate / 100,
+        active_investment_period,
+        total_investment_period,
+        loan_term
+    )
+    investments['investment_years'] = np.arange(1, total_investment_period + 1)
+    return investments
+
+
+def net_worth_node(investments, cash_flow, initial_property_value, property_appreciation, loan_term):
+    total_investment, _, total_investment_new = investments['total']
+    property_value_end = initial_property_value * final_growth_factor(property_appreciation, loan_term)
+    net_worth_house = total_investment + property_value_end
+    net_worth_rent = total_investment_new if cash_flow['difference'] > 0 else total_investment
+    return {
+        'property_value_end': property_value_end,
+        'net_worth_house': net_worth_house,
+        'net_worth_rent': net_worth_rent,
+        'difference_net_worth': net_worth_house - net_worth_rent,
+    }
+
+
+# Net salary and the share of the housing costs (loan payment and vastike) of it in every loan year
+def salary_node(amortization, maintenance, net_salary, salary_growth, loan_term):
+    yearly_salary = yearly_values({'value': net_salary, 'growth': salary_growth}, loan_term)
+    annual_vastike = np.diff(maintenance['cumulative_vastike'], prepend=0.0) / 12
+    housing_costs = amortization['monthly_payment'] + annual_vastike
+    if net_salary > 0:
+        housing_cost_share = housing_costs / yearly_salary * 100
+    else:
+        housing_cost_share = np.full(loan_term, np.nan)
+    return {'yearly_salary': yearly_salary, 'housing_costs': housing_costs, 'housing_cost_share': housing_cost_share}
+
+
+SALARY_ALLOCATION_KEYS = [
+    'percentage_principal', 'percentage_interest', 'percentage_vastike', 'percentage_total_mortgage',
+    'percentage_investment_mortgage', 'percentage_left_mortgage', 'amount_left_mortgage',
+    'percentage_rent', 'percentage_investment_rent', 'percentage_left_rent', 'amount_left_rent',
+    'percentage_additional_investment', 'percentage_investment_total_rent'
+]
+
+
+def salary_allocation_node(amortization, investments, cash_flow, vastike, monthly_investment, monthly_rent, net_salary):
+    if net_salary <= 0:
+        return dict.fromkeys(SALARY_ALLOCATION_KEYS, 0)
+
+    # Based on the first month's principal and interest payments
+    monthly_payment = amortization['monthly_payment']
+    total_expenses_mortgage = monthly_payment + vastike + monthly_investment
+    total_expenses_rent = monthly_rent + monthly_investment
+    return {
+        'percentage_principal': (amortization['monthly_principals'][0] / net_salary) * 100,
+        'percentage_interest': (amortization['monthly_interests'][0] / net_salary) * 100,
+        'percentage_vastike': (vastike / net_salary) * 100,
+        'percentage_total_mortgage': ((monthly_payment + vastike) / net_salary) * 100,
+        'percentage_investment_mortgage': (monthly_investment / net_salary) * 100,
+        'percentage_left_mortgage': 100 - ((total_expenses_mortgage / net_salary) * 100),
+        'amount_left_mortgage': net_salary - total_expenses_mortgage,
+        'percentage_rent': (monthly_rent / net_salary) * 100,
+        'percentage_investment_rent': (monthly_investment / net_salary) * 100,
+        'percentage_left_rent': 100 - ((total_expenses_rent / net_salary) * 100),
+        'amount_left_rent': net_salary - total_expenses_rent,
+        'percentage_additional_investment': (cash_flow['additional_monthly_investment'] / net_salary) * 100,
+        'percentage_investment_total_rent': (investments['total'][1] / net_salary) * 100,
+    }
+
+
+def metrics_node(amortization, vastike, monthly_investment, loan_amount, initial_property_value, net_salary):
+    monthly_payment = amortization['monthly_payment']
+
+    # Debt-to-Income (DTI) Ratio
+    # Use monthly mortgage payment, maintenance (vastike) as debt payments
+    total_monthly_debt_payments = monthly_payment + vastike
+    gross_monthly_income = net_salary  # Replace with gross income if available
+    dti_ratio = (total_monthly_debt_payments / gross_monthly_income) * 100 if gross_monthly_income > 0 else np.nan
+
+    # Loan-to-Value (LTV) Ratio
+    ltv_ratio = (loan_amount / initial_property_value) * 100 if initial_property_value > 0 else np.nan
+
+    # Monthly Payment Estimate (PITI) - simplified to mortgage + maintenance (vastike)
+    total_monthly_piti = monthly_payment + vastike
+    piti_percentage_income = (total_monthly_piti / gross_monthly_income) * 100 if gross_monthly_income > 0 else np.nan
+
+    # Affordability Index (AI) - should be >1 to be considered affordable
+    monthly_expenses = vastike + monthly_investment
+    affordability_index = (gross_monthly_income - total_monthly_debt_payments - monthly_expenses) / total_monthly_piti if total_monthly_piti > 0 else np.nan
+
+    return {
+        'dti_ratio': dti_ratio,
+        'ltv_ratio': ltv_ratio,
+        'total_monthly_piti': total_monthly_piti,
+        'piti_percentage_income': piti_percentage_income,
+        'affordability_index': affordability_index,
+    }
+
+
+def advice_node(amortization, maintenance, rent, cash_flow, investments, net_worth, salary_allocation,
+                vastike, monthly_investment, monthly_rent, net_salary, active_investment_period, age, loan_term):
+    total_investment, _, total_investment_new = investments['total']
+    total_investment_active, _, total_investment_active_new = investments['total_active']
+    total_investment_passive, _, total_investment_passive_new = investments['total_passive']
+    has_additional_investment = cash_flow['additional_monthly_investment'] > 0
+
+    return generate_financial_advice(
+        amortization['total_mortgage_payments'],
+        rent['total_rent_paid'],
+        total_investment,
+        salary_allocation['amount_left_mortgage'],
+        salary_allocation['amount_left_rent'],
+        net_salary,
+        amortization['monthly_payment'] + vastike + monthly_investment,
+        monthly_rent + monthly_investment,
+        total_investment_active,
+        total_investment_passive,
+        PENSION_AGE - age - active_investment_period,
+        active_investment_period,
+        cash_flow['difference'],
+        total_investment_new if has_additional_investment else 0,
+        total_investment_active_new if has_additional_investment else 0,
+        total_investment_passive_new if has_additional_investment else 0,
+        net_worth['property_value_end'],
+        net_worth['net_worth_house'],
+        net_worth['net_worth_rent'],
+        net_worth['difference_net_worth'],
+        maintenance['total_vastike_paid'],
+        loan_term
+    )
+
+
+GROWTH_INPUTS = ('rent_growth', 'vastike_growth', 'salary_growth', 'property_appreciation')
+
+# Shared by all sessions in the process
+GRAPH = ComputationGraph([
+    Node('amortization', amortization_node, ['loan_amount', 'loan_rate', 'loan_term', 'exact_cents']),
+    Node('maintenance', maintenance_node, ['vastike', 'vastike_growth', 'loan_term']),
+    Node('rent', rent_node, ['monthly_rent', 'rent_growth', 'loan_term']),
+    Node('cash_flow', cash_flow_node, ['amortization', 'maintenance', 'rent', 'net_salary', 'loan_term']),
+    Node('investments', investments_node, [
+        'starting_amount', 'monthly_investment', 'investment_rate', 'active_investment_period', 'age', 'loan_term',
+        'cash_flow'
+    ]),
+    Node('net_worth', net_worth_node, [
+        'investments', 'cash_flow', 'initial_property_value', 'property_appreciation', 'loan_term'
+    ]),
+    Node('salary', salary_node, ['amortization', 'maintenance', 'net_salary', 'salary_growth', 'loan_term']),
+    Node('salary_allocation', salary_allocation_node, [
+        'amortization', 'investments', 'cash_flow', 'vastike', 'monthly_investment', 'monthly_rent', 'net_salary'
+    ]),
+    Node('metrics', metrics_node, [
+        'amortization', 'vastike', 'monthly_investment', 'loan_amount', 'initial_property_value', 'net_salary'
+    ]),
+    Node('advice', advice_node, [
+        'amortization', 'maintenance', 'rent', 'cash_flow', 'investments', 'net_worth', 'salary_allocation',
+        'vastike', 'monthly_investment', 'monthly_rent', 'net_salary', 'active_investment_period', 'age', 'loan_term'
+    ]),
+], cache=SHARED_CACHE)
+
+
+# Function to evaluate the graph from the sidebar inputs given as keyword arguments.
+# Only the nodes whose inputs changed since they were last cached are recomputed.
+# With exact_cents=True the loan schedule is rounded to cents like on a bank statement.
+# rent_growth, vastike_growth, salary_growth and property_appreciation can be one percent or a
+# sequence of per-year percents; sequences are turned into tuples so they can key the cache.
+# With pin=True the node values do not expire with the cache time-to-live, see prewarm.
+def evaluate(timer=None, exact_cents=False, pin=False, **inputs):
+    for name in GROWTH_INPUTS:
+        if np.ndim(inputs.get(name, 0)) > 0:
+            inputs[name] = tuple(float(value) for value in np.ravel(inputs[name]))
+    return GRAPH.evaluate({**inputs, 'exact_cents': exact_cents}, timer, pin)
+
+
+# Function to fill the shared cache with the node values of the most common inputs, so the first
+# sessions after a start do not have to compute them. The app calls this once per process, so the
+# values are pinned to outlive CACHE_TTL. Tables and charts are not prewarmed, they are built
+# from the cached node values on the first run that shows them.
+def prewarm(profiles=PREWARM_PROFILES):
+    for profile in profiles:
+        evaluate(pin=True, **profile)
@@ -0,0 +1,285 @@
+import io
+
+import numpy as np
+
+from formatting import format_number_finnish
+
+# Finnish number formatting for Vega-Lite: space as thousands separator, comma as decimal separator
+FINNISH_NUMBER_LOCALE = {
+    'decimal': ',',
+    'thousands': ' ',
+    'grouping': [3],
+    'currency': ['', ' €'],
+}
+
+DASH_SOLID = [1, 0]
+DASH_DASHED = [6, 4]
+
+
+# Function to describe a line chart: x values shared by every series, one dict per series
+def line_chart(title, x_title, y_title, x, series):
+    return {
+        'title': title,
+        'x_title': x_title,
+        'y_title': y_title,
+        'x': x,
+        'series': series,
+    }
+
+
+# Function to build one series of a line chart
+def series(label, values, color, dashed=False):
+    return {'label': label, 'values': values, 'color': color, 'dashed': dashed}
+
+
+# Function to describe a percentile band chart: a shaded lower-upper band and a median line per band
+def band_chart(title, x_title, y_title, x, bands):
+    return {
+        'title': title,
+        'x_title': x_title,
+        'y_title': y_title,
+        'x': x,
+        'bands': bands,
+    }
+
+
+# Function to build one band of a band chart
+def band(label, lower, median, upper, color):
+    return {'label': label, 'lower': lower, 'median': median, 'upper': upper, 'color': color}
+
+
+# Function to turn a band chart into long data (one row per band and year) and a layered
+# Vega-Lite spec with the shaded band under the median line
+def _vega_lite_bands(chart):
+    import pandas as pd
+
+    labels = [b['label'] for b in chart['bands']]
+    data = pd.concat([
+        pd.DataFrame({'Vuosi': chart['x'], 'Sarja': b['label'], 'Alaraja': b['lower'], 'Mediaani': b['median'], 'Yläraja': b['upper']})
+        for b in chart['bands']
+    ], ignore_index=True)
+    x = {
+        'field': 'Vuosi',
+        'type': 'quantitative',
+        'title': chart['x_title'],
+        'axis': {'format': 'd', 'tickMinStep': 1},
+    }
+    color = {
+        'field': 'Sarja',
+        'type': 'nominal',
+        'sort': labels,
+        'scale': {'domain': labels, 'range': [b['color'] for b in chart['bands']]},
+        'legend': {'title': None, 'orient': 'top-left'},
+    }
+    spec = {
+        'title': chart['title'],
+        'layer': [
+            {
+                'mark': {'type': 'area', 'opacity': 0.2},
+                'encoding': {
+                    'x': x,
+                    'y': {'field': 'Alaraja', 'type': 'quantitative', 'title': chart['y_title'], 'axis': {'format': ',.1f'}},
+                    'y2': {'field': 'Yläraja'},
+                    'color': color,
+                },
+            },
+            {
+                'mark': {'type': 'line'},
+                'encoding': {
+                    'x': x,
+                    'y': {'field': 'Mediaani', 'type': 'quantitative'},
+                    'color': color,
+                    'tooltip': [
+                        {'field': 'Sarja', 'type': 'nominal', 'title': 'Sarja'},
+                        {'field': 'Vuosi', 'type': 'quantitative', 'title': chart['x_title'], 'format': 'd'},
+                        {'field': 'Alaraja', 'type': 'quantitative', 'title': 'Alaraja', 'format': ',.1f'},
+                        {'field': 'Mediaani', 'type': 'quantitative', 'title': 'Mediaani', 'format': ',.1f'},
+                        {'field': 'Yläraja', 'type': 'quantitative', 'title': 'Yläraja', 'format': ',.1f'},
+                    ],
+                },
+            },
+        ],
+        'config': {'locale': {'number': FINNISH_NUMBER_LOCALE}},
+    }
+    return data, spec
+
+
+# Function to describe a heatmap of values over a grid (rows follow y, columns x)
+# with the break-even points drawn on top
+def heatmap(title, x_title, y_title, value_title, x, y, values, contour_x, contour_y):
+    return {
+        'title': title,
+        'x_title': x_title,
+        'y_title': y_title,
+        'value_title': value_title,
+        'x': x,
+        'y': y,
+        'values': values,
+        'contour': (contour_x, contour_y),
+    }
+
+
+# Function to turn a heatmap into long data (one row per cell) and a layered Vega-Lite spec.
+# Cells are drawn as rectangles between the grid midpoints, the break-even points as a second layer.
+def _vega_lite_heatmap(chart):
+    import pandas as pd
+
+    x = np.asarray(chart['x'], dtype=float)
+    y = np.asarray(chart['y'], dtype=float)
+    x_edges = _cell_edges(x)
+    y_edges = _cell_edges(y)
+    data = pd.DataFrame({
+        'x': np.tile(x, len(y)),
+        'x_start': np.tile(x_edges[:-1], len(y)),
+        'x_end': np.tile(x_edges[1:], len(y)),
+        'y': np.repeat(y, len(x)),
+        'y_start': np.repeat(y_edges[:-1], len(x)),
+        'y_end': np.repeat(y_edges[1:], len(x)),
+        'Arvo': np.asarray(chart['values'], dtype=float).ravel(),
+    })
+    contour_x, contour_y = chart['contour']
+    spec = {
+        'title': chart['title'],
+        'layer': [
+            {
+                'mark': {'type': 'rect'},
+                'encoding': {
+                    'x': {'field': 'x_start', 'type': 'quantitative', 'title': chart['x_title'],
+                          'scale': {'domain': [x_edges[0], x_edges[-1]], 'nice': False}},
+                    'x2': {'field': 'x_end'},
+                    'y': {'field': 'y_start', 'type': 'quantitative', 'title': chart['y_title'],
+                          'scale': {'domain': [y_edges[0], y_edges[-1]], 'nice': False}},
+                    'y2': {'field': 'y_end'},
+                    'color': {
+                        'field': 'Arvo',
+                        'type': 'quantitative',
+                        'title': chart['value_title'],
+                        'scale': {'scheme': 'redblue', 'domainMid': 0},
+                        'legend': {'format': ',.0f'},
+                    },
+                    'tooltip': [
+                        {'field': 'x', 'type': 'quantitative', 'title': chart['x_title'], 'format': ',.1f'},
+                        {'field': 'y', 'type': 'quantitative', 'title': chart['y_title'], 'format': ',.1f'},
+                        {'field': 'Arvo', 'type': 'quantitative', 'title': chart['value_title'], 'format': ',.1f'},
+                    ],
+                },
+            },
+            {
+                'data': {'values': [{'x': float(a), 'y': float(b)} for a, b in zip(contour_x, contour_y)]},
+                'mark': {'type': 'circle', 'size': 6, 'color': 'black', 'opacity': 1},
+                'encoding': {
+                    'x': {'field': 'x', 'type': 'quantitative'},
+                    'y': {'field': 'y', 'type': 'quantitative'},
+                },
+            },
+        ],
+        'config': {'locale': {'number': FINNISH_NUMBER_LOCALE}},
+    }
+    return data, spec
+
+
+# Function to get the cell boundaries halfway between the grid points
+def _cell_edges(points):
+    if len(points) == 1:
+        return np.array([points[0] - 0.5, points[0] + 0.5])
+    middle = (points[:-1] + points[1:]) / 2
+    return np.concatenate([[2 * points[0] - middle[0]], middle, [2 * points[-1] - middle[-1]]])
+
+
+# Function to turn a chart into columnar data (one column per series) and a Vega-Lite spec.
+# The browser folds the columns into lines, so every value is sent only once.
+def vega_lite(chart):
+    if 'bands' in chart:
+        return _vega_lite_bands(chart)
+    if 'contour' in chart:
+        return _vega_lite_heatmap(chart)
+    import pandas as pd
+
+    labels = [s['label'] for s in chart['series']]
+    data = pd.DataFrame({'Vuosi': chart['x'], **{s['label']: s['values'] for s in chart['series']}})
+    spec = {
+        'title': chart['title'],
+        'transform': [{'fold': labels, 'as': ['Sarja', 'Arvo']}],
+        'mark': {'type': 'line'},
+        'encoding': {
+            'x': {
+                'field': 'Vuosi',
+                'type': 'quantitative',
+                'title': chart['x_title'],
+                'axis': {'format': 'd', 'tickMinStep': 1},
+            },
+            'y': {
+                'field': 'Arvo',
+                'type': 'quantitative',
+                'title': chart['y_title'],
+                'axis': {'format': ',.1f'},
+            },
+            'color': {
+                'field': 'Sarja',
+                'type': 'nominal',
+                'sort': labels,
+                'scale': {'domain': labels, 'range': [s['color'] for s in chart['series']]},
+                'legend': {'title': None, 'orient': 'top-left'},
+            },
+            'strokeDash': {
+                'field': 'Sarja',
+                'type': 'nominal',
+                'sort': labels,
+                'scale': {
+                    'domain': labels,
+                    'range': [DASH_DASHED if s['dashed'] else DASH_SOLID for s in chart['series']],
+                },
+                'legend': None,
+            },
+            'tooltip': [
+                {'field': 'Sarja', 'type': 'nominal', 'title': 'Sarja'},
+                {'field': 'Vuosi', 'type': 'quantitative', 'title': chart['x_title'], 'format': 'd'},
+                {'field': 'Arvo', 'type': 'quantitative', 'title': chart['y_title'], 'format': ',.1f'},
+            ],
+        },
+        'config': {'locale': {'number': FINNISH_NUMBER_LOCALE}},
+    }
+    return data, spec
+
+
+# Function to export a chart as a PNG with matplotlib. Only used for downloads, so matplotlib
+# is imported lazily and the figure is not registered with pyplot, freeing it deterministically.
+def export_png(chart):
+    from matplotlib.figure import Figure
+    import matplotlib.ticker as mtick
+
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    if 'contour' in chart:
+        _draw_heatmap(fig, ax, chart)
+    for s in chart.get('series', []):
+        ax.plot(chart['x'], s['values'], label=s['label'], color=s['color'], linestyle='--' if s['dashed'] else '-')
+    for b in chart.get('bands', []):
+        ax.fill_between(chart['x'], b['lower'], b['upper'], color=b['color'], alpha=0.2)
+        ax.plot(chart['x'], b['median'], label=b['label'], color=b['color'])
+
+    ax.set_xlabel(chart['x_title'])
+    ax.set_ylabel(chart['y_title'])
+    ax.set_title(chart['title'])
+    if 'contour' not in chart:
+        ax.legend()
+        ax.grid(True)
+
+    # Format y-axis with Finnish number formatting
+    ax.yaxis.set_major_formatter(mtick.FuncFormatter(lambda x, pos: format_number_finnish(x)))
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, bbox_inches='tight', dpi=200, format='png')
+    fig.clear()
+    return buffer.getvalue()
+
+
+# Function to draw a heatmap with its zero contour on a matplotlib axis
+def _draw_heatmap(fig, ax, chart):
+    values = np.asarray(chart['values'], dtype=float)
+    limit = np.nanmax(np.abs(values)) if np.isfinite(values).any() else 1.0
+    mesh = ax.pcolormesh(chart['x'], chart['y'], values, cmap='RdBu', vmin=-limit, vmax=limit, shading='nearest')
+    colorbar = fig.colorbar(mesh, ax=ax)
+    colorbar.set_label(chart['value_title'])
+    if np.nanmin(values) < 0 < np.nanmax(values):
+        ax.contour(chart['x'], chart['y'], values, levels=[0], colors='black', linewidths=1)
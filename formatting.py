@@ -0,0 +1,50 @@
+from itertools import repeat
+
+import numpy as np
+
+# Translation table from Python number formatting to Finnish: space between thousands, comma as decimal point
+FINNISH_SEPARATORS = str.maketrans({',': ' ', '.': ','})
+
+
+# Function to format numbers in Finnish style with one decimal, NaN and infinite values become `missing`
+def format_number_finnish(value, is_percentage=False, missing='-'):
+    # Check if the value is a number
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        if not np.isfinite(value):
+            return missing
+        # Python's formatting rounds to one decimal from the exact binary value, round() of a
+        # NumPy float would scale by ten first and round some x.x5 values the other way
+        value = float(value)
+        if is_percentage:
+            formatted = f"{value:,.1f} %".translate(FINNISH_SEPARATORS)
+        else:
+            # Separate thousands with space and decimals with comma
+            formatted = f"{value:,.1f}".translate(FINNISH_SEPARATORS)
+        return formatted
+    else:
+        return value
+
+
+# Function to format a whole array of numbers in Finnish style with one decimal in one pass.
+# Gives the same strings as format_number_finnish, NaN and infinite values become `missing`.
+def format_numbers_finnish(values, is_percentage=False, missing='-'):
+    values = np.asarray(values, dtype=float)
+    if values.size == 0:
+        return np.empty(values.shape, dtype=object)
+    finite = np.isfinite(values)
+
+    # Python's formatting rounds correctly, so only the separators are replaced afterwards,
+    # with one str.translate call for the whole column instead of two replaces per cell
+    joined = '\n'.join(map(format, np.where(finite, values, 0.0).ravel().tolist(), repeat(',.1f')))
+    text = np.array(joined.translate(FINNISH_SEPARATORS).split('\n'), dtype=object).reshape(values.shape)
+    if is_percentage:
+        text = text + ' %'
+    text[~finite] = missing
+    return text
+
+
+# Function to format the given columns of a DataFrame in Finnish style, returns a new DataFrame
+def format_frame_finnish(df, columns, is_percentage=False, missing='-'):
+    formatted = df.copy()
+    formatted[columns] = format_numbers_finnish(df[columns].to_numpy(dtype=float), is_percentage, missing)
+    return formatted
@@ -0,0 +1,80 @@
+from cache import LRUCache, _MISSING
+
+
+# One computation step. The function is called with its dependencies as keyword arguments,
+# each dependency being either a raw input name or the name of another node.
+class Node:
+    def __init__(self, name, func, dependencies):
+        self.name = name
+        self.func = func
+        self.dependencies = list(dependencies)
+
+
+# Function to turn a node output into a hashable token when the output is small and hashable.
+# Downstream nodes are then keyed on the value itself, so they are not recomputed when an
+# upstream input changes without changing the upstream result.
+def _value_token(value):
+    if isinstance(value, dict):
+        value = tuple(sorted(value.items()))
+    try:
+        hash(value)
+    except TypeError:
+        return _MISSING
+    return ('value', value)
+
+
+# Dependency graph of computation nodes. Node values are kept in a process-wide LRU cache keyed
+# on the node name and the tokens of its direct dependencies, so on a rerun only the nodes whose
+# inputs changed are recomputed. The cache can be shared with other results by passing it in.
+class ComputationGraph:
+    def __init__(self, nodes, max_entries=256, ttl=None, cache=None):
+        names = {node.name for node in nodes}
+        self.nodes = {}
+        for node in nodes:
+            for name in node.dependencies:
+                if name in names and name not in self.nodes:
+                    raise ValueError(f"Node '{node.name}' depends on '{name}', which must be defined before it")
+            self.nodes[node.name] = node
+        self.cache = cache if cache is not None else LRUCache(max_entries=max_entries * len(self.nodes), ttl=ttl)
+
+    # Raw input names needed by the graph, in order of first use
+    def input_names(self):
+        names = []
+        for node in self.nodes.values():
+            for name in node.dependencies:
+                if name not in self.nodes and name not in names:
+                    names.append(name)
+        return names
+
+    # Evaluate every node in definition order (which is a topological order).
+    # Returns the node values, the node tokens and the names of the nodes that were recomputed.
+    # With a perf.Timer every recomputed node is timed in its own span. With pin=True the node
+    # values are pinned in the cache, so they do not expire with the time-to-live.
+    def evaluate(self, inputs, timer=None, pin=False):
+        missing = [name for name in self.input_names() if name not in inputs]
+        if missing:
+            raise ValueError(f"Missing inputs: {', '.join(missing)}")
+        values = {}
+        tokens = {}
+        recomputed = []
+        for name, node in self.nodes.items():
+            key = tuple(tokens[dep] if dep in self.nodes else inputs[dep] for dep in node.dependencies)
+            value = self.cache.get(('node', name) + key)
+            if value is _MISSING:
+                kwargs = {dep: values[dep] if dep in self.nodes else inputs[dep] for dep in node.dependencies}
+                if timer is None:
+                    value = node.func(**kwargs)
+                else:
+                    with timer.span(f'node:{name}'):
+                        value = node.func(**kwargs)
+                self.cache.put(('node', name) + key, value)
+                recomputed.append(name)
+            if pin:
+                self.cache.pin(('node', name) + key)
+            values[name] = value
+            token = _value_token(value)
+            tokens[name] = ('key', name, key) if token is _MISSING else token
+        return {'values': values, 'tokens': tokens, 'recomputed': recomputed}
+
+    def stats(self):
+        return self.cache.stats()
@@ -0,0 +1,53 @@
+import numpy as np
+
+
+# Function to calculate the value of the investments at the end of the investment period.
+# Contributions are made during the active years, after that the value only grows.
+# Works for scalars and arrays alike.
+def future_value(starting_amount, monthly_investment, annual_return_rate, active_years, total_years):
+    growth = (1 + annual_return_rate) ** active_years
+    safe_rate = np.where(annual_return_rate != 0, annual_return_rate, 1.0)
+    value_at_end_of_active = np.where(
+        annual_return_rate != 0,
+        starting_amount * growth + monthly_investment * 12 * (growth - 1) / safe_rate,
+        starting_amount + monthly_investment * 12 * active_years
+    )
+    return value_at_end_of_active * (1 + annual_return_rate) ** (total_years - active_years)
+
+
+# Function to calculate the yearly investment value for several monthly investment amounts at once.
+# Each monthly investment is one scenario (row), each investment year one column.
+# The growth factors (1 + r)^n are computed once and shared by every scenario.
+def investment_growth(starting_amount, monthly_investments, annual_return_rate,
+                      active_investment_period, total_investment_period, loan_term):
+    annual_investments = np.atleast_1d(np.asarray(monthly_investments, dtype=float))[:, None] * 12
+    n = np.arange(1, total_investment_period + 1)
+    growth = (1 + annual_return_rate) ** n
+
+    # During active investment period
+    if annual_return_rate != 0:
+        active = starting_amount * growth + annual_investments * (growth - 1) / annual_return_rate
+    else:
+        active = starting_amount + annual_investments * n
+    cumulative = active.copy()
+
+    # During passive investment period the value at the end of the active period keeps growing
+    if total_investment_period > active_investment_period:
+        value_at_end_of_active = active[:, active_investment_period - 1:active_investment_period]
+        years_after_active = n[active_investment_period:] - active_investment_period
+        cumulative[:, active_investment_period:] = value_at_end_of_active * growth[years_after_active - 1]
+
+    # Adjust investment arrays to match the loan term years, repeating the last value if needed
+    loan_years = np.minimum(np.arange(loan_term), total_investment_period - 1)
+    adjusted = cumulative[:, loan_years]
+
+    total = cumulative[:, -1]
+    total_active = cumulative[:, active_investment_period - 1] if active_investment_period > 0 else np.zeros(len(total))
+
+    return {
+        'cumulative': cumulative,
+        'adjusted': adjusted,
+        'total': total,
+        'total_active': total_active,
+        'total_passive': total - total_active,
+    }
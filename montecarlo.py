@@ -0,0 +1,85 @@
+import numpy as np
+
+DISTRIBUTIONS = ('normal', 'student_t')
+
+# Lowest possible annual return, keeps the growth factors positive
+MIN_ANNUAL_RETURN = -0.99
+
+
+# Function to draw annual returns for a chunk of paths. The fat-tailed Student t draws are
+# scaled so that their standard deviation equals the requested volatility.
+def draw_returns(rng, n_paths, n_years, mean, volatility, distribution='normal', degrees_of_freedom=4):
+    if distribution == 'normal':
+        shocks = rng.standard_normal((n_paths, n_years))
+    elif distribution == 'student_t':
+        if degrees_of_freedom <= 2:
+            raise ValueError('degrees_of_freedom must be greater than 2 for a finite volatility')
+        shocks = rng.standard_t(degrees_of_freedom, (n_paths, n_years)) * np.sqrt((degrees_of_freedom - 2) / degrees_of_freedom)
+    else:
+        raise ValueError(f"Unknown distribution '{distribution}', expected one of {DISTRIBUTIONS}")
+    return np.maximum(mean + volatility * shocks, MIN_ANNUAL_RETURN)
+
+
+# Function to simulate the yearly investment value on random return paths for several monthly
+# investment amounts at once, with the same active/passive contribution schedule as
+# investment.investment_growth. All scenarios share the same return paths.
+#
+# The paths are generated in chunks from a seeded generator, so the temporary arrays stay at
+# chunk_size x years while the yearly values are kept as float32 for the percentiles.
+# Returns the percentile bands (scenario x percentile x year) and the final values
+# (scenario x path).
+def simulate_investments(starting_amount, monthly_investments, mean, volatility,
+                         active_investment_period, total_investment_period,
+                         n_paths=10_000, distribution='normal', degrees_of_freedom=4,
+                         seed=0, chunk_size=10_000, percentiles=(5, 50, 95)):
+    annual_investments = np.atleast_1d(np.asarray(monthly_investments, dtype=float)) * 12
+    n = np.arange(1, total_investment_period + 1)
+
+    # Contributions are made at the end of each active year, nothing during the passive years
+    contributions = np.where(n <= active_investment_period, annual_investments[:, None], 0.0)[:, None, :]
+
+    rng = np.random.default_rng(seed)
+    values = np.empty((len(annual_investments), total_investment_period, n_paths), dtype=np.float32)
+    for start in range(0, n_paths, chunk_size):
+        size = min(chunk_size, n_paths - start)
+        returns = draw_returns(rng, size, total_investment_period, mean, volatility, distribution, degrees_of_freedom)
+
+        # V_n = G_n * (S + sum_k C_k / G_k) where G_n is the cumulative growth up to year n
+        growth = np.cumprod(1 + returns, axis=1)
+        chunk_values = growth * (starting_amount + np.cumsum(contributions / growth, axis=2))
+        values[:, :, start:start + size] = np.swapaxes(chunk_values, 1, 2)
+
+    # Percentiles one scenario at a time, sorting the stored values in place to avoid a full copy
+    final = values[:, -1, :].astype(float)
+    bands = np.stack([
+        np.percentile(scenario_values, percentiles, axis=1, overwrite_input=True) for scenario_values in values
+    ])
+
+    return {
+        'percentiles': np.asarray(percentiles),
+        'bands': bands,
+        'final': final,
+        'investment_years': n,
+    }
+
+
+# Function to run the loan and rent scenarios of the calculator on random return paths.
+# Reports the percentile bands of both and the probability that the net worth when renting
+# beats the net worth with the house (investments plus the property value at the end).
+def simulate_net_worth(starting_amount, monthly_investment, difference, property_value_end, mean, volatility,
+                       active_investment_period, total_investment_period, **options):
+    simulation = simulate_investments(
+        starting_amount,
+        [monthly_investment, monthly_investment + max(difference, 0)],
+        mean,
+        volatility,
+        active_investment_period,
+        total_investment_period,
+        **options
+    )
+    net_worth_house = simulation['final'][0] + property_value_end
+    net_worth_rent = simulation['final'][1] if difference > 0 else simulation['final'][0]
+    simulation['net_worth_house'] = np.percentile(net_worth_house, simulation['percentiles'])
+    simulation['net_worth_rent'] = np.percentile(net_worth_rent, simulation['percentiles'])
+    simulation['probability_rent_wins'] = float(np.mean(net_worth_rent > net_worth_house))
+    return simulation
@@ -0,0 +1,62 @@
+import numpy as np
+
+# Default annual property appreciation in percent
+PROPERTY_APPRECIATION = 2.0
+
+
+# Function to get the growth factor of every year relative to the first year: 1 for the first
+# year, then the cumulative product of (1 + growth). The growth in percent is either one number
+# or one value per year (the last one repeated if there are fewer values than years).
+def growth_factors(growth, n_years):
+    rates = _per_year(np.asarray(growth, dtype=float) / 100, n_years)
+    factors = np.ones(n_years)
+    if n_years > 1:
+        factors[1:] = np.cumprod(1 + rates[:-1])
+    return factors
+
+
+# Function to turn a parameter into its value for every year. A parameter is one of
+#   a number                              the same value every year
+#   {'value': x, 'growth': percent}       x in the first year, growing by the percent (or per-year percents)
+#   a sequence of values                  explicit yearly values, the last one repeated if too short
+def yearly_values(parameter, n_years):
+    if isinstance(parameter, dict):
+        return parameter['value'] * growth_factors(parameter.get('growth', 0.0), n_years)
+    return _per_year(np.asarray(parameter, dtype=float), n_years)
+
+
+# Function to get the cumulative yearly sum of a monthly parameter, e.g. rent or vastike
+def cumulative_annual(parameter, n_years):
+    return np.cumsum(yearly_values(parameter, n_years) * 12)
+
+
+# Function to get the average growth factor over n_years of constant growth in percent, i.e. the
+# mean of growth_factors in closed form. Broadcasts over arrays like appreciated_value, so an
+# array here is one growth per profile, not per-year growth (use growth_factors for that).
+def average_growth_factor(growth, n_years):
+    rate = np.asarray(growth, dtype=float) / 100
+    safe_rate = np.where(rate == 0, 1.0, rate)
+    return np.where(rate == 0, 1.0, ((1 + rate) ** n_years - 1) / (safe_rate * n_years))
+
+
+# Function to get the growth factor after n_years, i.e. the value at the end relative to the start:
+# (1 + growth) ** n_years for one percent, the product of the yearly factors for per-year percents
+def final_growth_factor(growth, n_years):
+    rates = np.asarray(growth, dtype=float) / 100
+    if rates.ndim == 0:
+        return (1 + rates) ** n_years
+    return float(np.prod(1 + _per_year(rates, n_years)))
+
+
+# Function to get the value after n_years of annual appreciation in percent. Broadcasts over
+# arrays of values, rates and years, so it works for one profile and for batches alike.
+def appreciated_value(initial_value, appreciation, n_years):
+    return initial_value * (1 + np.asarray(appreciation, dtype=float) / 100) ** n_years
+
+
+def _per_year(values, n_years):
+    if values.ndim == 0:
+        return np.full(n_years, float(values))
+    if len(values) == 0:
+        raise ValueError('A yearly parameter needs at least one value')
+    return values[np.minimum(np.arange(n_years), len(values) - 1)]
@@ -0,0 +1,71 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Environment variables: EGNA_PERF=1 switches the timing on, EGNA_PERF_LOG=<path> appends one JSON line per rerun
+ENABLED_ENV = 'EGNA_PERF'
+LOG_ENV = 'EGNA_PERF_LOG'
+
+# Shared by every disabled span, so a disabled timer allocates nothing per span
+_NULL_SPAN = nullcontext()
+
+_log_lock = threading.Lock()
+
+
+# Named timing spans and counters of one script run. When disabled, span() returns a shared
+# no-op context manager and count() returns immediately, so the instrumentation can stay in place.
+class Timer:
+    def __init__(self, enabled=False, log_path=None):
+        self.enabled = enabled
+        self.log_path = log_path
+        self.spans = []
+        self.counters = {}
+        self._depth = 0
+        self._start = time.perf_counter()
+
+    # Timer switched on by the environment variable or by the caller (e.g. a ?debug=1 query param)
+    @classmethod
+    def from_environment(cls, enabled=False):
+        log_path = os.environ.get(LOG_ENV) or None
+        enabled = enabled or os.environ.get(ENABLED_ENV, '') not in ('', '0') or log_path is not None
+        return cls(enabled=enabled, log_path=log_path)
+
+    def span(self, name):
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._timed_span(name)
+
+    @contextmanager
+    def _timed_span(self, name):
+        # The span is recorded when it starts, so nested spans follow their parent in the report
+        span = {'name': name, 'depth': self._depth, 'ms': None}
+        self.spans.append(span)
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            span['ms'] = (time.perf_counter() - start) * 1000
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    # Spans in the order they started, with the total time since the timer was created
+    def report(self):
+        return {
+            'total_ms': (time.perf_counter() - self._start) * 1000,
+            'spans': [dict(span) for span in self.spans],
+            'counters': dict(self.counters),
+        }
+
+    # Append the report as one JSON line to the log file, with extra fields such as the app name
+    def flush(self, **fields):
+        if not self.enabled or self.log_path is None:
+            return
+        line = json.dumps({'timestamp': time.time(), **fields, **self.report()})
+        with _log_lock, open(self.log_path, 'a', encoding='utf-8') as log:
+            log.write(line + '\n')
@@ -0,0 +1,121 @@
+import numpy as np
+
+from amortization import annuity_payment
+
+
+# Function to build a vector of extra principal payments per month: lump sums at given
+# (1-based) months and a recurring monthly extra payment between start_month and end_month
+def extra_payment_vector(n_months, lump_sums=None, monthly=0.0, start_month=1, end_month=None):
+    extra = np.zeros(n_months)
+    end_month = n_months if end_month is None else min(end_month, n_months)
+    if monthly and start_month <= end_month:
+        extra[start_month - 1:end_month] = monthly
+    for month, amount in (lump_sums or {}).items():
+        if 1 <= month <= n_months:
+            extra[month - 1] += amount
+    return extra
+
+
+# Function to build a vector marking the payment holiday (lyhennysvapaa) months,
+# length months starting from the (1-based) start_month
+def holiday_vector(n_months, start_month=1, length=0):
+    holidays = np.zeros(n_months, dtype=bool)
+    if length > 0:
+        holidays[start_month - 1:start_month - 1 + length] = True
+    return holidays
+
+
+# Function to calculate the schedule of an annuity loan with extra payments and payment holidays.
+# The monthly payment stays at the original annuity, so extra payments shorten the loan and holidays
+# lengthen it. During a holiday month only the interest is paid. Extra payments and holidays are
+# vectors per month, or one row per strategy (strategies x months) to evaluate many at once.
+#
+# The balance follows the linear recurrence B[k+1] = a[k] * B[k] + c[k], with a = 1 + r and
+# c = -(payment + extra) in normal months and a = 1, c = -extra in holiday months. With A the
+# cumulative product of a, B[k] = A[k] * (B[0] + sum(c[j] / A[j+1])), so every strategy is
+# solved with cumprod and cumsum instead of a loop over the months.
+def prepayment_schedule(loan_amount, loan_rate, loan_term, extra_payments=None, holidays=None):
+    monthly_interest_rate = loan_rate / 100 / 12
+    monthly_payment = float(annuity_payment(loan_amount, loan_rate, loan_term))
+
+    extra = np.zeros(loan_term * 12) if extra_payments is None else np.asarray(extra_payments, dtype=float)
+    holiday = np.zeros(extra.shape[-1], dtype=bool) if holidays is None else np.asarray(holidays, dtype=bool)
+    single = extra.ndim == 1 and holiday.ndim == 1
+
+    # Holidays move the end of the loan later, so the horizon covers the loan term plus every holiday month
+    extra = np.atleast_2d(extra)
+    holiday = np.atleast_2d(holiday)
+    n_months = max(loan_term * 12 + int(holiday.sum(axis=1).max()), extra.shape[1], holiday.shape[1])
+    extra = _pad_months(extra, n_months)
+    holiday = _pad_months(holiday, n_months)
+    extra, holiday = np.broadcast_arrays(extra, holiday)
+
+    growth = np.where(holiday, 1.0, 1 + monthly_interest_rate)
+    step = -(extra + np.where(holiday, 0.0, monthly_payment))
+    cumulative_growth = np.cumprod(growth, axis=1)
+    balance_after = cumulative_growth * (loan_amount + np.cumsum(step / cumulative_growth, axis=1))
+    balance_before = np.concatenate([np.full((len(balance_after), 1), float(loan_amount)), balance_after[:, :-1]], axis=1)
+
+    # The loan is paid off in the first month the balance reaches zero, the last payment only covers what is left
+    paid_off = balance_after <= 1e-6
+    payoff_month = np.where(paid_off.any(axis=1), paid_off.argmax(axis=1) + 1, n_months)
+    active = np.arange(1, n_months + 1) <= payoff_month[:, None]
+
+    balance_before = np.where(active, balance_before, 0.0)
+    interests = balance_before * monthly_interest_rate
+    payments = np.where(active, np.minimum(balance_before + interests, np.where(holiday, interests, monthly_payment) + extra), 0.0)
+    principals = payments - interests
+    balance = np.where(active, np.maximum(balance_after, 0.0), 0.0)
+
+    # Baseline without extra payments or holidays, paid off after loan_term years
+    baseline_payments = np.where(np.arange(n_months) < loan_term * 12, monthly_payment, 0.0)
+    baseline_interest = monthly_payment * loan_term * 12 - loan_amount
+    total_interest = interests.sum(axis=1)
+
+    schedule = {
+        'monthly_payment': monthly_payment,
+        'payments': payments,
+        'interests': interests,
+        'principals': principals,
+        'balance': balance,
+        'payoff_month': payoff_month,
+        'total_interest': total_interest,
+        'interest_saved': baseline_interest - total_interest,
+        'months_saved': loan_term * 12 - payoff_month,
+        # Cash left over each month compared with the plain annuity, negative while paying extra
+        'investable_cash': baseline_payments - payments,
+    }
+    if single:
+        schedule = {name: value[0] if isinstance(value, np.ndarray) else value for name, value in schedule.items()}
+    return schedule
+
+
+# Function to calculate the value at the end of the horizon of investing the monthly investable cash,
+# with monthly compounding of the annual return in percent. Works for one or many strategies.
+def investable_cash_value(investable_cash, investment_rate):
+    investable_cash = np.asarray(investable_cash, dtype=float)
+    monthly_rate = investment_rate / 100 / 12
+    months_left = np.arange(investable_cash.shape[-1] - 1, -1, -1)
+    return (investable_cash * (1 + monthly_rate) ** months_left).sum(axis=-1)
+
+
+# Function to get the balance at the end of every loan year from monthly balances. When a holiday
+# makes the horizon a part year longer, the last year ends with the last month.
+def annual_balance(balance):
+    balance = np.asarray(balance)
+    n_years = -(-balance.shape[-1] // 12)
+    year_ends = np.minimum(np.arange(1, n_years + 1) * 12, balance.shape[-1]) - 1
+    return balance[..., year_ends]
+
+
+# Function to get the balance of the plain annuity at the end of every year over n_years,
+# zero once the loan term is over
+def baseline_annual_balance(loan_amount, cumulative_annual_principal, n_years):
+    remaining = loan_amount - np.asarray(cumulative_annual_principal, dtype=float)
+    return np.append(remaining, np.zeros(max(n_years - len(remaining), 0)))[:n_years]
+
+
+def _pad_months(values, n_months):
+    if values.shape[1] >= n_months:
+        return values
+    return np.pad(values, ((0, 0), (0, n_months - values.shape[1])))
@@ -0,0 +1,114 @@
+import numpy as np
+
+from amortization import annuity_payment
+from investment import future_value
+from parameters import PROPERTY_APPRECIATION, appreciated_value, average_growth_factor
+
+PENSION_AGE = 69
+
+# Default values used for columns missing from the profiles, same as the sidebar defaults in app.py
+DEFAULT_PROFILE = {
+    'loan_amount': 300_000,
+    'vastike': 100,
+    'initial_property_value': 300_000,
+    'loan_term': 25,
+    'loan_rate': 3.0,
+    'starting_amount': 0,
+    'monthly_investment': 500,
+    'investment_rate': 5,
+    'active_investment_period': 25,
+    'age': 30,
+    'monthly_rent': 1_200,
+    'net_salary': 3_000,
+    # Annual growth in percent of the rent, the vastike and the net salary, and the property appreciation
+    'rent_growth': 0.0,
+    'vastike_growth': 0.0,
+    'salary_growth': 0.0,
+    'property_appreciation': PROPERTY_APPRECIATION,
+}
+
+# Function to read the profile columns from a DataFrame or a dict of arrays and broadcast them to one shape
+def profile_columns(profiles):
+    columns = {}
+    for name, default in DEFAULT_PROFILE.items():
+        columns[name] = np.asarray(profiles[name] if name in profiles else default, dtype=float)
+    broadcast = np.broadcast_arrays(*columns.values())
+    return {name: np.ravel(values) for name, values in zip(columns, broadcast)}
+
+
+# Function to calculate the total interest and principal paid over each loan term.
+# The annuity pays the loan off exactly, so the payments sum to the loan amount plus the interest
+# and no (profiles x months) schedule is needed.
+def loan_totals(loan_amount, loan_rate, loan_term):
+    monthly_payment = annuity_payment(loan_amount, loan_rate, loan_term)
+    total_payments = monthly_payment * loan_term * 12
+    return monthly_payment, total_payments - loan_amount, loan_amount.copy()
+
+
+# Function to calculate the investment value and the net worth of both scenarios for broadcast
+# profile columns, given the monthly loan payment. Needs no amortization schedule, so solvers
+# can call it repeatedly while varying one column.
+def net_worth(p, monthly_payment):
+    # Investment calculations
+    annual_return_rate = p['investment_rate'] / 100
+    total_investment_period = PENSION_AGE - p['age']
+
+    total_investment = future_value(
+        p['starting_amount'], p['monthly_investment'], annual_return_rate,
+        p['active_investment_period'], total_investment_period
+    )
+
+    # Difference in money left after expenses between renting and taking the loan,
+    # with the rent and the vastike averaged over the loan term
+    average_vastike = p['vastike'] * average_growth_factor(p['vastike_growth'], p['loan_term'])
+    average_rent = p['monthly_rent'] * average_growth_factor(p['rent_growth'], p['loan_term'])
+    difference = np.where(
+        p['net_salary'] > 0,
+        monthly_payment + average_vastike - average_rent,
+        0.0
+    )
+    total_investment_new = future_value(
+        p['starting_amount'], p['monthly_investment'] + np.maximum(difference, 0), annual_return_rate,
+        p['active_investment_period'], total_investment_period
+    )
+
+    property_value_end = appreciated_value(p['initial_property_value'], p['property_appreciation'], p['loan_term'])
+    net_worth_house = total_investment + property_value_end
+    net_worth_rent = np.where(difference > 0, total_investment_new, total_investment)
+
+    return {
+        'total_investment': total_investment,
+        'net_worth_house': net_worth_house,
+        'net_worth_rent': net_worth_rent,
+        'difference_net_worth': net_worth_house - net_worth_rent,
+        'valid': PENSION_AGE - p['age'] >= p['active_investment_period'],
+    }
+
+
+# Function to evaluate the mortgage and rent scenarios for many profiles at once.
+# Accepts a DataFrame or a dict of column arrays, missing columns fall back to DEFAULT_PROFILE.
+# Profiles whose age and active investment period exceed the pension age get NaN results.
+def evaluate_profiles(profiles):
+    p = profile_columns(profiles)
+
+    monthly_payment, total_interest, total_principal = loan_totals(p['loan_amount'], p['loan_rate'], p['loan_term'])
+
+    worth = net_worth(p, monthly_payment)
+    valid = worth['valid']
+
+    results = {
+        'total_interest': total_interest,
+        'total_principal': total_principal,
+        'total_investment': worth['total_investment'],
+        'net_worth_house': worth['net_worth_house'],
+        'net_worth_rent': worth['net_worth_rent'],
+        'difference_net_worth': worth['difference_net_worth'],
+    }
+    for name in ('total_investment', 'net_worth_house', 'net_worth_rent', 'difference_net_worth'):
+        results[name] = np.where(valid, results[name], np.nan)
+
+    # Return a DataFrame with the same index when a DataFrame was given
+    if hasattr(profiles, 'index') and hasattr(profiles, 'columns'):
+        import pandas as pd
+        return pd.DataFrame(results, index=profiles.index)
+    return results
@@ -0,0 +1,61 @@
+import numpy as np
+
+from scenarios import DEFAULT_PROFILE, evaluate_profiles
+
+# Parameters that can be swept, with their labels and the same ranges as the sidebar sliders in app.py
+SENSITIVITY_PARAMETERS = {
+    'loan_rate': ('Lainakorko (%)', 0.0, 10.0),
+    'investment_rate': ('Sijoituksen tuottoprosentti (%)', 0.0, 20.0),
+    'monthly_rent': ('Kuukausittainen vuokra (€)', 0.0, 4_000.0),
+    'loan_amount': ('Lainan kokonaissumma (€)', 0.0, 2_000_000.0),
+    'initial_property_value': ('Asunnon arvo ostohetkellä (€)', 0.0, 2_000_000.0),
+    'vastike': ('Vastike (€)', 0.0, 2_000.0),
+    'monthly_investment': ('Kuukausittainen sijoitus (€)', 0.0, 10_000.0),
+    'starting_amount': ('Alkupääoma (€)', 0.0, 1_000_000.0),
+    'rent_growth': ('Vuokran vuotuinen korotus (%)', 0.0, 10.0),
+    'property_appreciation': ('Asunnon vuotuinen arvonnousu (%)', -5.0, 10.0),
+}
+
+
+# Function to evaluate difference_net_worth (house minus rent) over a grid of two parameters in one
+# broadcasted pass, every other input taken from the profile. Rows follow y_name, columns x_name.
+def sensitivity_grid(profile, x_name, y_name, resolution=100):
+    if x_name == y_name:
+        raise ValueError('The two swept parameters must be different')
+    _, x_min, x_max = SENSITIVITY_PARAMETERS[x_name]
+    _, y_min, y_max = SENSITIVITY_PARAMETERS[y_name]
+    x = np.linspace(x_min, x_max, resolution)
+    y = np.linspace(y_min, y_max, resolution)
+
+    profiles = {name: profile.get(name, default) for name, default in DEFAULT_PROFILE.items()}
+    profiles[x_name] = x[None, :]
+    profiles[y_name] = y[:, None]
+    difference = evaluate_profiles(profiles)['difference_net_worth'].reshape(resolution, resolution)
+    return {'x': x, 'y': y, 'difference_net_worth': difference}
+
+
+# Function to find the break-even points of the grid, where difference_net_worth changes sign.
+# Crossings are interpolated linearly along both rows and columns, which traces the zero contour.
+def break_even_points(x, y, values):
+    points_x = []
+    points_y = []
+
+    # Crossings between horizontally neighbouring cells
+    left, right = values[:, :-1], values[:, 1:]
+    rows, cols = np.nonzero(np.signbit(left) != np.signbit(right))
+    fraction = left[rows, cols] / (left[rows, cols] - right[rows, cols])
+    points_x.append(x[cols] + fraction * (x[cols + 1] - x[cols]))
+    points_y.append(y[rows])
+
+    # Crossings between vertically neighbouring cells
+    lower, upper = values[:-1, :], values[1:, :]
+    rows, cols = np.nonzero(np.signbit(lower) != np.signbit(upper))
+    fraction = lower[rows, cols] / (lower[rows, cols] - upper[rows, cols])
+    points_x.append(x[cols])
+    points_y.append(y[rows] + fraction * (y[rows + 1] - y[rows]))
+
+    # NaN cells (invalid profiles) have no break-even
+    points_x = np.concatenate(points_x)
+    points_y = np.concatenate(points_y)
+    finite = np.isfinite(points_x) & np.isfinite(points_y)
+    return points_x[finite], points_y[finite]
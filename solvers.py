@@ -0,0 +1,120 @@
+import numpy as np
+
+from amortization import annuity_payment
+from parameters import average_growth_factor
+from scenarios import PENSION_AGE, net_worth, profile_columns
+
+# Bisection halves the bracket on every iteration, 60 iterations narrow any bracket below float precision
+BISECTION_ITERATIONS = 60
+
+# Largest accepted debt-to-income ratio in percent
+MAX_DTI_RATIO = 40
+
+# Shortest and longest loan term offered in the sidebar, in years
+MIN_LOAN_TERM = 5
+MAX_LOAN_TERM = 40
+
+
+# Function to find a root of func between lower and upper for many rows at once with bisection.
+# func takes an array of candidate values (one per row) and returns an array of the same shape.
+# Every row runs the same fixed number of iterations, rows whose bracket has no sign change get NaN.
+def bisect(func, lower, upper, iterations=BISECTION_ITERATIONS):
+    lower, upper = np.broadcast_arrays(np.asarray(lower, dtype=float), np.asarray(upper, dtype=float))
+    f_start = func(lower)
+    f_end = func(upper)
+    root = np.where(f_start == 0, lower, np.where(f_end == 0, upper, np.nan))
+    bracketed = np.isnan(root) & (np.signbit(f_start) != np.signbit(f_end)) & ~np.isnan(f_start) & ~np.isnan(f_end)
+
+    f_lower = f_start
+    for _ in range(iterations):
+        middle = (lower + upper) / 2
+        f_middle = func(middle)
+        # Keep the half where the sign changes
+        left = np.signbit(f_middle) != np.signbit(f_lower)
+        upper = np.where(left, middle, upper)
+        lower = np.where(left, lower, middle)
+        f_lower = np.where(left, f_lower, f_middle)
+
+    return np.where(bracketed, (lower + upper) / 2, root)
+
+
+# Function to find the monthly rent (in the first year) at which renting and buying end with the
+# same net worth. Once the rent averaged over the loan term reaches the loan payment plus the
+# average vastike there is nothing extra to invest when renting, so the search runs between zero
+# and the first-year rent of that point. Profiles with no break-even get NaN.
+def break_even_rent(profiles, iterations=BISECTION_ITERATIONS):
+    p = profile_columns(profiles)
+    monthly_payment = annuity_payment(p['loan_amount'], p['loan_rate'], p['loan_term'])
+    average_vastike = p['vastike'] * average_growth_factor(p['vastike_growth'], p['loan_term'])
+    upper = (monthly_payment + average_vastike) / average_growth_factor(p['rent_growth'], p['loan_term'])
+
+    def difference(monthly_rent):
+        return net_worth({**p, 'monthly_rent': monthly_rent}, monthly_payment)['difference_net_worth']
+
+    rent = bisect(difference, 0.0, upper, iterations)
+    return np.where(_valid(p), rent, np.nan)
+
+
+# Function to find the annual investment return (in percent) at which renting and buying end
+# with the same net worth, searched between lower and upper. Profiles with no break-even get NaN.
+def break_even_investment_rate(profiles, lower=0.0, upper=20.0, iterations=BISECTION_ITERATIONS):
+    p = profile_columns(profiles)
+    monthly_payment = annuity_payment(p['loan_amount'], p['loan_rate'], p['loan_term'])
+
+    def difference(investment_rate):
+        return net_worth({**p, 'investment_rate': investment_rate}, monthly_payment)['difference_net_worth']
+
+    rate = bisect(difference, lower, upper, iterations)
+    return np.where(_valid(p), rate, np.nan)
+
+
+# Function to find the largest loan amount whose payment plus vastike keeps the DTI under the limit.
+# The annuity payment is linear in the loan amount, so this one is solved directly.
+def max_affordable_loan(profiles, max_dti=MAX_DTI_RATIO):
+    p = profile_columns(profiles)
+    budget = p['net_salary'] * max_dti / 100 - p['vastike']
+    payment_per_euro = annuity_payment(1.0, p['loan_rate'], p['loan_term'])
+    return np.where(p['net_salary'] > 0, np.maximum(budget, 0) / payment_per_euro, np.nan)
+
+
+# Function to find the shortest loan term in whole years that keeps the DTI under the limit,
+# no shorter than min_term (the shortest term the sidebar offers). The payment falls as the term
+# grows, so the continuous term is bisected and rounded up. Profiles that stay over the limit
+# even with the longest term get NaN.
+def min_loan_term(profiles, max_dti=MAX_DTI_RATIO, min_term=MIN_LOAN_TERM, max_term=MAX_LOAN_TERM,
+                  iterations=BISECTION_ITERATIONS):
+    p = profile_columns(profiles)
+    budget = p['net_salary'] * max_dti / 100 - p['vastike']
+
+    def excess(loan_term):
+        return annuity_payment(p['loan_amount'], p['loan_rate'], loan_term) - budget
+
+    term = np.ceil(bisect(excess, float(min_term), float(max_term), iterations))
+
+    # Bisection stops just above an exact whole-year root, so check the year below as well
+    shorter = np.maximum(term - 1, min_term)
+    term = np.where(excess(np.nan_to_num(shorter, nan=max_term)) <= 0, shorter, term)
+
+    # Already affordable with the shortest term
+    term = np.where(excess(float(min_term)) <= 0, float(min_term), term)
+    return np.where(p['net_salary'] > 0, term, np.nan)
+
+
+# Function to run every solver for the profiles. Returns a DataFrame with the same index when
+# a DataFrame was given, otherwise a dict of arrays.
+def solve_profiles(profiles, max_dti=MAX_DTI_RATIO):
+    results = {
+        'break_even_rent': break_even_rent(profiles),
+        'break_even_investment_rate': break_even_investment_rate(profiles),
+        'max_affordable_loan': max_affordable_loan(profiles, max_dti),
+        'min_loan_term': min_loan_term(profiles, max_dti),
+    }
+    if hasattr(profiles, 'index') and hasattr(profiles, 'columns'):
+        import pandas as pd
+        return pd.DataFrame(results, index=profiles.index)
+    return results
+
+
+# Profiles whose age and active investment period exceed the pension age have no net worth
+def _valid(p):
+    return PENSION_AGE - p['age'] >= p['active_investment_period']
@@ -0,0 +1,89 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+import pytest
+
+from amortization import amortization_schedule, amortization_schedule_cents, annuity_payment
+
+LOANS = [(300_000, 3.0, 25), (150_000.55, 4.7, 10), (2_000_000, 10.0, 40), (50_000, 0.0, 5), (80_000, 0.35, 30)]
+
+
+# Largest rounding drift in euros the last payment can absorb: a cent of payment and interest
+# rounding every month, grown with the loan rate to the end of the term
+def drift_bound(loan_rate, loan_term):
+    rate = loan_rate / 100 / 12
+    months = loan_term * 12
+    return 0.01 * (((1 + rate) ** months - 1) / rate if rate else months)
+
+
+# Bank statement arithmetic month by month with Decimal
+def decimal_schedule(loan_amount, loan_rate, loan_term):
+    cent = Decimal('0.01')
+    balance = Decimal(str(loan_amount)).quantize(cent, ROUND_HALF_UP)
+    rate = Decimal(str(loan_rate)) / 100 / 12
+    payment = Decimal(str(float(annuity_payment(float(balance), loan_rate, loan_term)))).quantize(cent, ROUND_HALF_UP)
+    interests, principals = [], []
+    for _ in range(loan_term * 12):
+        interest = (balance * rate).quantize(cent, ROUND_HALF_UP)
+        principal = min(payment - interest, balance)
+        interests.append(interest)
+        principals.append(principal)
+        balance -= principal
+    principals[-1] += balance
+    return [int(value * 100) for value in interests], [int(value * 100) for value in principals]
+
+
+@pytest.mark.parametrize('loan_amount, loan_rate, loan_term', LOANS)
+def test_cents_match_decimal_reference(loan_amount, loan_rate, loan_term):
+    cents = amortization_schedule_cents(loan_amount, loan_rate, loan_term)
+    interests, principals = decimal_schedule(loan_amount, loan_rate, loan_term)
+    assert cents['monthly_interests'].tolist() == interests
+    assert cents['monthly_principals'].tolist() == principals
+
+
+@pytest.mark.parametrize('loan_amount, loan_rate, loan_term', LOANS)
+def test_cents_within_tolerance_of_float_engine(loan_amount, loan_rate, loan_term):
+    exact = amortization_schedule(loan_amount, loan_rate, loan_term, exact=True)
+    schedule = amortization_schedule(loan_amount, loan_rate, loan_term)
+    bound = drift_bound(loan_rate, loan_term)
+
+    # Every regular payment is the float payment rounded to cents
+    assert np.abs(exact['monthly_payments'][:-1] - schedule['monthly_payment']).max() <= 0.005 + 1e-9
+    # The balance ends at exactly zero and the last payment absorbs the drift
+    assert round(exact['monthly_principals'].sum(), 2) == round(loan_amount, 2)
+    assert abs(exact['monthly_payments'][-1] - schedule['monthly_payment']) <= bound
+    # Interest differs by the rounding of the month plus the interest on the drifted balance
+    interest_tolerance = 0.005 + loan_rate / 100 / 12 * bound + 1e-9
+    assert np.abs(exact['monthly_interests'] - schedule['monthly_interests']).max() <= interest_tolerance
+    assert abs(exact['cumulative_annual_interest'][-1] - schedule['cumulative_annual_interest'][-1]) <= bound
+
+
+def test_final_adjustment_examples():
+    # Half-up rounding of the payment leaves the drift to the last payment, in either direction
+    for loan, expected in [((300_000, 3.0, 25), 1.82), ((2_000_000, 10.0, 40), -12.60)]:
+        cents = amortization_schedule_cents(*loan)
+        assert (cents['monthly_payments'][-1] - cents['monthly_payment']) / 100 == pytest.approx(expected)
+
+
+def test_many_loans_match_single_loans():
+    # The single loan path computes the payment and the interests without NumPy, the cents must still agree
+    amounts = np.array([100_000, 250_000.25, 399_999.99, 123_456.78, 50_000])
+    rates = np.array([1.5, 3.0, 6.25, 3.37, 0.0])
+    batch = amortization_schedule_cents(amounts, rates, 20)
+    for row, (amount, rate) in enumerate(zip(amounts, rates)):
+        single = amortization_schedule_cents(amount, rate, 20)
+        for name in ('monthly_payment', 'monthly_interests', 'monthly_principals', 'monthly_payments'):
+            assert np.array_equal(batch[name][row], single[name])
+
+
+@pytest.mark.parametrize('loan_amount, loan_rate, loan_term', LOANS)
+def test_closed_form_matches_month_by_month_loop(loan_amount, loan_rate, loan_term):
+    schedule = amortization_schedule(loan_amount, loan_rate, loan_term)
+    rate = loan_rate / 100 / 12
+    balance = loan_amount
+    interests = []
+    for _ in range(loan_term * 12):
+        interests.append(balance * rate)
+        balance -= schedule['monthly_payment'] - balance * rate
+    assert schedule['monthly_interests'] == pytest.approx(interests, abs=1e-6)
+    assert balance == pytest.approx(0, abs=1e-6)
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+import triage
+from load_test import Session, free_port, start_server
+
+NO = 1
+YES = 2
+
+
+@pytest.fixture(scope='module')
+def server_url():
+    port = free_port()
+    server = start_server('app_ct.py', port)
+    yield f'ws://127.0.0.1:{port}'
+    server.terminate()
+    server.wait(timeout=10)
+
+
+def outcomes(session):
+    return [element.markdown.body for element in session.elements if element.WhichOneof('type') == 'markdown' and '<h1' in element.markdown.body]
+
+
+# Answer the radios one at a time with fragment reruns like the browser, returns the session
+async def answer(url, steps):
+    session = Session(url)
+    await session.connect()
+    try:
+        await session.rerun()
+        for key, value in steps:
+            radio = session.find('radio', key=key)
+            session.set_radio(radio, value)
+            await session.rerun(session.widget_fragments[radio.id])
+        return session
+    finally:
+        session.close()
+
+
+def test_answers_from_an_abandoned_path_do_not_come_back(server_url):
+    session = asyncio.run(answer(server_url, [
+        ('question_1', NO), ('question_2', NO), ('question_3', YES), ('question_1', YES), ('question_1', NO),
+    ]))
+    assert outcomes(session) == []
+    assert session.find('radio', key='question_2') is not None
+    assert session.find('radio', key='question_3') is None
+
+
+def test_outcome_after_fragment_reruns(server_url):
+    session = asyncio.run(answer(server_url, [('question_1', NO), ('question_2', NO), ('question_3', YES)]))
+    assert outcomes(session) == [triage.outcome_markup('ct_1h')]
+
+
+def test_questions_after():
+    assert triage.questions_after('question_8') == [f'question_{number}' for number in range(9, 14)]
+    assert triage.questions_after('question_9') == []
+    assert triage.questions_after('question_10') == ['question_11', 'question_12', 'question_13']
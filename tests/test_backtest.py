@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest
+
+
+def synthetic_history(n_months, seed=0):
+    rng = np.random.default_rng(seed)
+    history = np.empty(n_months, dtype=backtest.HISTORY_DTYPE)
+    history['month'] = [(2000 + month // 12) * 100 + month % 12 + 1 for month in range(n_months)]
+    history['equity'] = rng.normal(0.006, 0.04, n_months)
+    history['house'] = rng.normal(0.002, 0.01, n_months)
+    return history
+
+
+# Month by month simulation of one window: grow, then contribute at the end of the month
+def window_loop(history, start, starting_amount, monthly_investment, active_months, n_months):
+    value = starting_amount
+    for month in range(n_months):
+        value *= 1 + float(history['equity'][start + month])
+        if month < active_months:
+            value += monthly_investment
+    return value
+
+
+def test_prefix_products_match_a_loop_over_every_window():
+    history = synthetic_history(360)
+    result = backtest.backtest(
+        history, starting_amount=5_000, monthly_investment=300, extra_monthly_investment=150,
+        active_investment_period=10, total_investment_period=20, initial_property_value=200_000, loan_term=15
+    )
+    assert len(result['start_months']) == 360 - 240 + 1
+    for start in range(len(result['start_months'])):
+        house = window_loop(history, start, 5_000, 300, 120, 240)
+        rent = window_loop(history, start, 5_000, 450, 120, 240)
+        property_value = 200_000 * np.prod(1 + history['house'][start:start + 180].astype(float))
+        assert result['net_worth_house'][start] == pytest.approx(house + property_value, rel=1e-9)
+        assert result['net_worth_rent'][start] == pytest.approx(rent, rel=1e-9)
+
+
+def test_too_short_history():
+    with pytest.raises(ValueError):
+        backtest.backtest(synthetic_history(100), 0, 100, 0, 10, 20, 200_000, 15)
+
+
+def test_build_history_interpolates_quarterly_house_prices(tmp_path):
+    csv = tmp_path / 'indexes.csv'
+    pd.DataFrame({
+        'month': ['2020-01', '2020-02', '2020-03', '2020-04'],
+        'equity_index': [100.0, 110.0, 99.0, 99.0],
+        'house_index': [100.0, None, None, 100.0 * 1.01 ** 3],
+    }).to_csv(csv, index=False)
+    history = backtest.build_history(csv, tmp_path / 'history.npy')
+
+    assert list(history['month']) == [202002, 202003, 202004]
+    assert history['equity'] == pytest.approx([0.1, -0.1, 0.0])
+    assert history['house'] == pytest.approx([0.01] * 3)
+    loaded = backtest.load_history(tmp_path / 'history.npy')
+    assert isinstance(loaded, np.memmap)
+    assert np.array_equal(loaded, history)
+    assert backtest.load_history(tmp_path / 'missing.npy') is None
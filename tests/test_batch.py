@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import batch
+from scenarios import evaluate_profiles
+from solvers import solve_profiles
+from test_scenarios import random_profiles
+
+# 23 rows in chunks of 5 leave a short last chunk, and with two workers more chunks than the four in flight
+ROWS = 23
+CHUNK_SIZE = 5
+
+
+# Function to score the whole input at once, the result every chunked run must reproduce
+def expected(profiles, solve=False):
+    profiles = profiles.astype(float)
+    results = [profiles, evaluate_profiles(profiles)]
+    if solve:
+        results.append(solve_profiles(profiles))
+    return pd.concat(results, axis=1)
+
+
+def read_output(path):
+    return pd.read_parquet(path) if path.suffix == '.parquet' else pd.read_csv(path)
+
+
+@pytest.mark.parametrize('solve', [False, True])
+@pytest.mark.parametrize('output_name', ['scored.csv', 'scored.parquet'])
+@pytest.mark.parametrize('workers', [1, 2])
+def test_chunked_run_matches_evaluate_profiles(tmp_path, workers, output_name, solve):
+    profiles = random_profiles(ROWS, seed=1)
+    input_path = tmp_path / 'profiles.csv'
+    profiles.to_csv(input_path, index=False)
+    output_path = tmp_path / output_name
+
+    assert batch.run(input_path, output_path, chunk_size=CHUNK_SIZE, workers=workers, solve=solve) == ROWS
+
+    scored = read_output(output_path)
+    want = expected(profiles, solve)
+    assert list(scored.columns) == list(want.columns)
+    # Rows keep the input order across the chunk boundaries
+    assert np.array_equal(scored['loan_amount'], want['loan_amount'])
+    pd.testing.assert_frame_equal(scored, want, check_dtype=False, rtol=1e-9)
+
+
+def test_parquet_input_and_cli(tmp_path):
+    profiles = random_profiles(ROWS, seed=2)
+    input_path = tmp_path / 'profiles.parquet'
+    profiles.to_parquet(input_path, index=False)
+    output_path = tmp_path / 'scored.csv'
+
+    batch.main([str(input_path), str(output_path), '--chunk-size', str(CHUNK_SIZE), '--workers', '2', '--solve'])
+
+    pd.testing.assert_frame_equal(read_output(output_path), expected(profiles, solve=True), check_dtype=False, rtol=1e-9)
+
+
+def test_chunks_are_split_at_the_chunk_size(tmp_path):
+    input_path = tmp_path / 'profiles.csv'
+    random_profiles(ROWS).to_csv(input_path, index=False)
+    assert [len(chunk) for chunk in batch.read_chunks(input_path, CHUNK_SIZE)] == [5, 5, 5, 5, 3]
@@ -0,0 +1,36 @@
+import time
+
+from cache import _MISSING, LRUCache
+from calculator import PREWARM_PROFILES, SHARED_CACHE, prewarm
+from graph import ComputationGraph, Node
+
+
+def test_pinned_entries_outlive_the_ttl_but_not_the_budget():
+    cache = LRUCache(max_entries=2, ttl=0.01)
+    cache.put('pinned', 1)
+    cache.pin('pinned')
+    cache.put('other', 2)
+    time.sleep(0.02)
+    assert cache.get('pinned') == 1
+    assert cache.get('other') is _MISSING
+
+    cache.put('a', 3)
+    cache.put('b', 4)
+    assert cache.get('pinned') is _MISSING
+    assert cache.stats()['pinned'] == 0
+
+
+def test_graph_pins_cached_and_computed_nodes():
+    cache = LRUCache(max_entries=None, ttl=0.01)
+    graph = ComputationGraph([Node('double', lambda x: 2 * x, ['x']), Node('plus', lambda double: double + 1, ['double'])], cache=cache)
+    graph.evaluate({'x': 1})
+    graph.evaluate({'x': 1}, pin=True)
+    time.sleep(0.02)
+    assert graph.evaluate({'x': 1})['recomputed'] == []
+
+
+def test_prewarm_pins_every_node_of_the_profiles():
+    SHARED_CACHE.clear()
+    prewarm(PREWARM_PROFILES[:2])
+    stats = SHARED_CACHE.stats()
+    assert stats['pinned'] == stats['entries'] > 0
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from formatting import format_frame_finnish, format_number_finnish, format_numbers_finnish
+
+VALUES = np.array([
+    0.0, -0.0, 0.05, 0.15, 0.25, 0.35, 1.45, 2.675, 9.95, 99.95, 999.95,
+    -0.04, -0.05, -0.15, -1.25, -999.95, 1_234_567.85, -1_234_567.85, 1e15 + 0.25,
+    np.nan, np.inf, -np.inf,
+])
+
+
+@pytest.mark.parametrize('is_percentage', [False, True])
+def test_vectorized_matches_scalar(is_percentage):
+    formatted = format_numbers_finnish(VALUES, is_percentage)
+    assert list(formatted) == [format_number_finnish(value, is_percentage) for value in VALUES]
+
+
+def test_every_tenth_boundary_up_to_one_thousand():
+    # x.x5 halves are rarely exact in binary, both paths must round them the same way
+    values = np.arange(100_000) / 100 + 0.05
+    assert list(format_numbers_finnish(values)) == [format_number_finnish(value) for value in values]
+
+
+def test_separators_and_missing_values():
+    assert format_number_finnish(1_234_567.84) == '1 234 567,8'
+    assert format_number_finnish(np.float64(0.05)) == format_number_finnish(0.05) == '0,1'
+    assert format_number_finnish(12.34, is_percentage=True) == '12,3 %'
+    assert format_number_finnish(np.nan) == '-'
+    assert format_number_finnish('teksti') == 'teksti'
+    assert list(format_numbers_finnish([1.0, np.nan], missing='')) == ['1,0', '']
+
+
+def test_frame_keeps_other_columns_and_shape():
+    df = pd.DataFrame({'Vuosi': [1, 2], 'Summa (€)': [1_000.04, np.inf]})
+    formatted = format_frame_finnish(df, ['Summa (€)'])
+    assert list(formatted['Summa (€)']) == ['1 000,0', '-']
+    assert list(formatted['Vuosi']) == [1, 2]
+    assert df['Summa (€)'][0] == 1_000.04
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from investment import investment_growth
+from montecarlo import draw_returns, simulate_investments, simulate_net_worth
+
+
+# With zero volatility every path is the deterministic growth of investment.investment_growth
+def test_zero_volatility_matches_deterministic_growth():
+    simulation = simulate_investments(1_000, [500, 800], 0.05, 0.0, 20, 35, n_paths=1_000, chunk_size=300)
+    deterministic = investment_growth(1_000, [500, 800], 0.05, 20, 35, 25)
+    for scenario in range(2):
+        for band in simulation['bands'][scenario]:
+            assert band == pytest.approx(deterministic['cumulative'][scenario], rel=1e-6)
+    assert simulation['final'] == pytest.approx(np.repeat(deterministic['total'][:, None], 1_000, axis=1), rel=1e-6)
+
+
+def test_chunking_and_seed_do_not_change_the_paths():
+    options = dict(n_paths=2_000, seed=7, distribution='student_t')
+    whole = simulate_investments(0, 500, 0.06, 0.15, 25, 40, chunk_size=2_000, **options)
+    chunked = simulate_investments(0, 500, 0.06, 0.15, 25, 40, chunk_size=512, **options)
+    assert np.array_equal(whole['final'], chunked['final'])
+
+
+def test_student_t_is_scaled_to_the_volatility():
+    returns = draw_returns(np.random.default_rng(0), 200_000, 1, 0.0, 0.1, 'student_t', degrees_of_freedom=5)
+    assert returns.std() == pytest.approx(0.1, rel=0.03)
+
+
+def test_rent_never_wins_without_a_difference_to_invest():
+    result = simulate_net_worth(0, 500, 0.0, 300_000, 0.05, 0.2, 25, 39, n_paths=1_000)
+    assert result['probability_rent_wins'] == 0.0
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from calculator import evaluate
+from parameters import average_growth_factor, cumulative_annual, final_growth_factor, growth_factors
+from scenarios import DEFAULT_PROFILE
+
+
+def test_average_growth_factor_is_the_mean_of_growth_factors():
+    for growth in (0.0, 2.5, -1.0):
+        assert average_growth_factor(growth, 25) == pytest.approx(growth_factors(growth, 25).mean())
+
+
+def test_per_year_growth():
+    growth = [0.0, 2.0, 3.0]
+    assert growth_factors(growth, 4) == pytest.approx([1.0, 1.0, 1.02, 1.02 * 1.03])
+    assert final_growth_factor(growth, 4) == pytest.approx(1.02 * 1.03 ** 2)
+    assert final_growth_factor(2.0, 10) == pytest.approx(1.02 ** 10)
+
+
+def test_graph_accepts_per_year_growth():
+    profile = {**DEFAULT_PROFILE, 'rent_growth': [0.0, 2.0, 3.0], 'property_appreciation': np.array([2.0] * 10 + [1.0])}
+    values = evaluate(**profile)['values']
+    assert values['rent']['total_rent_paid'] == pytest.approx(cumulative_annual({'value': 1_200, 'growth': [0.0, 2.0, 3.0]}, 25)[-1])
+    assert values['net_worth']['property_value_end'] == pytest.approx(300_000 * 1.02 ** 10 * 1.01 ** 15)
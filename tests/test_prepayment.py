@@ -0,0 +1,94 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from amortization import amortization_schedule, annuity_payment
+from prepayment import (
+    annual_balance, baseline_annual_balance, extra_payment_vector, holiday_vector, investable_cash_value,
+    prepayment_schedule,
+)
+
+
+# Month by month reference: holiday months pay only the interest, the last payment only what is left
+def loop_schedule(loan_amount, loan_rate, loan_term, extra, holidays):
+    rate = loan_rate / 100 / 12
+    monthly_payment = float(annuity_payment(loan_amount, loan_rate, loan_term))
+    balance = loan_amount
+    payments, interests = [], []
+    for month in range(len(extra)):
+        if balance <= 1e-6:
+            payments.append(0.0)
+            interests.append(0.0)
+            continue
+        interest = balance * rate
+        payment = min((interest if holidays[month] else monthly_payment) + extra[month], balance + interest)
+        balance += interest - payment
+        payments.append(payment)
+        interests.append(interest)
+    return np.array(payments), np.array(interests)
+
+
+@pytest.mark.parametrize('loan_rate', [0.0, 3.0, 9.9])
+def test_cumulative_products_match_a_monthly_loop(loan_rate):
+    n_months = 25 * 12 + 24
+    extra = extra_payment_vector(n_months, {13: 20_000, 100: 5_000}, monthly=200, start_month=24, end_month=120)
+    holidays = holiday_vector(n_months, start_month=30, length=12)
+    schedule = prepayment_schedule(300_000, loan_rate, 25, extra, holidays)
+    payments, interests = loop_schedule(300_000, loan_rate, 25, extra, holidays)
+
+    assert np.abs(schedule['payments'] - payments).max() < 1e-6
+    assert np.abs(schedule['interests'] - interests).max() < 1e-6
+    assert schedule['payoff_month'] == np.flatnonzero(payments)[-1] + 1
+    assert schedule['principals'].sum() == pytest.approx(300_000)
+
+
+def test_no_extra_payments_is_the_plain_annuity():
+    schedule = prepayment_schedule(300_000, 3.0, 25)
+    plain = amortization_schedule(300_000, 3.0, 25)
+    assert schedule['payoff_month'] == 300
+    assert schedule['interests'] == pytest.approx(plain['monthly_interests'], abs=1e-6)
+    assert schedule['interest_saved'] == pytest.approx(0, abs=1e-6)
+    assert schedule['investable_cash'] == pytest.approx(0, abs=1e-6)
+
+
+def test_many_strategies_match_one_at_a_time():
+    strategies = np.random.default_rng(0).random((20, 300)) * 300
+    holidays = holiday_vector(300, start_month=12, length=6)
+    batch = prepayment_schedule(300_000, 3.0, 25, strategies, holidays)
+    for row, extra in enumerate(strategies):
+        single = prepayment_schedule(300_000, 3.0, 25, extra, holidays)
+        assert single['payoff_month'] == batch['payoff_month'][row]
+        assert single['payments'] == pytest.approx(batch['payments'][row])
+    values = investable_cash_value(batch['investable_cash'], 5.0)
+    assert values[3] == pytest.approx(investable_cash_value(batch['investable_cash'][3], 5.0))
+
+
+# A 7 month holiday makes the horizon 25 years and 7 months: 26 year-end balances, the plain
+# annuity stays paid off after its 25 years and the last year ends with the last month
+def test_annual_balances_over_a_horizon_extended_by_a_holiday():
+    holidays = holiday_vector(300, start_month=13, length=7)
+    schedule = prepayment_schedule(300_000, 3.0, 25, np.zeros(300), holidays)
+    balance = annual_balance(schedule['balance'])
+    assert len(schedule['balance']) == 307
+    assert len(balance) == 26
+    assert balance[0] == schedule['balance'][11]
+    assert balance[-1] == schedule['balance'][-1] == pytest.approx(0, abs=1e-6)
+    assert balance[-2] > 0
+
+    plain = amortization_schedule(300_000, 3.0, 25)
+    baseline = baseline_annual_balance(300_000, plain['cumulative_annual_principal'], len(balance))
+    assert len(baseline) == 26
+    assert baseline[0] == pytest.approx(300_000 - plain['monthly_principals'][:12].sum())
+    assert baseline[24:] == pytest.approx([0, 0], abs=1e-6)
+    assert np.all(np.diff(baseline) <= 1e-6)
+
+
+def test_app_draws_the_prepayment_chart_with_a_part_year_holiday():
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(Path(__file__).resolve().parent.parent / 'app.py'), default_timeout=120).run()
+    at.sidebar.checkbox[[box.label for box in at.sidebar.checkbox].index('Laske ylimääräiset lyhennykset ja lyhennysvapaa')].check().run()
+    holiday = next(slider for slider in at.sidebar.slider if slider.label == 'Lyhennysvapaan pituus (kk)')
+    holiday.set_value(7).run()
+    assert not at.exception
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculator import evaluate
+from scenarios import DEFAULT_PROFILE, PENSION_AGE, evaluate_profiles
+
+
+def random_profiles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'loan_amount': rng.integers(50, 500, n) * 1_000.0,
+        'loan_rate': rng.integers(0, 80, n) / 10,
+        'loan_term': rng.integers(5, 41, n),
+        'monthly_rent': rng.integers(300, 2_500, n).astype(float),
+        'vastike': rng.integers(50, 400, n).astype(float),
+        'investment_rate': rng.integers(0, 10, n).astype(float),
+        'age': rng.integers(20, 40, n),
+        'active_investment_period': rng.integers(1, 25, n),
+        'rent_growth': rng.integers(0, 4, n).astype(float),
+        'vastike_growth': rng.integers(0, 4, n).astype(float),
+    })
+
+
+# The batch engine against the calculator graph of the app, one profile at a time
+def test_batch_matches_the_calculator_graph():
+    profiles = random_profiles(30)
+    results = evaluate_profiles(profiles)
+    for row, profile in profiles.astype(object).iterrows():
+        values = evaluate(**{**DEFAULT_PROFILE, **profile})['values']
+        assert results.loc[row, 'total_interest'] == pytest.approx(values['amortization']['total_interest_paid'])
+        assert results.loc[row, 'total_principal'] == pytest.approx(values['amortization']['total_principal_paid'])
+        assert results.loc[row, 'total_investment'] == pytest.approx(values['investments']['total'][0])
+        assert results.loc[row, 'net_worth_house'] == pytest.approx(values['net_worth']['net_worth_house'])
+        assert results.loc[row, 'net_worth_rent'] == pytest.approx(values['net_worth']['net_worth_rent'])
+
+
+def test_invalid_profiles_get_nan_and_dicts_stay_dicts():
+    results = evaluate_profiles({'age': [30, PENSION_AGE - 10], 'active_investment_period': [25, 20]})
+    assert isinstance(results, dict)
+    assert np.isfinite(results['difference_net_worth'][0])
+    assert np.isnan(results['difference_net_worth'][1])
+    assert np.isfinite(results['total_interest'][1])
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from scenarios import DEFAULT_PROFILE, evaluate_profiles
+from sensitivity import break_even_points, sensitivity_grid
+from solvers import break_even_rent
+
+PROFILE = {**DEFAULT_PROFILE, 'vastike': 250, 'rent_growth': 2.0, 'age': 35}
+
+
+def test_grid_cells_match_evaluate_profiles():
+    grid = sensitivity_grid(PROFILE, 'loan_rate', 'investment_rate', resolution=25)
+    for row, col in [(0, 0), (3, 17), (12, 12), (24, 5), (24, 24)]:
+        profile = {**PROFILE, 'loan_rate': grid['x'][col], 'investment_rate': grid['y'][row]}
+        expected = evaluate_profiles(profile)['difference_net_worth'][0]
+        assert grid['difference_net_worth'][row, col] == pytest.approx(expected, rel=1e-12)
+
+
+def test_contour_points_match_break_even_rent():
+    grid = sensitivity_grid(PROFILE, 'monthly_rent', 'loan_rate', resolution=60)
+    points_x, points_y = break_even_points(grid['x'], grid['y'], grid['difference_net_worth'])
+    assert len(points_x) > 0
+    rent = break_even_rent({**PROFILE, 'loan_rate': points_y})
+
+    # Along a row only the rent changes and the difference is linear in the rent there,
+    # so the interpolated crossing is the bisection root
+    along_rows = np.isin(points_y, grid['y'])
+    assert along_rows.sum() > 0
+    assert points_x[along_rows] == pytest.approx(rent[along_rows], abs=1e-6)
+
+    # Along a column the loan rate is interpolated, which stays well inside one grid cell of rent
+    cell = grid['x'][1] - grid['x'][0]
+    assert np.abs(points_x - rent).max() < cell / 10
+
+
+def test_same_parameter_twice_is_rejected():
+    with pytest.raises(ValueError):
+        sensitivity_grid(PROFILE, 'loan_rate', 'loan_rate')
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from amortization import annuity_payment
+from scenarios import evaluate_profiles
+from solvers import MAX_DTI_RATIO, MAX_LOAN_TERM, MIN_LOAN_TERM, break_even_rent, max_affordable_loan, min_loan_term
+
+
+# The break-even rent against a scan of the net worth difference over whole euros of rent
+def scanned_break_even(profile, rents):
+    difference = evaluate_profiles({**profile, 'monthly_rent': rents})['difference_net_worth']
+    crossing = np.flatnonzero(np.diff(np.sign(difference)))
+    return rents[crossing[0]] if len(crossing) else np.nan
+
+
+def test_break_even_rent_with_growing_vastike():
+    profile = {'initial_property_value': 10_000, 'vastike': 500, 'vastike_growth': 5.0}
+    rent = break_even_rent(profile)[0]
+    assert scanned_break_even(profile, np.arange(0.0, 4_000.0)) == np.floor(rent)
+
+
+def test_break_even_rent_with_growing_rent():
+    profile = {'initial_property_value': 100_000, 'rent_growth': 3.0, 'vastike_growth': 1.0}
+    rent = break_even_rent(profile)[0]
+    assert scanned_break_even(profile, np.arange(0.0, 4_000.0)) == np.floor(rent)
+
+
+# The shortest whole-year term the sidebar offers whose payment keeps the DTI under the limit
+def test_min_loan_term_matches_a_scan_of_the_sidebar_terms():
+    rng = np.random.default_rng(0)
+    profiles = {
+        'loan_amount': rng.integers(1, 100, 200) * 10_000.0,
+        'loan_rate': rng.integers(0, 80, 200) / 10,
+        'vastike': rng.integers(0, 5, 200) * 100.0,
+        'net_salary': rng.integers(10, 80, 200) * 100.0,
+    }
+    terms = min_loan_term(profiles)
+    for row in range(200):
+        budget = profiles['net_salary'][row] * MAX_DTI_RATIO / 100 - profiles['vastike'][row]
+        affordable = [
+            term for term in range(MIN_LOAN_TERM, MAX_LOAN_TERM + 1)
+            if annuity_payment(profiles['loan_amount'][row], profiles['loan_rate'][row], term) <= budget
+        ]
+        expected = affordable[0] if affordable else np.nan
+        assert terms[row] == expected or (np.isnan(terms[row]) and np.isnan(expected))
+
+
+def test_max_affordable_loan_uses_the_whole_budget():
+    loan = max_affordable_loan({'net_salary': 4_000, 'vastike': 200, 'loan_rate': 4.0, 'loan_term': 25})[0]
+    assert annuity_payment(loan, 4.0, 25) == pytest.approx(4_000 * MAX_DTI_RATIO / 100 - 200)
@@ -0,0 +1,58 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import triage
+from triage_batch import answer_column, evaluate_chunk
+
+QUESTION_KEYS = triage.TABLE['nodes'][:triage.TABLE['n_questions']]
+
+
+# Every answer vector with each question unanswered, no or yes, on a sample of the 3^13 vectors
+def sample_answers(n, seed=0):
+    return np.random.default_rng(seed).integers(-1, 2, (n, len(QUESTION_KEYS)))
+
+
+def as_dict(row):
+    return {key: int(answer) for key, answer in zip(QUESTION_KEYS, row) if answer >= 0}
+
+
+def test_evaluate_many_matches_evaluate():
+    answers = sample_answers(5_000)
+    nodes = triage.evaluate_many(answers)
+    for row, node in zip(answers, nodes):
+        asked, outcome = triage.walk(as_dict(row))
+        assert triage.TABLE['nodes'][node] == (outcome if outcome is not None else asked[-1])
+
+
+def test_every_complete_path_reaches_an_outcome():
+    answers = np.array(list(itertools.product([0, 1], repeat=len(QUESTION_KEYS))))
+    nodes = triage.evaluate_many(answers)
+    assert (nodes >= triage.TABLE['n_questions']).all()
+
+
+def test_compile_tree_rejects_cycles_and_unknown_targets():
+    questions = {'a': {'yes': 'b', 'no': 'done'}, 'b': {'yes': 'a', 'no': 'done'}}
+    with pytest.raises(ValueError, match='Cycle'):
+        triage.compile_tree(questions, {'done': {}}, 'a')
+    with pytest.raises(ValueError, match='unknown target'):
+        triage.compile_tree({'a': {'yes': 'x', 'no': 'done'}}, {'done': {}}, 'a')
+
+
+def test_answer_column():
+    values = pd.Series(['Kyllä', ' ei ', 'YES', 0, 1.0, None, 'maybe', ''])
+    assert answer_column(values).tolist() == [1, 0, 1, 0, 1, -1, -1, -1]
+
+
+def test_evaluate_chunk_by_criterion_and_question_key():
+    chunk = pd.DataFrame({
+        'gcs_below_13': ['Ei', 'Ei', 'Kyllä', 'Ei'],
+        'question_2': ['Ei', 'Ei', None, None],
+        'open_or_depressed_skull_fracture': ['Ei', 'Ei', None, None],
+    })
+    result = evaluate_chunk(chunk)
+    assert result['ct_outcome'].tolist() == [None, None, 'ct_1h', None]
+    assert result['ct_recommendation'].tolist() == [None, None, '1 h', None]
+    assert result['missing_criterion'].tolist() == ['basal_skull_fracture_sign', 'basal_skull_fracture_sign', None, 'gcs_below_15_at_2h']
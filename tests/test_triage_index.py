@@ -0,0 +1,22 @@
+import numpy as np
+
+import triage
+import triage_index
+import triage_verify
+
+
+def test_lookup_matches_evaluate_for_complete_and_partial_answers():
+    rng = np.random.default_rng(0)
+    for row in rng.integers(-1, 2, (2_000, triage_index.N_QUESTIONS)):
+        answers = {key: triage.ANSWER_OPTIONS[answer + 1] for key, answer in zip(triage_index.QUESTION_KEYS, row) if answer >= 0}
+        assert triage_index.lookup(answers) == triage.evaluate(answers)
+    for mask in range(0, 2 ** triage_index.N_QUESTIONS, 7):
+        answers = {key: (mask >> position) & 1 for position, key in enumerate(triage_index.QUESTION_KEYS)}
+        assert triage_index.answers_mask(answers) == mask
+        assert triage_index.lookup(answers) == triage.evaluate(answers)
+
+
+def test_verify_finds_no_index_errors():
+    report = triage_verify.verify(partial_samples=5_000)
+    assert report['errors'] == []
+    assert sum(report['outcome_counts'].values()) == 2 ** triage_index.N_QUESTIONS
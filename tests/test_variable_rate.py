@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from amortization import amortization_schedule
+from variable_rate import simulate_reference_rates, variable_rate_schedule
+
+
+# A constant reference rate re-amortizes to the same annuity, so it is the fixed-rate loan
+@pytest.mark.parametrize('reset_months', [3, 6, 12])
+def test_constant_rate_matches_the_fixed_schedule(reset_months):
+    rates = np.full((4, 25 * 12), 2.5)
+    result = variable_rate_schedule(300_000, rates, 0.5, 25, reset_months, net_salary=3_000)
+    fixed = amortization_schedule(300_000, 3.0, 25)
+    assert result['payments'] == pytest.approx(fixed['monthly_payment'])
+    assert result['total_interest'] == pytest.approx(fixed['cumulative_annual_interest'][-1])
+    assert result['worst_payment_ratio'] == pytest.approx(fixed['monthly_payment'] / 3_000 * 100)
+
+
+# Month by month reference: re-amortize at every reset, pay the annuity in between
+def loop_schedule(loan_amount, reference_rates, margin, loan_term, reset_months):
+    months = loan_term * 12
+    balance = loan_amount
+    total_interest = 0.0
+    for month in range(months):
+        rate = max(reference_rates[month - month % reset_months] + margin, 0.0) / 100 / 12
+        if month % reset_months == 0:
+            remaining = months - month
+            payment = balance * rate / (1 - (1 + rate) ** -remaining) if rate else balance / remaining
+        interest = balance * rate
+        total_interest += interest
+        balance -= payment - interest
+    return total_interest, balance
+
+
+def test_random_paths_match_a_monthly_loop():
+    rates = simulate_reference_rates(20, 20 * 12, 3.0, volatility=2.0, seed=1)
+    result = variable_rate_schedule(200_000, rates, 0.6, 20, 6)
+    for path in range(20):
+        total_interest, balance = loop_schedule(200_000, rates[path], 0.6, 20, 6)
+        assert result['total_interest'][path] == pytest.approx(total_interest, rel=1e-9)
+        assert balance == pytest.approx(0, abs=1e-6)
+
+
+def test_rejects_short_paths_and_unknown_resets():
+    with pytest.raises(ValueError):
+        variable_rate_schedule(100_000, np.zeros((1, 12)), 1.0, 5)
+    with pytest.raises(ValueError):
+        variable_rate_schedule(100_000, np.zeros((1, 60)), 1.0, 5, reset_months=4)
@@ -0,0 +1,223 @@
+# Head CT triage after a head injury (Käypä hoito: Aivovammat 2023, NICE NG232) as data.
+# Every question has a criterion name (its column in registry data), a header, optional help
+# text shown in an expander, and the next step for both answers: another question or an outcome.
+# The tree is compiled into a flat transition table at import, and both the Streamlit UI and
+# evaluate() are driven by that table.
+
+ANSWER_OPTIONS = ["Valitse vaihtoehto", "Ei", "Kyllä"]
+NO = 0
+YES = 1
+
+OUTCOMES = {
+    'ct_1h': {'text': "Tee pään TT 1 tunnin sisään arvioinnista", 'color': "red", 'recommendation': "1 h"},
+    'ct_8h': {'text': "Tee pään TT 8 tunnin sisään vammasta", 'color': "orange", 'recommendation': "8 h"},
+    'ct_consider': {'text': "Harkinnan mukaan pään TT-kuvaus", 'color': "#DAA520", 'recommendation': "harkinnan mukaan"},
+    'no_ct': {'text': "Ei tarvetta pään TT-kuvaukselle", 'color': "green", 'recommendation': "ei tarvetta"},
+}
+
+FIRST_QUESTION = 'question_1'
+
+QUESTIONS = {
+    'question_1': {
+        'criterion': 'gcs_below_13',
+        'header': "GCS < 13 ensiavussa ensimmäistä kertaa arvioitaessa",
+        'help': "Explanation of terms and definitions for GCS < 13 ensiavussa",
+        'gcs_table': True,
+        'yes': 'ct_1h',
+        'no': 'question_2',
+    },
+    'question_2': {
+        'criterion': 'gcs_below_15_at_2h',
+        'header': "GCS < 15 ensiavussa 2 tuntia vamman jälkeen",
+        'help': "Additional definitions or clarifications for GCS < 15 ensiavussa 2 tuntia vamman jälkeen",
+        'gcs_table': True,
+        'yes': 'ct_1h',
+        'no': 'question_3',
+    },
+    'question_3': {
+        'criterion': 'open_or_depressed_skull_fracture',
+        'header': "Epäily avoimesta tai kasaan painuneesta kallonmurtumasta",
+        'yes': 'ct_1h',
+        'no': 'question_4',
+    },
+    'question_4': {
+        'criterion': 'basal_skull_fracture_sign',
+        'header': "Merkki kallonpohjan murtumasta",
+        'help': "Hemotympanum, periorbitaalinen hematooma (brillen-hematooma), Subkutaaninen hematooma mastoideuslokeroston päällä (Battle's sign), Likvorivuoto nenästä tai korvasta",
+        'yes': 'ct_1h',
+        'no': 'question_5',
+    },
+    'question_5': {
+        'criterion': 'post_traumatic_seizure',
+        'header': "Vamman jälkeinen kouristuskohtaus",
+        'yes': 'ct_1h',
+        'no': 'question_6',
+    },
+    'question_6': {
+        'criterion': 'focal_neurological_deficit',
+        'header': "Paikallinen neurologinen puutosoire",
+        'help': "Esim. hemipareesi, dysfasia, näkökenttäpuutos",
+        'yes': 'ct_1h',
+        'no': 'question_7',
+    },
+    'question_7': {
+        'criterion': 'vomiting_more_than_once',
+        'header': "Useampi kuin yksi oksennusepisodi vamman jälkeen",
+        'yes': 'ct_1h',
+        'no': 'question_8',
+    },
+    'question_8': {
+        'criterion': 'loss_of_consciousness_or_amnesia',
+        'header': "Onko vamman jälkeen ollut tajuttomuutta tai amnesiaa?",
+        'yes': 'question_10',
+        'no': 'question_9',
+    },
+    'question_9': {
+        'criterion': 'anticoagulant_or_antiplatelet',
+        'header': "Onko antikoagulaatiolääkitystä tai verihiutaleiden estäjälääkitystä (pois lukien aspiriinia)?",
+        'help': "Varfariini, DOAC, hepariini, LMWH, klopidogreeli, tikagreloori, prasugreeli",
+        'yes': 'ct_consider',
+        'no': 'no_ct',
+    },
+    'question_10': {
+        'criterion': 'age_65_or_over',
+        'header': "Ikä ≥ 65 v?",
+        'yes': 'ct_8h',
+        'no': 'question_11',
+    },
+    'question_11': {
+        'criterion': 'coagulopathy',
+        'header': "Tiedossa verenhyytymishäiriö?",
+        'help': "Maksan vajaatoiminta, hemofilia, antikoagulanttilääkitys, verihiutaleiden estäjälääkitys",
+        'yes': 'ct_8h',
+        'no': 'question_12',
+    },
+    'question_12': {
+        'criterion': 'dangerous_mechanism',
+        'header': "Vaarallinen vammamekanismi?",
+        'help': "Jalankulkija tai pyöräilijä joutunut moottoroidun ajoneuvon töytäisemäksi, henkilö lentänyt ulos ajoneuvosta, putoaminen yli 1 metrin tai yli 5 portaan korkeudesta",
+        'yes': 'ct_8h',
+        'no': 'question_13',
+    },
+    'question_13': {
+        'criterion': 'retrograde_amnesia_over_30_min',
+        'header': "Yli 30 minuutin retrogradinen amnesia?",
+        'help': "Muistamattomuus vammaa edeltäneistä tapahtumista",
+        'yes': 'ct_8h',
+        'no': 'no_ct',
+    },
+}
+
+
+# Function to compile the tree into a flat transition table. Nodes are numbered questions first,
+# then outcomes; transitions[question][answer] is the next node for the answer NO (0) or YES (1).
+# Raises ValueError for unknown targets, cycles and questions that cannot be reached.
+def compile_tree(questions, outcomes, first_question):
+    nodes = list(questions) + list(outcomes)
+    index = {name: number for number, name in enumerate(nodes)}
+    transitions = []
+    for name, question in questions.items():
+        for branch in ('no', 'yes'):
+            if question[branch] not in index:
+                raise ValueError(f"{name}: unknown target '{question[branch]}' for the answer '{branch}'")
+        transitions.append((index[question['no']], index[question['yes']]))
+
+    # Depth-first walk from the first question: every question must be reached and none revisited on a path
+    reached = set()
+
+    def visit(node, path):
+        if node >= len(questions):
+            return
+        if node in path:
+            raise ValueError(f"Cycle through {nodes[node]}")
+        reached.add(node)
+        for target in transitions[node]:
+            visit(target, path | {node})
+
+    visit(index[first_question], frozenset())
+    unreachable = [nodes[node] for node in range(len(questions)) if node not in reached]
+    if unreachable:
+        raise ValueError(f"Unreachable questions: {', '.join(unreachable)}")
+
+    return {
+        'nodes': nodes,
+        'n_questions': len(questions),
+        'start': index[first_question],
+        'transitions': tuple(transitions),
+    }
+
+
+TABLE = compile_tree(QUESTIONS, OUTCOMES, FIRST_QUESTION)
+
+
+# Function to turn an answer into NO, YES or None (not answered). Accepts the radio options,
+# booleans and 0/1.
+def answer_index(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return {ANSWER_OPTIONS[1]: NO, ANSWER_OPTIONS[2]: YES}.get(value)
+    return YES if value else NO
+
+
+# Function to follow the answers through the table. Returns the questions on the path in the order
+# they are asked and the outcome, or None as the outcome when the path stops at an unanswered question.
+def walk(answers, table=TABLE):
+    nodes = table['nodes']
+    node = table['start']
+    asked = []
+    while node < table['n_questions']:
+        asked.append(nodes[node])
+        answer = answer_index(answers.get(nodes[node]))
+        if answer is None:
+            return asked, None
+        node = table['transitions'][node][answer]
+    return asked, nodes[node]
+
+
+# Function to get the outcome key (one of OUTCOMES) of a set of answers, None if more answers are needed.
+# Answers to questions that are not on the path are ignored, as in the UI.
+def evaluate(answers, table=TABLE):
+    return walk(answers, table)[1]
+
+
+# Function to get the questions that can follow a question on some path, in table order. Their
+# answers only count while the question keeps its answer, so the UI clears them when it changes.
+def questions_after(key, table=TABLE):
+    nodes = table['nodes']
+    found = set()
+    pending = list(table['transitions'][nodes.index(key)])
+    while pending:
+        node = pending.pop()
+        if node < table['n_questions'] and node not in found:
+            found.add(node)
+            pending.extend(table['transitions'][node])
+    return [nodes[node] for node in sorted(found)]
+
+
+# Function to get the coloured heading of an outcome, as shown in the app
+def outcome_markup(outcome):
+    return f"<h1 style='color:{OUTCOMES[outcome]['color']};'>{OUTCOMES[outcome]['text']}</h1>"
+
+
+# Function to evaluate many answer sets at once. answers is an integer matrix with one row per
+# encounter and one column per question in table order, holding NO (0), YES (1) or -1 when not
+# answered. All rows step through the table together, one step per question level, so the
+# work is a handful of array operations per level however many rows there are.
+# Returns the node index of every row: an outcome, or the first unanswered question on its path.
+def evaluate_many(answers, table=TABLE):
+    import numpy as np
+
+    answers = np.asarray(answers)
+    transitions = np.asarray(table['transitions'])
+    rows = np.arange(len(answers))
+    node = np.full(len(answers), table['start'])
+    for _ in range(table['n_questions']):
+        open_rows = node < table['n_questions']
+        question = np.where(open_rows, node, 0)
+        answer = answers[rows, question]
+        step = open_rows & (answer >= 0)
+        if not step.any():
+            break
+        node = np.where(step, transitions[question, np.maximum(answer, 0)], node)
+    return node
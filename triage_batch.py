@@ -0,0 +1,111 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import triage
+from batch import DEFAULT_CHUNK_SIZE, ChunkWriter, read_chunks
+
+# Values read as yes or no, compared in lower case. Anything else, including empty cells, is not answered.
+YES_VALUES = {'kyllä', 'k', 'yes', 'y', 'true', '1', '1.0'}
+NO_VALUES = {'ei', 'e', 'no', 'n', 'false', '0', '0.0'}
+
+
+# Function to find the column of every question: the criterion name (e.g. gcs_below_13) or the
+# question key (question_1). Missing columns are treated as not answered.
+def criterion_columns(columns):
+    found = {}
+    for key in triage.TABLE['nodes'][:triage.TABLE['n_questions']]:
+        for name in (triage.QUESTIONS[key]['criterion'], key):
+            if name in columns:
+                found[key] = name
+                break
+    return found
+
+
+# Function to turn a column of yes/no values into NO (0), YES (1) and -1 for not answered.
+# Registry columns hold only a few distinct values, so those are classified once and the
+# column is mapped through its factorized codes.
+def answer_column(values):
+    codes, uniques = pd.factorize(values)
+    lookup = np.array([_answer_value(value) for value in uniques] + [-1], dtype=np.int8)
+    return lookup[codes]
+
+
+def _answer_value(value):
+    text = str(value).strip().lower()
+    if text in YES_VALUES:
+        return triage.YES
+    if text in NO_VALUES:
+        return triage.NO
+    return -1
+
+
+# Function to evaluate one chunk of encounters: the input columns plus the outcome key, the CT
+# recommendation (1 h, 8 h, harkinnan mukaan, ei tarvetta) and, for rows that cannot be decided,
+# the criterion that is needed next
+def evaluate_chunk(chunk):
+    columns = criterion_columns(chunk.columns)
+    questions = triage.TABLE['nodes'][:triage.TABLE['n_questions']]
+    answers = np.full((len(chunk), len(questions)), -1, dtype=np.int8)
+    for number, key in enumerate(questions):
+        if key in columns:
+            answers[:, number] = answer_column(chunk[columns[key]])
+
+    node = triage.evaluate_many(answers)
+    nodes = np.array(triage.TABLE['nodes'], dtype=object)
+    decided = node >= triage.TABLE['n_questions']
+    recommendations = np.array(
+        [None] * triage.TABLE['n_questions'] + [outcome['recommendation'] for outcome in triage.OUTCOMES.values()],
+        dtype=object
+    )
+    criteria = np.array([triage.QUESTIONS[key]['criterion'] for key in questions] + [None] * len(triage.OUTCOMES), dtype=object)
+
+    results = pd.DataFrame({
+        'ct_outcome': np.where(decided, nodes[node], None),
+        'ct_recommendation': recommendations[node],
+        'missing_criterion': criteria[node],
+    }, index=chunk.index)
+    return pd.concat([chunk, results], axis=1)
+
+
+# Function to evaluate every encounter of the input file chunk by chunk and write the results,
+# returns the number of rows and the count of every recommendation
+def run(input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    writer = ChunkWriter(output_path)
+    counts = {}
+    try:
+        for chunk in read_chunks(input_path, chunk_size):
+            evaluated = evaluate_chunk(chunk)
+            for recommendation, count in evaluated['ct_recommendation'].fillna('ei ratkaistu').value_counts().items():
+                counts[recommendation] = counts.get(recommendation, 0) + int(count)
+            writer.write(evaluated)
+    finally:
+        writer.close()
+    return writer.rows, counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Evaluate the head CT triage rules for registry encounters from a CSV or Parquet file.'
+    )
+    parser.add_argument(
+        'input',
+        help='CSV or Parquet file with one encounter per row and one yes/no column per criterion, '
+             'named by criterion (e.g. gcs_below_13) or question key (question_1)'
+    )
+    parser.add_argument('output', help='CSV or Parquet file for the input columns and the CT recommendation')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='rows per chunk')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    rows, counts = run(args.input, args.output, args.chunk_size)
+    print(f'{rows} encounters evaluated in {time.perf_counter() - start:.1f} s', file=sys.stderr)
+    for recommendation, count in sorted(counts.items()):
+        print(f'  {recommendation}: {count}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+from functools import lru_cache
+
+import numpy as np
+
+import triage
+
+QUESTION_KEYS = triage.TABLE['nodes'][:triage.TABLE['n_questions']]
+N_QUESTIONS = len(QUESTION_KEYS)
+
+# Digits of the partial answer key, the same as the radio option indexes in triage.ANSWER_OPTIONS
+UNANSWERED = 0
+ANSWERED_NO = 1
+ANSWERED_YES = 2
+
+
+# Function to build the outcome of every complete answer vector: bit i of the index is YES for
+# the question in table position i. 2^13 = 8192 entries of int8, the node index of the outcome.
+def build_outcome_index():
+    masks = np.arange(2 ** N_QUESTIONS)
+    answers = (masks[:, None] >> np.arange(N_QUESTIONS)) & 1
+    index = triage.evaluate_many(answers).astype(np.int8)
+    index.flags.writeable = False
+    return index
+
+
+# Built once when the module is imported, which takes a few milliseconds
+OUTCOME_INDEX = build_outcome_index()
+
+
+# Function to build the result of every partial answer vector in base 3, digit i being
+# UNANSWERED, ANSWERED_NO or ANSWERED_YES for the question in table position i. 3^13 entries
+# (1.6 MB) of int8: the outcome node, or the first unanswered question on the path.
+# Building it takes about half a second, so it is built on first use (once per process)
+# rather than on import.
+@lru_cache(maxsize=None)
+def partial_index():
+    keys = np.arange(3 ** N_QUESTIONS, dtype=np.int32)
+    answers = np.empty((len(keys), N_QUESTIONS), dtype=np.int8)
+    for position in range(N_QUESTIONS):
+        answers[:, position] = (keys // 3 ** position) % 3 - 1
+    index = triage.evaluate_many(answers).astype(np.int8)
+    index.flags.writeable = False
+    return index
+
+
+# Function to get the bitmask of a complete set of answers, raises ValueError if any is missing
+def answers_mask(answers):
+    mask = 0
+    for position, key in enumerate(QUESTION_KEYS):
+        answer = triage.answer_index(answers.get(key))
+        if answer is None:
+            raise ValueError(f'{key} is not answered, use answers_key for partial answers')
+        mask |= answer << position
+    return mask
+
+
+# Function to get the base-3 key of a partial set of answers
+def answers_key(answers):
+    key = 0
+    for position, question in enumerate(QUESTION_KEYS):
+        answer = triage.answer_index(answers.get(question))
+        if answer is not None:
+            key += (answer + 1) * 3 ** position
+    return key
+
+
+# Function to resolve any full or partial answer set with one lookup: a complete set in the
+# bitmask index, a partial one in the base-3 index. Returns the outcome key, or None when an
+# answer on the path is still missing, like triage.evaluate.
+def lookup(answers):
+    try:
+        node = int(OUTCOME_INDEX[answers_mask(answers)])
+    except ValueError:
+        node = int(partial_index()[answers_key(answers)])
+    return triage.TABLE['nodes'][node] if node >= N_QUESTIONS else None
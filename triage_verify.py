@@ -0,0 +1,135 @@
+import argparse
+import sys
+
+import numpy as np
+
+import triage
+import triage_index
+
+# Independent reference of the head CT criteria for adults (NICE NG232 1.4.9-1.4.12, Käypä hoito:
+# Aivovammat 2023), written as flat rules over the criteria rather than as a question tree.
+# Checked in order, the first rule that matches gives the outcome.
+REFERENCE_RULES = [
+    ('ct_1h', 'any', [
+        'gcs_below_13', 'gcs_below_15_at_2h', 'open_or_depressed_skull_fracture', 'basal_skull_fracture_sign',
+        'post_traumatic_seizure', 'focal_neurological_deficit', 'vomiting_more_than_once',
+    ]),
+    ('ct_8h', 'loss_of_consciousness_or_amnesia', [
+        'age_65_or_over', 'coagulopathy', 'dangerous_mechanism', 'retrograde_amnesia_over_30_min',
+    ]),
+    # NG232 1.4.12: consider CT within 8 hours for anticoagulated adults with no other indication,
+    # whether or not they lost consciousness
+    ('ct_consider', 'any', ['anticoagulant_or_antiplatelet']),
+]
+REFERENCE_DEFAULT = 'no_ct'
+
+
+# Function to evaluate the reference rules for a matrix of complete answers (rows x questions in
+# table order, 1 = yes). Returns the outcome key of every row.
+def reference_outcomes(answers):
+    column = {triage.QUESTIONS[key]['criterion']: position for position, key in enumerate(triage_index.QUESTION_KEYS)}
+    outcomes = np.full(len(answers), REFERENCE_DEFAULT, dtype=object)
+    decided = np.zeros(len(answers), dtype=bool)
+    for outcome, condition, criteria in REFERENCE_RULES:
+        matches = answers[:, [column[name] for name in criteria]].any(axis=1)
+        if condition != 'any':
+            matches &= answers[:, column[condition]].astype(bool)
+        outcomes[matches & ~decided] = outcome
+        decided |= matches
+    return outcomes
+
+
+# Function to find the questions that are asked only on one side of a branch point, a question
+# whose both answers lead to further questions (e.g. question_9 only when question_8 is Ei).
+# Returns {question: [(branch question, answer), ...]} for the questions that have such a condition.
+def branch_conditions():
+    transitions = triage.TABLE['transitions']
+    n_questions = triage.TABLE['n_questions']
+    branch_points = {
+        triage.TABLE['nodes'][node] for node, targets in enumerate(transitions) if all(target < n_questions for target in targets)
+    }
+    conditions = {}
+    for mask in range(2 ** triage_index.N_QUESTIONS):
+        answers = {key: (mask >> position) & 1 for position, key in enumerate(triage_index.QUESTION_KEYS)}
+        asked, _ = triage.walk(answers)
+        path = {(question, answers[question]) for question in asked[:-1] if question in branch_points}
+        for question in asked:
+            conditions[question] = path if question not in conditions else conditions[question] & path
+    return {question: sorted(path) for question, path in conditions.items() if path}
+
+
+# Function to check the outcome index against the tree and the reference. Returns a report with
+# errors (the index disagrees with the tree, a software fault) and warnings (the tree disagrees
+# with the reference or has unreachable outcomes, for clinical review).
+def verify(partial_samples=100_000, seed=0):
+    nodes = triage.TABLE['nodes']
+    errors = []
+    warnings = []
+
+    # Every full answer vector: index vs tree walk and index vs reference
+    full = triage_index.OUTCOME_INDEX
+    masks = np.arange(len(full))
+    answers = ((masks[:, None] >> np.arange(triage_index.N_QUESTIONS)) & 1).astype(np.int8)
+    tree = np.array([nodes[node] for node in full], dtype=object)
+    for mask in masks:
+        walked = triage.evaluate({key: int(answers[mask, position]) for position, key in enumerate(triage_index.QUESTION_KEYS)})
+        if walked != tree[mask]:
+            errors.append(f'Bitmask {mask}: index gives {tree[mask]}, the tree gives {walked}')
+
+    reference = reference_outcomes(answers)
+    differences = {}
+    for mask in np.flatnonzero(tree != reference):
+        differences.setdefault((tree[mask], reference[mask]), []).append(mask)
+    for (tree_outcome, reference_outcome), differing in sorted(differences.items()):
+        example = [triage.QUESTIONS[key]['criterion'] for position, key in enumerate(triage_index.QUESTION_KEYS) if answers[differing[0], position]]
+        warnings.append(
+            f'{len(differing)} answer vectors give {tree_outcome} but the reference gives {reference_outcome}, '
+            f"e.g. yes to: {', '.join(example) or 'nothing'}"
+        )
+
+    counts = {outcome: int(np.sum(tree == outcome)) for outcome in triage.OUTCOMES}
+    for outcome, count in counts.items():
+        if count == 0:
+            warnings.append(f'Outcome {outcome} cannot be reached')
+
+    # Criteria that are asked only on one side of a branch point are ignored on the other side
+    for question, path in branch_conditions().items():
+        condition = ', '.join(f'{key}={triage.ANSWER_OPTIONS[answer + 1]}' for key, answer in path)
+        warnings.append(f"{question} ({triage.QUESTIONS[question]['criterion']}) is asked only when {condition}")
+
+    # Random partial answer sets: base-3 index vs tree walk
+    rng = np.random.default_rng(seed)
+    partial = triage_index.partial_index()
+    for key in rng.integers(len(partial), size=partial_samples):
+        digits = [(int(key) // 3 ** position) % 3 for position in range(triage_index.N_QUESTIONS)]
+        answers_dict = {question: digit - 1 for question, digit in zip(triage_index.QUESTION_KEYS, digits) if digit}
+        asked, outcome = triage.walk(answers_dict)
+        expected = outcome if outcome is not None else asked[-1]
+        if nodes[partial[key]] != expected:
+            errors.append(f'Partial key {key}: index gives {nodes[partial[key]]}, the tree gives {expected}')
+
+    return {'outcome_counts': counts, 'errors': errors, 'warnings': warnings}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Verify the precomputed head CT outcome index against the triage tree and a reference of the criteria.'
+    )
+    parser.add_argument('--partial-samples', type=int, default=100_000, help='random partial answer sets to check')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    report = verify(args.partial_samples, args.seed)
+    print('Outcomes over all 8192 complete answer vectors:')
+    for outcome, count in report['outcome_counts'].items():
+        print(f'  {outcome}: {count}')
+    for warning in report['warnings']:
+        print(f'WARNING: {warning}')
+    for error in report['errors']:
+        print(f'ERROR: {error}')
+    print(f"{len(report['errors'])} errors, {len(report['warnings'])} warnings")
+    sys.exit(1 if report['errors'] else 0)
+
+
+if __name__ == '__main__':
+    main()
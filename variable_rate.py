@@ -0,0 +1,86 @@
+import numpy as np
+
+from amortization import annuity_payment, balance_before_payment
+
+# Reset periods of Euribor-linked loans in months
+RESET_PERIODS = (3, 6, 12)
+
+
+# Function to simulate monthly reference rate paths (in percent) with the mean-reverting
+# Vasicek model dr = a(b - r)dt + sigma dW. Uses the exact monthly transition, so the step
+# size does not bias the mean or the variance. Rates may go negative, like Euribor did.
+def simulate_reference_rates(n_paths, n_months, initial_rate, long_term_rate=2.5, mean_reversion=0.3,
+                             volatility=1.0, seed=0):
+    rng = np.random.default_rng(seed)
+    dt = 1 / 12
+    decay = np.exp(-mean_reversion * dt)
+    if mean_reversion > 0:
+        step_std = volatility * np.sqrt((1 - decay ** 2) / (2 * mean_reversion))
+    else:
+        step_std = volatility * np.sqrt(dt)
+
+    rates = np.empty((n_paths, n_months))
+    rate = np.full(n_paths, float(initial_rate))
+    for month in range(n_months):
+        rates[:, month] = rate
+        rate = rate * decay + long_term_rate * (1 - decay) + step_std * rng.standard_normal(n_paths)
+    return rates
+
+
+# Function to amortize a variable-rate loan on many reference rate paths at once (paths x months).
+# At every reset the loan rate is the reference rate plus the margin, floored at zero, and the
+# remaining balance is re-amortized over the remaining term. Within a reset period the balance
+# follows the closed form, so the loop runs once per reset period instead of once per month.
+def variable_rate_schedule(loan_amount, reference_rates, margin, loan_term, reset_months=12, net_salary=0,
+                           percentiles=(5, 50, 95)):
+    if reset_months not in RESET_PERIODS:
+        raise ValueError(f"Unknown reset period {reset_months}, expected one of {RESET_PERIODS}")
+    reference_rates = np.atleast_2d(np.asarray(reference_rates, dtype=float))
+    months = loan_term * 12
+    if reference_rates.shape[1] < months:
+        raise ValueError(f"Reference rates cover {reference_rates.shape[1]} months, the loan needs {months}")
+
+    resets = np.arange(0, months, reset_months)
+    period_lengths = np.minimum(reset_months, months - resets)
+    loan_rates = np.maximum(reference_rates[:, resets] + margin, 0.0)
+
+    n_paths = reference_rates.shape[0]
+    balance = np.full(n_paths, float(loan_amount))
+    payments = np.empty((n_paths, len(resets)))
+    total_interest = np.zeros(n_paths)
+    for period, start in enumerate(resets):
+        monthly_interest_rate = loan_rates[:, period] / 100 / 12
+        payment = annuity_payment(balance, loan_rates[:, period], (months - start) / 12)
+        next_balance = balance_before_payment(balance, monthly_interest_rate, payment, period_lengths[period] + 1)
+
+        # Whatever part of the payments did not reduce the balance was interest
+        total_interest += payment * period_lengths[period] - (balance - next_balance)
+        payments[:, period] = payment
+        balance = next_balance
+
+    max_payment = payments.max(axis=1)
+    if net_salary > 0:
+        worst_payment_ratio = max_payment / net_salary * 100
+    else:
+        worst_payment_ratio = np.full(n_paths, np.nan)
+
+    return {
+        'percentiles': np.asarray(percentiles),
+        'loan_rates': loan_rates,
+        'payments': payments,
+        'period_lengths': period_lengths,
+        # The payment stays the same within a reset period, so the monthly bands repeat the period bands
+        'payment_bands': np.repeat(np.percentile(payments, percentiles, axis=0), period_lengths, axis=1),
+        'total_interest': total_interest,
+        'total_interest_percentiles': np.percentile(total_interest, percentiles),
+        'max_payment': max_payment,
+        'worst_payment_ratio': worst_payment_ratio,
+        'worst_payment_ratio_percentiles': np.percentile(worst_payment_ratio, percentiles),
+    }
+
+
+# Function to simulate the reference rates and amortize the loan on them in one call
+def simulate_variable_rate(loan_amount, margin, loan_term, initial_rate, reset_months=12, net_salary=0,
+                           n_paths=10_000, seed=0, percentiles=(5, 50, 95), **rate_model):
+    reference_rates = simulate_reference_rates(n_paths, loan_term * 12, initial_rate, seed=seed, **rate_model)
+    return variable_rate_schedule(loan_amount, reference_rates, margin, loan_term, reset_months, net_salary, percentiles)